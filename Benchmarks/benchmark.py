@@ -0,0 +1,289 @@
+"""
+Author: Anshul Pardhi
+The program benchmarks the stages of the indexing and retrieval programs on a collection generated by
+generate_corpus.py, writes the timings to a JSON file and compares them against a stored baseline
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import platform
+
+# The benchmarked functions live in the Indexing and Ranked Retrieval directories
+benchmark_directory = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(benchmark_directory, "..", "Ranked Retrieval"))
+sys.path.insert(0, os.path.join(benchmark_directory, "..", "Indexing"))
+
+from nltk.stem import WordNetLemmatizer
+from cranfield_reader import read_documents
+from analyzer import tokenize
+from porter_stemmer_stateless import StatelessPorterStemmer
+from term_cache import LRUCache, CachedLemmatizer, CachedStemmer
+from ingestion import get_unsorted_index
+from index_compression import compress_index
+from bit_codec import BitWriter, encode_gamma, encode_delta, get_gaps
+from postings_codecs import compare_codecs
+from weighting import generate_weight_vector_map
+from scoring import generate_weight_index, score_term_at_a_time
+from evaluation import get_percentile
+
+
+def time_best(function, repeat):
+    """
+    Run a function several times and keep the fastest run, which is the least disturbed by the rest of the system
+    :param function: function without parameters
+    :param repeat:
+    :return: result of the last run, seconds of the fastest run
+    """
+    best_seconds = None
+    result = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        if best_seconds is None or seconds < best_seconds:
+            best_seconds = seconds
+    return result, best_seconds
+
+
+def add_result(results, name, seconds, count, unit):
+    """
+    Record the timing of a benchmark and print it
+    :param results: map of the form {name: result}
+    :param name:
+    :param seconds:
+    :param count: number of items processed
+    :param unit: name of the items, e.g. tokens
+    :return: the result
+    """
+    result = {"seconds": round(seconds, 6), "count": count, "unit": unit,
+              "per_second": round(count / seconds, 1) if seconds > 0 else None}
+    results.update({name: result})
+    print("%-24s %10.4f seconds %12s %s/second" % (name, seconds, result["per_second"], unit))
+    return result
+
+
+def parse_collection(collection):
+    return list(read_documents(collection))
+
+
+def tokenize_documents(documents):
+    return [[token for field, text in fields for token in tokenize(text)] for doc_id, fields in documents]
+
+
+def remove_stopwords(document_tokens):
+    return [[token for token in tokens if token not in stopwords] for tokens in document_tokens]
+
+
+def lemmatize_documents(document_terms):
+    # A new cache for every run, as in a run of IndexBuilding.py without term_cache_path
+    lemmatizer = CachedLemmatizer(WordNetLemmatizer(), LRUCache(100000))
+    return [[lemmatizer.lemmatize(term) for term in terms] for terms in document_terms]
+
+
+def stem_documents(document_terms):
+    stemmer = CachedStemmer(StatelessPorterStemmer(), LRUCache(100000))
+    return [stemmer.stem_many(terms) for terms in document_terms]
+
+
+def build_unsorted_index(document_terms, doclens):
+    index_unsorted = {}
+    for doc_id in range(1, len(document_terms) + 1):
+        index_unsorted, max_tf = get_unsorted_index(index_unsorted, document_terms[doc_id - 1], doc_id,
+                                                    doclens[doc_id - 1])
+    return index_unsorted
+
+
+def generate_index(index_unsorted, block_size, index_flag):
+    """
+    Same stages as generate_index of IndexBuilding.py: sort the terms, then compress the index
+    :param index_unsorted:
+    :param block_size:
+    :param index_flag:
+    :return: index, index_compressed
+    """
+    index = dict(sorted(index_unsorted.items()))
+    index_compressed, key_str, max_df_list, min_df_list = compress_index(index, block_size, index_flag)
+    return index, index_compressed
+
+
+def encode_gaps(index, encode):
+    """
+    Bit code the doc_id gaps of all the posting lists of an index
+    :param index:
+    :param encode: encode_gamma or encode_delta
+    :return: number of bytes
+    """
+    writer = BitWriter()
+    for key in index:
+        for gap in get_gaps(index[key].doc_ids):
+            encode(writer, gap)
+    return len(writer.get_bytes())
+
+
+def read_queries(path):
+    """
+    Parse a queries file in the format of hw3.queries
+    :param path:
+    :return: list of queries
+    """
+    queries = []
+    query_lines = open(path, "r").read().split("\n")
+    i = 0
+    while i < len(query_lines):
+        if query_lines[i].startswith("Q"):
+            i += 1
+            curr_query = []
+            while i < len(query_lines) and query_lines[i] != "":
+                curr_query.append(query_lines[i])
+                i += 1
+            queries.append(" ".join(curr_query))
+        i += 1
+    return queries
+
+
+def compare_results(results, baseline, tolerance):
+    """
+    Compare the timings against the baseline
+    :param results:
+    :param baseline: results of an earlier run
+    :param tolerance: allowed slowdown, e.g. 0.25 for 25%
+    :return: list of names of the benchmarks that regressed
+    """
+    regressions = []
+    for name in results:
+        if name not in baseline or not baseline[name]["seconds"]:
+            continue
+        ratio = results[name]["seconds"] / baseline[name]["seconds"]
+        status = "ok"
+        if ratio > 1 + tolerance:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            status = "faster"
+        print("%-24s %10.4f seconds, baseline %10.4f seconds, %6.2fx  %s" %
+              (name, results[name]["seconds"], baseline[name]["seconds"], ratio, status))
+    return regressions
+
+
+# The program starts here
+corpus_directory = os.path.join(benchmark_directory, "corpus_1k")  # Change to the output of generate_corpus.py
+repeat = 3  # Number of runs of every benchmark, the fastest one is kept
+results_path = "benchmark_results.json"  # Change to point to the file the results are written to
+baseline_path = "benchmark_baseline.json"  # Change to point to the stored baseline results
+update_baseline = False  # Change to True to store the results of this run as the new baseline
+tolerance = 0.25  # A benchmark more than 25% slower than the baseline is reported as a regression
+
+collection = sorted(glob.glob(os.path.join(corpus_directory, "Cranfield", "*")))
+stopwords_file = open(os.path.join(corpus_directory, "stopwords"), "r")
+stopwords = frozenset(word.strip() for word in stopwords_file)
+stopwords_file.close()
+queries = read_queries(os.path.join(corpus_directory, "queries"))
+
+results = {}
+documents, seconds = time_best(lambda: parse_collection(collection), repeat)
+add_result(results, "parse", seconds, len(documents), "documents")
+
+document_tokens, seconds = time_best(lambda: tokenize_documents(documents), repeat)
+num_tokens = sum(len(tokens) for tokens in document_tokens)
+add_result(results, "tokenization", seconds, num_tokens, "tokens")
+
+document_terms, seconds = time_best(lambda: remove_stopwords(document_tokens), repeat)
+num_terms = sum(len(terms) for terms in document_terms)
+add_result(results, "stopword_removal", seconds, num_tokens, "tokens")
+
+document_stems, seconds = time_best(lambda: stem_documents(document_terms), repeat)
+add_result(results, "stemming", seconds, num_terms, "terms")
+
+document_lemmas, seconds = time_best(lambda: lemmatize_documents(document_terms), repeat)
+add_result(results, "lemmatization", seconds, num_terms, "terms")
+
+# doclen counts the stopwords as well, as in IndexBuilding.py
+doclens = [len(tokens) for tokens in document_tokens]
+index1_unsorted, seconds = time_best(lambda: build_unsorted_index(document_lemmas, doclens), repeat)
+num_postings1 = sum(len(posting_list) for posting_list in index1_unsorted.values())
+add_result(results, "get_unsorted_index", seconds, num_postings1, "postings")
+index2_unsorted = build_unsorted_index(document_stems, doclens)
+num_postings2 = sum(len(posting_list) for posting_list in index2_unsorted.values())
+
+(index1, index1_compressed), seconds = time_best(lambda: generate_index(index1_unsorted, 4, 1), repeat)
+add_result(results, "generate_index_version1", seconds, num_postings1, "postings")
+(index2, index2_compressed), seconds = time_best(lambda: generate_index(index2_unsorted, 8, 2), repeat)
+add_result(results, "generate_index_version2", seconds, num_postings2, "postings")
+
+num_bytes, seconds = time_best(lambda: encode_gaps(index1, encode_gamma), repeat)
+add_result(results, "gamma_encoding", seconds, num_postings1, "postings")["bytes"] = num_bytes
+num_bytes, seconds = time_best(lambda: encode_gaps(index1, encode_delta), repeat)
+add_result(results, "delta_encoding", seconds, num_postings1, "postings")["bytes"] = num_bytes
+
+# Decoding of the compressed postings of index 1 with every codec, compare_codecs keeps the fastest of repeat runs
+for name, num_bytes, bytes_per_posting, seconds, per_second, round_trip_ok in compare_codecs(
+        [(list(index1[key].doc_ids), list(index1[key].tfs)) for key in index1], 4, repeat):
+    add_result(results, "decode_" + name, seconds, num_postings1, "postings")["bytes"] = num_bytes
+
+# Weight the lemma index as RankedRetrieval.py does
+collection_size = len(documents)
+avg_doclen = sum(doclens) // collection_size
+(document_weight_vector_1, document_weight_vector_2), seconds = time_best(
+    lambda: generate_weight_vector_map(index1, collection_size, avg_doclen), 1)
+add_result(results, "weighting", seconds, num_postings1, "postings")
+weight_index_1 = generate_weight_index(document_weight_vector_1)
+weight_index_2 = generate_weight_index(document_weight_vector_2)
+
+# Query latency of the ranking done by get_top5_documents, printing excluded
+lemmatizer = CachedLemmatizer(WordNetLemmatizer(), LRUCache(100000))
+query_index = {}
+total_query_len = 0
+for query_id in range(1, len(queries) + 1):
+    query_terms = [lemmatizer.lemmatize(token) for token in tokenize(queries[query_id - 1]) if token not in stopwords]
+    total_query_len += len(query_terms)
+    if query_terms:
+        query_index, max_tf = get_unsorted_index(query_index, query_terms, query_id, len(query_terms))
+query_weight_vector_1, query_weight_vector_2 = generate_weight_vector_map(
+    dict(sorted(query_index.items())), len(queries), max(1, total_query_len // len(queries)))
+
+for name, query_weight_vector, weight_index in (("query_w1", query_weight_vector_1, weight_index_1),
+                                                ("query_w2", query_weight_vector_2, weight_index_2)):
+    latencies = []
+    for query_id in query_weight_vector:
+        ranking, seconds = time_best(lambda: score_term_at_a_time(query_weight_vector[query_id], weight_index,
+                                                                  collection_size, 5), repeat)
+        latencies.append(seconds)
+    result = add_result(results, name, sum(latencies), len(latencies), "queries")
+    result["mean_ms"] = round(1000 * sum(latencies) / len(latencies), 4)
+    result["p50_ms"] = round(1000 * get_percentile(latencies, 50), 4)
+    result["p95_ms"] = round(1000 * get_percentile(latencies, 95), 4)
+    print("%-24s mean %s ms, p50 %s ms, p95 %s ms" % ("", result["mean_ms"], result["p50_ms"], result["p95_ms"]))
+
+# The report describes the collection, so that results of different collections are not compared
+report = {"corpus": {"directory": corpus_directory, "documents": len(documents), "tokens": num_tokens,
+                     "terms": num_terms, "queries": len(queries)},
+          "python": platform.python_version(), "repeat": repeat, "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+          "results": results}
+results_op = open(results_path, "w")
+json.dump(report, results_op, indent=2, sort_keys=True)
+results_op.close()
+print("Results written to", results_path)
+
+regressions = []
+if update_baseline:
+    baseline_op = open(baseline_path, "w")
+    json.dump(report, baseline_op, indent=2, sort_keys=True)
+    baseline_op.close()
+    print("Baseline written to", baseline_path)
+elif os.path.exists(baseline_path):
+    baseline_ip = open(baseline_path, "r")
+    baseline = json.load(baseline_ip)
+    baseline_ip.close()
+    if baseline["corpus"]["documents"] != len(documents) or baseline["corpus"]["tokens"] != num_tokens:
+        print("The baseline was measured on a different collection, it is not compared")
+    else:
+        regressions = compare_results(results, baseline["results"], tolerance)
+        print("%s regressions out of %s benchmarks" % (len(regressions), len(results)))
+else:
+    print("No baseline found at", baseline_path)
+
+if regressions:
+    sys.exit(1)
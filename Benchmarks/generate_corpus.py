@@ -0,0 +1,152 @@
+"""
+Author: Anshul Pardhi
+The program generates a synthetic collection in the Cranfield format for the benchmarks, at any number of documents.
+Words are drawn from a Zipfian distribution over the stopwords followed by a generated vocabulary, so the most frequent
+words are stopwords as in the Cranfield collection
+"""
+
+import os
+import math
+import random
+from itertools import accumulate
+
+CORPUS_SIZES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+
+SYLLABLES = ["ba", "ca", "de", "fi", "go", "hu", "ka", "la", "me", "no", "pa", "qui", "ra", "se", "ti", "vo", "wa",
+             "xe", "yo", "ze", "an", "er", "in", "on", "ur", "str", "pl", "tr", "fl", "gr", "sh", "th"]
+# Suffixes give the stemmer and the lemmatizer some work, the empty suffix is the most common
+SUFFIXES = ["", "", "", "", "s", "es", "ed", "ing", "ation", "ations", "ness", "ful", "ly", "er", "ies", "ment",
+            "ive", "ity", "al", "ize"]
+# Tokens exercising the tokenizer: numbers, abbreviations and hyphenated words
+SPECIAL_WORDS = ["3.5", "1958", "0.02", "u.s.a.", "n.a.c.a.", "x-ray", "skin-friction", "two-dimensional", "m=2",
+                 "(1)", "10,000"]
+# Terms whose posting lists IndexBuilding.py prints, they must be in the collection
+QUERY_WORDS = ["reynolds", "prandtl", "flow", "pressure", "boundary", "shock", "nasa"]
+
+
+def generate_vocabulary(size, seed):
+    """
+    Generate distinct words made of random syllables and suffixes
+    :param size: number of words
+    :param seed:
+    :return: list of words
+    """
+    generator = random.Random(seed)
+    words = []
+    seen = set()
+    while len(words) < size:
+        root = "".join(generator.choice(SYLLABLES) for i in range(generator.randint(1, 4)))
+        word = root + generator.choice(SUFFIXES)
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def get_vocabulary_size(num_documents, avg_doclen):
+    """
+    Estimate the vocabulary of a collection with Heaps' law, fitted to the Cranfield collection
+    (about 9000 distinct words in 230000 tokens)
+    :param num_documents:
+    :param avg_doclen:
+    :return: vocabulary size
+    """
+    return int(19 * math.sqrt(num_documents * avg_doclen))
+
+
+class ZipfSampler:
+    """
+    Draws words with probability proportional to 1 / rank^exponent
+    """
+
+    def __init__(self, words, exponent, seed):
+        """
+        :param words: words in rank order
+        :param exponent:
+        :param seed:
+        """
+        self.words = words
+        self.cum_weights = list(accumulate(1.0 / (rank ** exponent) for rank in range(1, len(words) + 1)))
+        self.generator = random.Random(seed)
+
+    def sample(self, n):
+        """
+        :param n:
+        :return: list of n words
+        """
+        return self.generator.choices(self.words, cum_weights=self.cum_weights, k=n)
+
+
+def get_lines(words, words_per_line=9):
+    """
+    Break a list of words into lines, like the text of the Cranfield documents
+    :param words:
+    :param words_per_line:
+    :return: text
+    """
+    return "\n".join(" ".join(words[i:i + words_per_line]) for i in range(0, len(words), words_per_line))
+
+
+def generate_document(doc_id, sampler, generator):
+    """
+    Generate one document in the Cranfield format
+    :param doc_id:
+    :param sampler:
+    :param generator: random generator of the document lengths
+    :return: document text
+    """
+    title = sampler.sample(generator.randint(min_title_len, max_title_len))
+    text = sampler.sample(generator.randint(min_text_len, max_text_len))
+    return "<DOC>\n<DOCNO>\n%s\n</DOCNO>\n<TITLE>\n%s\n</TITLE>\n<AUTHOR>\n%s\n</AUTHOR>\n<BIBLIO>\n%s\n</BIBLIO>\n" \
+           "<TEXT>\n%s .\n</TEXT>\n</DOC>\n" % (doc_id, get_lines(title), " ".join(sampler.sample(2)) + ",a.",
+                                            "j. ae. sc. %s, %s, %s." % (doc_id % 30, 1950 + doc_id % 10, doc_id % 997),
+                                            get_lines(text))
+
+
+# The program starts here
+corpus_size = "1k"  # Change to "100k" or "1m", or set num_documents directly
+num_documents = CORPUS_SIZES[corpus_size]
+output_directory = "corpus_" + corpus_size  # Change to point to the directory of the generated collection
+docs_per_file = 1 if num_documents <= 10000 else 1000  # Change to the number of documents written to each file
+num_queries = 225  # Number of queries written to the queries file, as many as in the Cranfield collection
+min_title_len, max_title_len = 4, 16  # Number of words of a title
+min_text_len, max_text_len = 40, 280  # Number of words of a text
+zipf_exponent = 1.0
+seed = 6322  # The same seed and parameters generate the same collection
+
+# The stopwords file is copied into the generated collection
+stopwords_file = open("/people/cs/s/sanda/cs6322/resourcesIR/stopwords", "r")
+#stopwords_file = open("stopwords", "r")  # Change to point to the respective stopwords file location
+stopwords = [word.strip() for word in stopwords_file if word.strip()]
+stopwords_file.close()
+
+avg_doclen = (min_title_len + max_title_len + min_text_len + max_text_len) // 2
+vocabulary = stopwords + SPECIAL_WORDS + QUERY_WORDS + \
+    generate_vocabulary(get_vocabulary_size(num_documents, avg_doclen), seed)
+sampler = ZipfSampler(vocabulary, zipf_exponent, seed)
+length_generator = random.Random(seed + 1)
+
+os.makedirs(os.path.join(output_directory, "Cranfield"), exist_ok=True)
+stopwords_op = open(os.path.join(output_directory, "stopwords"), "w")
+stopwords_op.write("\n".join(stopwords) + "\n")
+stopwords_op.close()
+
+# Documents are numbered from 1, a file holds docs_per_file consecutive documents
+num_files = (num_documents + docs_per_file - 1) // docs_per_file
+file_name_width = max(4, len(str(num_files)))
+for file_no in range(num_files):
+    first_doc_id = file_no * docs_per_file + 1
+    last_doc_id = min(num_documents, first_doc_id + docs_per_file - 1)
+    file_op = open(os.path.join(output_directory, "Cranfield", "cranfield%0*d" % (file_name_width, file_no + 1)), "w")
+    for doc_id in range(first_doc_id, last_doc_id + 1):
+        file_op.write(generate_document(doc_id, sampler, length_generator))
+    file_op.close()
+
+# Queries are written in the format of the hw3.queries file
+queries_op = open(os.path.join(output_directory, "queries"), "w")
+for query_id in range(1, num_queries + 1):
+    queries_op.write("Q%s\n%s\n\n" % (query_id, get_lines(sampler.sample(length_generator.randint(4, 20)))))
+queries_op.close()
+
+print("Generated %s documents in %s files, with a vocabulary of %s words, in %s" %
+      (num_documents, num_files, len(vocabulary), output_directory))
@@ -4,206 +4,49 @@ The program performs creates ucompressed and compressed indexes from a set of
 lemmatized and stemmed tokens from Cranfield document collection
 """
 
+import os
 import sys
 import time
 import glob
-import re
-import xml.etree.ElementTree as et
-from collections import Counter
-from porter_stemmer_tartarus import PorterStemmer
-from nltk.stem import WordNetLemmatizer
 from collections import OrderedDict
-
-
-def get_unsorted_index(index_unsorted, word_list, doc_id_counter, doclen):
-    """
-    Update the unsorted index posting list and get max_tf
-    :param index_unsorted:
-    :param word_list:
-    :param doc_id_counter:
-    :param doclen:
-    :return: index_unsorted, max_tf
-    """
-    count = Counter(word_list)
-    max_tf = count.most_common(1)[0][1]
-    for counts in count.items():
-        # Add -> to separate different documents inside the posting list
-        # Posting list is of the form doc_id1:tf1:max_tf1:doclen1->doc_id2:tf2:max_tf2:doclen2 and so on
-        if counts[0] in index_unsorted:
-            index_unsorted.update({counts[0]: str(index_unsorted.get(counts[0])) + "->" + str(
-                doc_id_counter) + ":" + str(counts[1]) + ":" + str(max_tf) + ":" + str(doclen)})
-        else:
-            index_unsorted.update(
-                {counts[0]: str(doc_id_counter) + ":" + str(counts[1]) + ":" + str(max_tf) + ":" + str(doclen)})
-    return index_unsorted, max_tf
-
-
-def get_gamma_code(input_val):
-    """
-    Performs gamma encoding on the input string
-    :param input_val:
-    :return: gamma coded string
-    """
-    bin_val = bin(int(input_val)).replace("0b", "")
-    offset = str(bin_val[1:])
-    unary = ""
-    for i in range(len(offset)):
-        unary += "1"
-    unary += "0"
-    return unary + offset
-
-
-def get_delta_code(input_val):
-    """
-    Performs delta encoding on the input string
-    :param input_val:
-    :return: delta coded string
-    """
-    bin_val = bin(int(input_val)).replace("0b", "")
-    length = get_gamma_code(len(str(bin_val)))
-    offset = str(bin_val[1:])
-    return length + offset
-
-
-def get_common_prefix(input_arr):
-    """
-    Get common prefix for a particular block for front coding
-    :param input_arr:
-    :return: common prefix
-    """
-    input_arr.sort(reverse=False)
-    str1 = input_arr[0]
-    str2 = input_arr[len(input_arr) - 1]
-    len1 = len(str1)
-    len2 = len(str2)
-    prefix = ""
-    i = 0
-    j = 0
-    while i < len1 and j < len2:
-        if str1[i] != str2[j]:
-            break
-        prefix += str1[i]
-        i += 1
-        j += 1
-    return prefix
-
-
-def get_front_coding_key_str(front_coding_list, key_str):
-    """
-    Generate front coded string for a particular block
-    :param front_coding_list:
-    :param key_str:
-    :return: key_str
-    """
-    common_prefix = get_common_prefix(front_coding_list)
-    # Key string is of the form len(common_prefix)common_prefix*remaining_first_word+len(remaining_word)<>remaining_word
-    # and so on
-    if common_prefix != "":
-        remaining_first_word = front_coding_list[0].split(common_prefix, 1)[1]
-        if remaining_first_word != "":
-            key_str += str(len(front_coding_list[0])) + str(common_prefix) + "*" + str(remaining_first_word)
-        else:
-            key_str += str(len(common_prefix)) + str(common_prefix) + "*"
-
-    for word in front_coding_list:
-        if common_prefix == "":
-            key_str += str(len(word)) + str(word)
-        else:
-            if word != front_coding_list[0]:
-                remaining_word = word.split(common_prefix, 1)[1]
-                key_str += str(len(remaining_word)) + "<>" + str(remaining_word)
-    return key_str
-
-
-def generate_index(index_unsorted, block_size, index_flag):
+from postings_codecs import compare_codecs
+from index_compression import compress_index
+from compressed_index import CompressedIndex, DocumentNorms, get_block_offsets, write_compressed_header, \
+    write_compressed_doc_stats
+from binary_index import BinaryIndex, DocStats, write_binary_index, read_generation, write_generation
+from positional_index import PositionalIndex, write_positional_index
+from ingestion import build_partial_index, build_index_parallel, lemma_cache, stem_cache, document_cache
+from spimi import build_indexes_spimi
+from build_metrics import BuildMetrics
+from memory_accounting import get_deep_size, get_index_size, get_compressed_index_size, format_sizes
+
+
+def generate_index(index_unsorted, block_size, index_flag, codec=None):
     """
     A generic method to build all 4 types of indexes: compressed and uncompressed indexes using lemmatization and stemming
     :param index_unsorted:
     :param block_size:
     :param index_flag: 1:lemmatiztion; 2: stemming
+    :param codec: name of the postings codec of the compressed index, see postings_codecs.py
     :return: index, index_compressed, key_str, max_df_list, min_df_list
     """
-    index = OrderedDict(sorted(index_unsorted.items()))
-    index_compressed = []
-    key_str = ""
-    i = -1
-    front_coding_list = []
-    max_cnt = 0
-    min_cnt = 1
-    max_df_list = []
-    min_df_list = []
+    # The elapsed times are measured from the start of this version, the analysis of the collection is not included
+    generate_start_time = time.time()
 
     # Generate uncompressed index
-    for key in index:
-        i += 1
-        val = index[key]
-        cnt = val.count('->') + 1  # df
-        if cnt > max_cnt:
-            max_cnt = cnt
-        # Index is of the form {word:    df    posting_list(doc_id:tf:max_tf:doclen)
-        index.update({key: str(cnt) + "\t" + val})
-
-    elapsed_time_index_uncompressed = round(time.time() - start_time, 2)
+    # Index is of the form {word: posting_list(doc_id, tf, max_tf, doclen)}, the df is the length of the posting list
+    with metrics.stage("sort"):
+        index = OrderedDict(sorted(index_unsorted.items()))
+
+    elapsed_time_index_uncompressed = round(time.time() - generate_start_time, 2)
     print("Elapsed time to build index version %s uncompressed: %s seconds" %
           (index_flag, elapsed_time_index_uncompressed))
 
     # Generate compressed index
-    i = -1
-    for key in index:
-        i += 1
-        val = index[key]
-        cnt = val.count('->') + 1  # df
-
-        if cnt == max_cnt:
-            max_df_list.append(key + ":" + str(max_cnt))
-        elif cnt == min_cnt:
-            min_df_list.append(key + ":" + str(min_cnt))
-
-        # Compress the dictionary term
-        curr_ind = len(key_str)
-        if index_flag == 1:
-            # Use blocked compression to generated compressed key string
-            key_str += str(len(key)) + str(key)
-        elif index_flag == 2:
-            # Use front coding to generate compressed key string
-            if i % block_size == 0:
-                if len(front_coding_list) > 0:
-                    key_str = get_front_coding_key_str(front_coding_list, key_str)
-                front_coding_list[:] = []
-            front_coding_list.append(key)
-
-        # Compress the postings list
-        individual_posting = val.split('\t')[1].split('->')
-        gap = 0
-        val_str = ""
-        for block_term_posting in individual_posting:
-            block_terms = block_term_posting.split(':')
-            if val_str == "":
-                gap = block_terms[0]
-            else:
-                gap = int(block_terms[0]) - int(gap)
-
-            if index_flag == 1:
-                # Use gamma encoding to generate compressed postings list
-                val_str += get_gamma_code(gap)
-            elif index_flag == 2:
-                # Use delta encoding to generate compressed postings list
-                val_str += get_delta_code(gap)
-
-        # Update the compressed index with a new entry
-        if i % block_size == 0:
-            # Compressed index is of the form {df:encoded_posting_list:string_index_of_key_str}
-            index_compressed.append(str(cnt) + ":" + str(val_str) + ":" + str(curr_ind))
-        else:
-            # Compressed index is of the form {df:encoded_posting_list}
-            index_compressed.append(str(cnt) + ":" + str(val_str))
-
-    # Add the remaining terms of the last block to the front coded key string
-    if index_flag == 2:
-        if len(front_coding_list) > 0:
-            key_str = get_front_coding_key_str(front_coding_list, key_str)
-
-    elapsed_time_index_compressed = round(time.time() - start_time, 2)
+    with metrics.stage("encode"):
+        index_compressed, key_str, max_df_list, min_df_list = compress_index(index, block_size, index_flag, codec)
+
+    elapsed_time_index_compressed = round(time.time() - generate_start_time, 2)
     print("Elapsed time to build index version %s compressed: %s seconds" % (index_flag, elapsed_time_index_compressed))
 
     return index, index_compressed, key_str, max_df_list, min_df_list
@@ -211,131 +54,252 @@ def generate_index(index_unsorted, block_size, index_flag):
 
 # The program starts here
 start_time = time.time()
+metrics = BuildMetrics()  # Wall and CPU time of every stage of the build and throughput counters
+metrics_path = "Index_metrics.json"  # Change to point to the JSON metrics report of the build, or to None
+profile_path = None  # Change to a file path to save a cProfile profile of the build
+if profile_path is not None:
+    metrics.start_profile()
+trace_memory = False  # Change to True to trace the memory allocated by every stage with tracemalloc (slower)
+if trace_memory:
+    metrics.start_memory_tracing()
 directory = "/people/cs/s/sanda/cs6322/Cranfield/*"  # Change to point to the respective directory
 #directory = "Cranfield/*"  # Change to point to the respective directory
 collection = glob.glob(directory)
 
 # Add stopwords from the given file containing the list of stopwords
-stopwords = []
 stopwords_file = open("/people/cs/s/sanda/cs6322/resourcesIR/stopwords", "r")
 #stopwords_file = open("stopwords", "r") # Change to point to the respective stopwords file location
-for word in stopwords_file:
-    stopwords.append(word.strip("\n"))
+stopwords = frozenset(word.strip() for word in stopwords_file)  # Set of stopwords, looked up once per token
 stopwords_file.close()
 
-index1_unsorted = {}
-index2_unsorted = {}
-
-doc_id_counter = 0
+# The indexes are built within a memory budget if they do not fit in memory, see README.txt
+memory_budget = None  # Change to a number of bytes to build the indexes SPIMI style within that memory budget
+
+# Lemmas and stems are memoized, the caches can be kept between runs
+term_cache_path = None  # Change to a file path prefix to save the lemma and stem caches and load them in the next run
+metrics.mark()
+if term_cache_path is not None:
+    lemma_cache.load(term_cache_path + ".lemmas")
+    stem_cache.load(term_cache_path + ".stems")
+
+# Analyzed documents can be kept between runs, so that only the changed Cranfield files are analyzed again
+document_cache_path = None  # Change to a file path to save the analyzed documents and reuse them in the next run
+# The document cache holds every analyzed document in memory, so it is not used within a memory budget
+if document_cache_path is not None and memory_budget is not None:
+    print("document_cache_path is not used with memory_budget")
+    document_cache_path = None
+if document_cache_path is not None:
+    document_cache.load(document_cache_path)
+metrics.lap("cache")
+
+# Analyze the collection into the unsorted lemma (index 1) and stem (index 2) indexes
+num_processes = 1  # Change to the number of worker processes to analyze the collection in parallel
+# Codec of the compressed postings of each index version, read back with the same codec
+postings_codecs = {1: "gamma", 2: "delta"}  # Change to "vbyte", "simple8b" or "pfordelta" (these need NumPy)
+compare_postings_codecs = False  # Change to True to compare the size and decode speed of every codec on the indexes
+# Positional index of the lemmas for phrase and proximity queries, not built with a memory budget
+build_positional_index = False  # Change to True to also write the positional index files of index version 1
+positional_index_flag = 2  # Change to 1 to gamma code the positional index instead of delta
+positional_unsorted = None
+if memory_budget is not None:
+    # The indexes are written to their files while they are built, as they may not fit in memory
+    (key_str1, max_df1, min_df1), (key_str2, max_df2, min_df2) = \
+        build_indexes_spimi(collection, stopwords, memory_budget, metrics=metrics, postings_codecs=postings_codecs)
+    # The doc stats are not held in memory either, they are read from the doc stats file
+    doc_stats2 = DocStats('Index_Version2.docs')
+elif num_processes > 1:
+    index1_unsorted, index2_unsorted, doc_stats1, doc_stats2, title_map, positional_unsorted = build_index_parallel(
+        collection, stopwords, num_processes, metrics=metrics, positional=build_positional_index)
+else:
+    index1_unsorted, index2_unsorted, doc_stats1, doc_stats2, title_map, positional_unsorted = build_partial_index(
+        (1, collection, stopwords, build_positional_index), metrics)
+metrics.snapshot("ingestion")
+
+metrics.mark()
+if term_cache_path is not None:
+    lemma_cache.save(term_cache_path + ".lemmas")
+    stem_cache.save(term_cache_path + ".stems")
+if document_cache_path is not None:
+    document_cache.save()
+metrics.lap("cache")
+
+doc_id_counter = len(doc_stats2)
 doc_max_tf = 0
 max_doclen = 0
 doc_max_tf_id = 0
 max_doclen_id = 0
 
-# Repeat for every file in the collection
-for file in collection:
-    root = et.parse(file)
-    doc_id_counter += 1
-    tokens = []
-    doclen = 0
-
-    # Repeat for all child DOM elements
-    for values in root.findall('*'):
-        sgml_values = values.text  # Get the value
-        sgml_values = sgml_values.strip()  # Remove preceding and trailing spaces
-        sgml_values = sgml_values.replace("\n", " ")  # Remove the end of line escape character
-        sgml_values = re.sub(r'[^a-zA-Z0-9.\s]', ' ', sgml_values)  # Replace all non-alphanumeric characters with space
-        sgml_values = re.sub(r'[^a-zA-Z0-9\s]', '', sgml_values)  # Remove all dots, e.g. U.S.A. becomes USA
-        sgml_values = sgml_values.lower()  # Convert all letters to lowercase
-        token_list = sgml_values.split()  # Split individual words on spaces
-        doclen += len(token_list)
-        for token in token_list:
-            if token not in stopwords:
-                tokens.append(token)  # Append every split word to the list of tokens
-
-    # Perform lemmatization
-    lemmatizer = WordNetLemmatizer()
-    lemma_list = []
-    for token in tokens:
-        lemmatized_token = lemmatizer.lemmatize(token)
-        lemma_list.append(lemmatized_token)
-
-    # Create unsorted index 1
-    index1_unsorted, curr_max_tf = get_unsorted_index(index1_unsorted, lemma_list, doc_id_counter, doclen)
-
-    # Perform stemming
-    stemmer = PorterStemmer()
-    stem_list = []
-    for token in tokens:
-        stemmed_token = stemmer.stem(token, 0, len(token) - 1)
-        stem_list.append(stemmed_token)
-
-    # Create unsorted index 2
-    index2_unsorted, curr_max_tf = get_unsorted_index(index2_unsorted, stem_list, doc_id_counter, doclen)
+for doc_id in range(1, doc_id_counter + 1):
+    curr_max_tf, doclen = doc_stats2[doc_id - 1]
 
     # Get the document with maximum max_tf
     if curr_max_tf > doc_max_tf:
         doc_max_tf = curr_max_tf
-        doc_max_tf_id = doc_id_counter
+        doc_max_tf_id = doc_id
 
     # Get the document with maximum doclen
     if doclen > max_doclen:
         max_doclen = doclen
-        max_doclen_id = doc_id_counter
-
-# Generate uncompressed and compressed versions of index 1 using lemmatization and a block size of 4
-index1, index1_compressed, key_str1, max_df1, min_df1 = generate_index(index1_unsorted, 4, 1)
-
-# Generate uncompressed and compressed versions of index 2 using stemming and a block size of 8
-index2, index2_compressed, key_str2, max_df2, min_df2 = generate_index(index2_unsorted, 8, 2)
-
-# Write all 4 generated indexes to different files
-
-index1_op = open('Index_Version1.uncompress.txt', 'w')
-for entry in index1:
-    index1_op.writelines(entry + "\t" + index1[entry] + "\n")
-index1_op.close()
-
-index1_comp_op = open('Index_Version1.compressed.txt', 'w')
-index1_comp_op.write(key_str1 + "\n")
-for entry in index1_compressed:
-    index1_comp_op.write(entry + "\n")
-index1_comp_op.close()
-
-index2_op = open('Index_Version2.uncompress.txt', 'w')
-for entry in index2:
-    index2_op.writelines(entry + "\t" + index2[entry] + "\n")
-index2_op.close()
-
-index2_comp_op = open('Index_Version2.compressed.txt', 'w')
-index2_comp_op.write(key_str2 + "\n")
-for entry in index2_compressed:
-    index2_comp_op.write(entry + "\n")
-index2_comp_op.close()
+        max_doclen_id = doc_id
+metrics.lap("statistics")
+
+if memory_budget is None:
+    # Generate uncompressed and compressed versions of index 1 using lemmatization and a block size of 4
+    index1, index1_compressed, key_str1, max_df1, min_df1 = generate_index(index1_unsorted, 4, 1, postings_codecs[1])
+
+    # Generate uncompressed and compressed versions of index 2 using stemming and a block size of 8
+    index2, index2_compressed, key_str2, max_df2, min_df2 = generate_index(index2_unsorted, 8, 2, postings_codecs[2])
+    metrics.snapshot("generate_index")
+
+    # Write all 4 generated indexes to different files
+    metrics.mark()
+
+    index1_op = open('Index_Version1.uncompress.txt', 'w')
+    for entry in index1:
+        # Each line is of the form word    df    posting_list(doc_id:tf:max_tf:doclen)
+        index1_op.writelines(entry + "\t" + str(len(index1[entry])) + "\t" + index1[entry].to_string() + "\n")
+    index1_op.close()
+
+    # The compressed index is binary: a header, the key string and the block offsets, followed by the byte aligned
+    # postings entries
+    index1_comp_op = open('Index_Version1.compressed.bin', 'wb')
+    write_compressed_header(index1_comp_op, key_str1, get_block_offsets(index1_compressed, 4), 4, 1, postings_codecs[1])
+    for entry in index1_compressed:
+        index1_comp_op.write(entry)
+    index1_comp_op.close()
+
+    index2_op = open('Index_Version2.uncompress.txt', 'w')
+    for entry in index2:
+        # Each line is of the form word    df    posting_list(doc_id:tf:max_tf:doclen)
+        index2_op.writelines(entry + "\t" + str(len(index2[entry])) + "\t" + index2[entry].to_string() + "\n")
+    index2_op.close()
+
+    # The compressed index is binary: a header, the key string and the block offsets, followed by the byte aligned
+    # postings entries
+    index2_comp_op = open('Index_Version2.compressed.bin', 'wb')
+    write_compressed_header(index2_comp_op, key_str2, get_block_offsets(index2_compressed, 8), 8, 2, postings_codecs[2])
+    for entry in index2_compressed:
+        index2_comp_op.write(entry)
+    index2_comp_op.close()
+
+    # The doc stats of the compressed and binary indexes hold the lengths of the document vectors, to rank off them
+    # without weighting every document first
+    for prefix, index, doc_stats in (('Index_Version1', index1, doc_stats1), ('Index_Version2', index2, doc_stats2)):
+        norms = DocumentNorms(doc_stats)
+        for key in index:
+            norms.add(index[key])
+        # Write the index in the binary format that RankedRetrieval.py memory maps instead of rebuilding the index
+        write_binary_index(prefix, index, doc_stats, title_map, norms)
+        write_compressed_doc_stats(prefix)
+        # A running QueryServer.py reopens the index files when their generation changes
+        write_generation(prefix, read_generation(prefix) + 1)
+
+    if positional_unsorted is not None:
+        positional_index = OrderedDict(sorted(positional_unsorted.items()))
+        positions_bytes, position_gap_bits = write_positional_index('Index_Version1', positional_index,
+                                                                    positional_index_flag)
+    metrics.lap("write")
+    metrics.snapshot("write")
+else:
+    # Read the written indexes back from the binary index files for the statistics
+    index1 = BinaryIndex('Index_Version1')
+    index2 = BinaryIndex('Index_Version2')
 
 # Generate some statistics for the generated indexes
 
-print("Size of index version 1 uncompressed: ", sys.getsizeof(index1), "bytes")
-print("Size of index version 1 compressed: ", sys.getsizeof(index1_compressed), "bytes")
-print("Size of index version 2 uncompressed: ", sys.getsizeof(index2), "bytes")
-print("Size of index version 2 compressed: ", sys.getsizeof(index2_compressed), "bytes")
+if memory_budget is None:
+    # Deep sizes, counting the terms, posting lists and byte strings the indexes refer to
+    for index_flag, index, index_compressed, key_str in ((1, index1, index1_compressed, key_str1),
+                                                         (2, index2, index2_compressed, key_str2)):
+        index_size = get_index_size(index)
+        compressed_size = get_compressed_index_size(index_compressed, key_str)
+        metrics.add_structure_size("index version %s uncompressed" % index_flag, index_size)
+        metrics.add_structure_size("index version %s compressed" % index_flag, compressed_size)
+        print("Size of index version %s uncompressed: %s bytes (%s)" %
+              (index_flag, index_size["total"], format_sizes(index_size)))
+        print("Size of index version %s compressed: %s bytes (%s)" %
+              (index_flag, compressed_size["total"], format_sizes(compressed_size)))
+    metrics.add_structure_size("doc stats", {"total": get_deep_size((doc_stats1, doc_stats2))})
+    metrics.add_structure_size("titles", {"total": get_deep_size(title_map)})
+else:
+    # The indexes are not held in memory, report the size of their files instead
+    for index_flag in (1, 2):
+        print("Size of index version %s uncompressed: %s bytes on disk" %
+              (index_flag, os.path.getsize('Index_Version%s.uncompress.txt' % index_flag)))
+        print("Size of index version %s compressed: %s bytes on disk" %
+              (index_flag, os.path.getsize('Index_Version%s.compressed.bin' % index_flag)))
+
+# Bytes per posting of the compressed postings lists (doc_id gaps and tfs), excluding the key string
+metrics.mark()
+compressed_indexes = {}
+for index_flag, index in ((1, index1), (2, index2)):
+    compressed_indexes[index_flag] = CompressedIndex('Index_Version%s' % index_flag)
+    postings_count = sum(len(index[key]) for key in index)
+    metrics.count("postings", postings_count)
+    postings_bytes = compressed_indexes[index_flag].postings_bytes
+    print("Compressed postings of index version %s: %s bytes for %s postings, %s bytes per posting" %
+          (index_flag, postings_bytes, postings_count, round(float(postings_bytes) / postings_count, 3)))
+
+# Decode the compressed index files back to terms, doc_ids and tfs and verify them against the uncompressed indexes
+compressed_entries_count = {}
+for index_flag, index in ((1, index1), (2, index2)):
+    decoded_entries = list(compressed_indexes[index_flag].iter_postings())
+    compressed_indexes[index_flag].close()
+    compressed_entries_count[index_flag] = len(decoded_entries)
+    round_trip_ok = len(decoded_entries) == len(index)
+    for key, (term, doc_ids, tfs) in zip(index, decoded_entries):
+        if term != key or doc_ids != list(index[key].doc_ids) or tfs != list(index[key].tfs):
+            round_trip_ok = False
+            break
+    print("Compressed index version %s decodes back to the original terms, doc_ids and tfs: %s" %
+          (index_flag, round_trip_ok))
+
+if positional_unsorted is not None:
+    # Decode every position list of the positional index back and check the tfs against index version 1
+    positions_count = sum(len(positions) for key in positional_index for positions in positional_index[key].positions)
+    # The positions file also holds the df, doc_id gaps, tfs and position bit lengths of every entry
+    print("Positional index of index version 1: %s bytes for %s positions, %s bits per position gap" %
+          (positions_bytes, positions_count, round(float(position_gap_bits) / positions_count, 3)))
+    print("Positional index overhead (df, doc_id gaps, tfs, position bit lengths and padding): %s bits, "
+          "%s bits per position" % (8 * positions_bytes - position_gap_bits,
+                                    round(float(8 * positions_bytes - position_gap_bits) / positions_count, 3)))
+    decoded_positional_index = PositionalIndex('Index_Version1')
+    round_trip_ok = list(decoded_positional_index) == list(index1)
+    for key in positional_index:
+        postings = decoded_positional_index.get_postings(key)
+        if postings is None or postings.doc_ids != list(index1[key].doc_ids) or postings.tfs != list(index1[key].tfs) \
+                or [postings.get_positions(i) for i in range(len(postings))] != \
+                [list(positions) for positions in positional_index[key].positions]:
+            round_trip_ok = False
+            break
+    decoded_positional_index.close()
+    print("Positional index decodes back to the original terms, doc_ids and positions: %s" % round_trip_ok)
+metrics.lap("verify")
+metrics.snapshot("verify")
+
+if compare_postings_codecs:
+    # Size of the compressed postings against their decode throughput, for every codec in postings_codecs.py
+    for index_flag, index, block_size in ((1, index1, 4), (2, index2, 8)):
+        print("Postings codecs on index version %s:" % index_flag)
+        for name, num_bytes, bytes_per_posting, seconds, per_second, round_trip_ok in compare_codecs(
+                [(list(index[key].doc_ids), list(index[key].tfs)) for key in index], block_size):
+            print(" %-10s %10s bytes, %6s bytes per posting, decoded in %8s seconds, %12s postings/second, "
+                  "round trip %s" % (name, num_bytes, bytes_per_posting, seconds, per_second, round_trip_ok))
+    metrics.lap("codecs")
 
 print("Number of postings in index version 1 uncompressed: ", len(index1))
-print("Number of postings in index version 1 compressed: ", len(index1_compressed))
+print("Number of postings in index version 1 compressed: ", compressed_entries_count[1])
 print("Number of postings in index version 2 uncompressed: ", len(index2))
-print("Number of postings in index version 1 compressed: ", len(index2_compressed))
+print("Number of postings in index version 1 compressed: ", compressed_entries_count[2])
 
 query_list = ["reynolds", "prandtl", "flow", "pressure", "boundary", "shock", "nasa"]
 for query_term in query_list:
-    index_val = index1[query_term]
-    tab_separated = index_val.split("\t")
-    df = tab_separated[0]
+    posting_list = index1[query_term]
+    df = len(posting_list)
     tf = []
-    arrow_separated = tab_separated[1].split("->")
-    for single_posting in arrow_separated:
-        curr_tf = single_posting.split(":")[0] + ":" + single_posting.split(":")[1]
-        tf.append(curr_tf)
-    inverted_list_length = sys.getsizeof(tab_separated[1])
+    for doc_id, term_tf in zip(posting_list.doc_ids, posting_list.tfs):
+        tf.append(str(doc_id) + ":" + str(term_tf))
+    inverted_list_length = sys.getsizeof(posting_list.to_string())
     print("For %s\n df = %s\n tf(docID:tf) = %s \n inverted list length = %s bytes" % (
     query_term, df, tf, inverted_list_length))
 
@@ -343,10 +307,8 @@ for query_term in query_list:
         print("NASA: \n df = ", df)
         i = 0
         while i < 3:
-            current_posting_entry = arrow_separated[i]
-            posting_entries = current_posting_entry.split(":")
             print("For entry %s in posting list \n tf = %s \n doclen = %s \n max_tf = %s"
-                  % (i + 1, posting_entries[1], posting_entries[3], posting_entries[2]))
+                  % (i + 1, posting_list.tfs[i], posting_list.doclens[i], posting_list.max_tfs[i]))
             i += 1
 
 print("Dictionary term from index 1 with the largest df:value\n", max_df1)
@@ -355,3 +317,19 @@ print("Dictionary term from index 2 with the largest df:value\n", max_df2)
 print("Dictionary term from index 2 with the lowest df:value\n", min_df2)
 print("Document with the largest max_tf in collection: Doc #%s with a max_tf of %s" % (doc_max_tf_id, doc_max_tf))
 print("Document with the largest doclen in the collection: Doc #%s with a doclen of %s" % (max_doclen_id, max_doclen))
+print(lemma_cache.report("Lemma"))
+print(stem_cache.report("Stem"))
+if document_cache_path is not None:
+    print(document_cache.report())
+
+# Machine readable report of where the build time went
+build_info = {"collection": directory, "num_processes": num_processes, "memory_budget": memory_budget,
+              "document_cache": document_cache_path is not None, "postings_codecs": postings_codecs,
+              "positional_index": positional_unsorted is not None}
+if profile_path is not None:
+    build_info["profile"] = profile_path
+    build_info["profile_top_functions"] = metrics.stop_profile(profile_path)
+if metrics_path is not None:
+    report = metrics.save(metrics_path, build_info)
+    print("Build metrics written to %s: %s seconds wall time, %s seconds CPU time, peak RSS %s bytes" %
+          (metrics_path, report["total_wall_seconds"], report["total_cpu_seconds"], report["peak_rss_bytes"]))
@@ -0,0 +1,327 @@
+"""
+Author: Anshul Pardhi
+Persisted binary index, written by IndexBuilding.py and memory mapped by RankedRetrieval.py
+The index is stored in three files sharing a common prefix:
+    prefix.dict      term dictionary: term, df and offset of its posting list in the postings file
+    prefix.postings  posting lists: df doc_ids followed by df tfs, as little endian unsigned 32 bit integers
+    prefix.docs      doc stats table: collection size, total doclen, then max_tf, doclen, the W1 and W2 vector norms
+                     and the title of every document
+A fourth file, prefix.generation, counts the times the files were rewritten, by IndexBuilding.py or by a merge of the
+added and deleted documents, so that a program keeping the index open can tell that its files changed.
+The vector norms let a query weight the posting lists of its own terms only, see scoring.StoredWeights
+"""
+
+import mmap
+import struct
+from collections import OrderedDict
+from postings import PostingList
+
+DICT_HEADER = struct.Struct("<I")  # Number of terms
+DICT_ENTRY = struct.Struct("<HIQ")  # Term length in bytes, df, offset in the postings file (the term bytes follow)
+DOCS_HEADER = struct.Struct("<IQ")  # Collection size, total doclen
+DOCS_ENTRY = struct.Struct("<IIddQI")  # max_tf, doclen, W1 norm, W2 norm, title offset, title length in bytes
+
+
+class BinaryIndexWriter:
+    """
+    Writes the dictionary and postings files one term at a time, so that an index can be written while it is streamed
+    """
+
+    def __init__(self, prefix):
+        """
+        :param prefix: path prefix of the three files
+        """
+        self.prefix = prefix
+        self.dict_op = open(prefix + ".dict", "wb")
+        self.postings_op = open(prefix + ".postings", "wb")
+        self.dict_op.write(DICT_HEADER.pack(0))  # The number of terms is filled in by close
+        self.term_count = 0
+        self.offset = 0
+
+    def add(self, term, posting_list):
+        """
+        Write the next term, terms must be added in sorted order
+        :param term:
+        :param posting_list:
+        :return:
+        """
+        df = len(posting_list)
+        term_bytes = term.encode()
+        self.dict_op.write(DICT_ENTRY.pack(len(term_bytes), df, self.offset) + term_bytes)
+        self.postings_op.write(struct.pack("<%dI" % df, *posting_list.doc_ids))
+        self.postings_op.write(struct.pack("<%dI" % df, *posting_list.tfs))
+        self.offset += 8 * df
+        self.term_count += 1
+
+    def close(self, doc_stats, titles, norms):
+        """
+        Complete the dictionary and write the doc stats file
+        :param doc_stats: list of (max_tf, doclen), the entry for doc_id at position doc_id - 1
+        :param titles: map of doc_id: title
+        :param norms: compressed_index.DocumentNorms of every posting list added
+        :return:
+        """
+        self.dict_op.seek(0)
+        self.dict_op.write(DICT_HEADER.pack(self.term_count))
+        self.dict_op.close()
+        self.postings_op.close()
+        write_doc_stats(self.prefix + ".docs", doc_stats, titles, norms)
+
+
+def write_doc_stats(path, doc_stats, titles, norms):
+    """
+    Write a doc stats file
+    :param path: prefix.docs
+    :param doc_stats: list of (max_tf, doclen), the entry for doc_id at position doc_id - 1, or a sequence read like it
+    :param titles: map of doc_id: title, or any object with the get method of a map
+    :param norms: compressed_index.DocumentNorms of every posting list of the index
+    :return:
+    """
+    docs_op = open(path, "wb")
+    docs_op.write(DOCS_HEADER.pack(len(doc_stats), sum(doclen for max_tf, doclen in doc_stats)))
+    title_offset = 0
+    for doc_id in range(1, len(doc_stats) + 1):
+        max_tf, doclen = doc_stats[doc_id - 1]
+        w1_norm, w2_norm = norms.get_norms(doc_id)
+        title_len = len(titles.get(doc_id, "").encode())
+        docs_op.write(DOCS_ENTRY.pack(max_tf, doclen, w1_norm, w2_norm, title_offset, title_len))
+        title_offset += title_len
+    # The titles follow the entries, they are written in a second pass rather than kept until the entries are written
+    for doc_id in range(1, len(doc_stats) + 1):
+        docs_op.write(titles.get(doc_id, "").encode())
+    docs_op.close()
+
+
+class DocStats:
+    """
+    Read only view of a doc stats file written by write_doc_stats. The file is memory mapped, so a document only
+    touches its own entry and title
+    """
+
+    def __init__(self, path):
+        self.docs_file = open(path, "rb")
+        self.docs_map = mmap.mmap(self.docs_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.collection_size, self.total_doclen = DOCS_HEADER.unpack_from(self.docs_map, 0)
+        self.titles_offset = DOCS_HEADER.size + DOCS_ENTRY.size * self.collection_size
+
+    def get_doc_stats(self, doc_id):
+        """
+        Get the stats of a document
+        :param doc_id:
+        :return: max_tf, doclen
+        """
+        return DOCS_ENTRY.unpack_from(self.docs_map, DOCS_HEADER.size + DOCS_ENTRY.size * (doc_id - 1))[:2]
+
+    def __len__(self):
+        return self.collection_size
+
+    def __getitem__(self, position):
+        """
+        Read the doc stats like the list of (max_tf, doclen) they were written from
+        :param position: doc_id - 1
+        :return: max_tf, doclen
+        """
+        if position < 0 or position >= self.collection_size:
+            raise IndexError(position)
+        return self.get_doc_stats(position + 1)
+
+    def get_doc_norms(self, doc_id):
+        """
+        Get the stats and vector norms of a document
+        :param doc_id:
+        :return: max_tf, doclen, w1_norm, w2_norm
+        """
+        return DOCS_ENTRY.unpack_from(self.docs_map, DOCS_HEADER.size + DOCS_ENTRY.size * (doc_id - 1))[:4]
+
+    def get_title(self, doc_id, default=None):
+        """
+        Get the title of a document
+        :param doc_id:
+        :param default: returned for unknown doc_ids
+        :return: title
+        """
+        if doc_id < 1 or doc_id > self.collection_size:
+            return default
+        max_tf, doclen, w1_norm, w2_norm, title_offset, title_len = DOCS_ENTRY.unpack_from(
+            self.docs_map, DOCS_HEADER.size + DOCS_ENTRY.size * (doc_id - 1))
+        start = self.titles_offset + title_offset
+        return self.docs_map[start:start + title_len].decode()
+
+    def close(self):
+        """
+        Unmap and close the file
+        :return:
+        """
+        self.docs_map.close()
+        self.docs_file.close()
+
+
+def read_generation(prefix):
+    """
+    Read the generation of the index files
+    :param prefix: path prefix of the index files
+    :return: generation, 0 if none was written
+    """
+    try:
+        generation_ip = open(prefix + ".generation", "r")
+    except FileNotFoundError:
+        return 0
+    generation = generation_ip.read().strip()
+    generation_ip.close()
+    return int(generation) if generation else 0
+
+
+def write_generation(prefix, generation):
+    """
+    Write the generation of the index files, once the files are complete
+    :param prefix: path prefix of the index files
+    :param generation:
+    :return:
+    """
+    generation_op = open(prefix + ".generation", "w")
+    generation_op.write(str(generation) + "\n")
+    generation_op.close()
+
+
+def write_binary_index(prefix, index, doc_stats, titles, norms):
+    """
+    Write an index to the dictionary, postings and doc stats files
+    :param prefix: path prefix of the three files
+    :param index: sorted index of the form {word: posting_list(doc_id, tf, max_tf, doclen)}
+    :param doc_stats: list of (max_tf, doclen), the entry for doc_id at position doc_id - 1, or a sequence read like it
+    :param titles: map of doc_id: title, or any object with the get method of a map
+    :param norms: compressed_index.DocumentNorms of the index
+    :return:
+    """
+    writer = BinaryIndexWriter(prefix)
+    for term in index:
+        writer.add(term, index[term])
+    writer.close(doc_stats, titles, norms)
+
+
+class BinaryIndex:
+    """
+    Read only view of an index written by write_binary_index. The postings and doc stats files are memory mapped,
+    so opening the index only reads the term dictionary and a query only touches the postings of its terms
+    """
+
+    def __init__(self, prefix):
+        self.dictionary = OrderedDict()  # Dictionary is of the form {word: (df, offset)}
+        dict_ip = open(prefix + ".dict", "rb")
+        data = dict_ip.read()
+        dict_ip.close()
+        pos = DICT_HEADER.size
+        for i in range(DICT_HEADER.unpack_from(data, 0)[0]):
+            term_len, df, offset = DICT_ENTRY.unpack_from(data, pos)
+            pos += DICT_ENTRY.size
+            self.dictionary[data[pos:pos + term_len].decode()] = (df, offset)
+            pos += term_len
+
+        self.postings_file = open(prefix + ".postings", "rb")
+        self.postings_map = mmap.mmap(self.postings_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.docs = DocStats(prefix + ".docs")
+        self.collection_size = self.docs.collection_size
+        self.total_doclen = self.docs.total_doclen
+
+    def __contains__(self, term):
+        return term in self.dictionary
+
+    def __len__(self):
+        return len(self.dictionary)
+
+    def __iter__(self):
+        return iter(self.dictionary)
+
+    def __getitem__(self, term):
+        if term not in self.dictionary:
+            raise KeyError(term)
+        return self.get_postings(term)
+
+    def terms(self):
+        """
+        Get the dictionary terms in sorted order
+        :return: iterator over terms
+        """
+        return iter(self.dictionary)
+
+    def get_df(self, term):
+        """
+        Get the document frequency of a term, 0 if it is not in the dictionary
+        :param term:
+        :return: df
+        """
+        entry = self.dictionary.get(term)
+        return entry[0] if entry is not None else 0
+
+    def get_doc_stats(self, doc_id):
+        """
+        Get the stats of a document
+        :param doc_id:
+        :return: max_tf, doclen
+        """
+        return self.docs.get_doc_stats(doc_id)
+
+    def get_doc_norms(self, doc_id):
+        """
+        Get the stats and vector norms of a document
+        :param doc_id:
+        :return: max_tf, doclen, w1_norm, w2_norm
+        """
+        return self.docs.get_doc_norms(doc_id)
+
+    def get_title(self, doc_id, default=None):
+        """
+        Get the title of a document
+        :param doc_id:
+        :param default: returned for unknown doc_ids
+        :return: title
+        """
+        return self.docs.get_title(doc_id, default)
+
+    def read_postings(self, term):
+        """
+        Read the doc_ids and tfs of a term from the postings file, without the doc stats
+        :param term:
+        :return: doc_ids, tfs; None if the term is not in the dictionary
+        """
+        entry = self.dictionary.get(term)
+        if entry is None:
+            return None
+        df, offset = entry
+        return (list(struct.unpack_from("<%dI" % df, self.postings_map, offset)),
+                list(struct.unpack_from("<%dI" % df, self.postings_map, offset + 4 * df)))
+
+    def get_postings(self, term):
+        """
+        Read the posting list of a term from the postings file
+        :param term:
+        :return: posting list, empty if the term is not in the dictionary
+        """
+        posting_list = PostingList()
+        postings = self.read_postings(term)
+        if postings is None:
+            return posting_list
+        doc_ids, tfs = postings
+        for doc_id, tf in zip(doc_ids, tfs):
+            max_tf, doclen = self.get_doc_stats(doc_id)
+            posting_list.append(doc_id, tf, max_tf, doclen)
+        return posting_list
+
+    def to_index(self):
+        """
+        Rebuild the in memory index from the postings file
+        :return: index of the form {word: posting_list(doc_id, tf, max_tf, doclen)}
+        """
+        index = OrderedDict()
+        for term in self.dictionary:
+            index[term] = self.get_postings(term)
+        return index
+
+    def close(self):
+        """
+        Unmap and close the index files
+        :return:
+        """
+        self.postings_map.close()
+        self.postings_file.close()
+        self.docs.close()
@@ -0,0 +1,250 @@
+"""
+Author: Anshul Pardhi
+Per-stage metrics of an index build: wall and CPU time of every stage, throughput counters, peak memory, optional
+tracemalloc snapshots between the stages and an optional profile, written as a JSON report
+"""
+
+import sys
+import json
+import time
+import pstats
+import cProfile
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import resource  # Not available on Windows, the peak memory is then not reported
+except ImportError:
+    resource = None
+
+# Counter that a stage processes, its throughput is reported per second of the stage
+STAGE_UNITS = {"parse": "documents", "analysis": "tokens", "inversion": "documents", "merge": "postings",
+               "sort": "postings", "encode": "postings", "write": "postings", "verify": "postings"}
+
+
+def get_peak_rss():
+    """
+    Get the peak resident set size of this process and of its finished child processes, e.g. the worker processes
+    :return: self_bytes, children_bytes, None if unknown
+    """
+    if resource is None:
+        return None, None
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, \
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+
+
+def take_snapshot():
+    """
+    Take a tracemalloc snapshot without the allocations of tracemalloc and of the import machinery
+    :return: snapshot
+    """
+    return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                                      tracemalloc.Filter(False, "<frozen importlib._bootstrap>")))
+
+
+class BuildMetrics:
+    """
+    Collects the wall and CPU time of named stages and counters of the processed documents, tokens and postings.
+    A stage can be timed as a block, or lap by lap when stages alternate document by document
+    """
+
+    def __init__(self):
+        self.stages = OrderedDict()  # Map of the form {name: [wall_seconds, cpu_seconds, calls, peak_rss_bytes]}
+        self.counters = OrderedDict()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.lap_wall = None
+        self.lap_cpu = None
+        self.profiler = None
+        self.snapshots = []  # Memory traced after every stage, see snapshot
+        self.last_snapshot = None
+        self.structures = OrderedDict()  # Deep sizes of the built structures, see add_structure_size
+
+    def add_time(self, name, wall_seconds, cpu_seconds, calls=1):
+        """
+        Add time to a stage
+        :param name:
+        :param wall_seconds:
+        :param cpu_seconds:
+        :param calls:
+        :return:
+        """
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = [0.0, 0.0, 0, None]
+            self.stages.update({name: stage})
+        stage[0] += wall_seconds
+        stage[1] += cpu_seconds
+        stage[2] += calls
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a block of code as a stage, e.g. with metrics.stage("sort"):
+        :param name:
+        :return:
+        """
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start_wall, time.process_time() - start_cpu)
+            self.stages[name][3] = get_peak_rss()[0]
+
+    def get_wall_time(self, name):
+        """
+        :param name:
+        :return: wall seconds spent in a stage so far
+        """
+        return self.stages[name][0] if name in self.stages else 0.0
+
+    def mark(self):
+        """
+        Start timing laps, see lap
+        :return:
+        """
+        self.lap_wall = time.perf_counter()
+        self.lap_cpu = time.process_time()
+
+    def lap(self, name):
+        """
+        Add the time since the last mark or lap to a stage
+        :param name:
+        :return:
+        """
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        self.add_time(name, wall - self.lap_wall, cpu - self.lap_cpu)
+        self.lap_wall = wall
+        self.lap_cpu = cpu
+
+    def count(self, name, value=1):
+        """
+        Add to a counter
+        :param name: e.g. documents, tokens or postings
+        :param value:
+        :return:
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other):
+        """
+        Add the stage times and counters of another build, e.g. of a worker process. The stage times of the workers
+        add up, so they can exceed the wall time of the build
+        :param other:
+        :return:
+        """
+        for name, (wall_seconds, cpu_seconds, calls, peak_rss) in other.stages.items():
+            self.add_time(name, wall_seconds, cpu_seconds, calls)
+        for name, value in other.counters.items():
+            self.count(name, value)
+
+    def start_memory_tracing(self, frames=1):
+        """
+        Start tracing the memory allocations with tracemalloc; the build runs slower while tracing
+        :param frames: number of stack frames kept per allocation
+        :return:
+        """
+        tracemalloc.start(frames)
+        self.last_snapshot = take_snapshot()
+
+    def snapshot(self, name, top=5):
+        """
+        Record the memory traced at the end of a stage: the current and peak traced memory since the previous snapshot,
+        and the source lines whose allocations grew or shrank the most during the stage. Nothing is recorded unless
+        start_memory_tracing was called
+        :param name: stage
+        :param top: number of source lines reported
+        :return:
+        """
+        if not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        curr_snapshot = take_snapshot()
+        allocations = ["%s:%s %+d bytes (%+d blocks)" % (stat.traceback[0].filename, stat.traceback[0].lineno,
+                                                          stat.size_diff, stat.count_diff)
+                       for stat in curr_snapshot.compare_to(self.last_snapshot, "lineno")[:top]]
+        self.snapshots.append(OrderedDict([("stage", name), ("traced_current_bytes", current),
+                                           ("traced_peak_bytes", peak), ("top_allocations", allocations)]))
+        self.last_snapshot = curr_snapshot
+        if hasattr(tracemalloc, "reset_peak"):  # Python 3.9 and later, the peak is otherwise the peak of the run
+            tracemalloc.reset_peak()
+
+    def add_structure_size(self, name, sizes):
+        """
+        Record the deep size of a built structure
+        :param name:
+        :param sizes: map of the form {component: bytes}, see memory_accounting.py
+        :return:
+        """
+        self.structures.update({name: sizes})
+
+    def start_profile(self):
+        """
+        Start profiling the build with cProfile
+        :return:
+        """
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop_profile(self, path):
+        """
+        Stop profiling and save the profile, it can be read with pstats or snakeviz
+        :param path:
+        :return: list of the 10 functions with the largest own time, of the form "file:line(function) seconds"
+        """
+        self.profiler.disable()
+        self.profiler.dump_stats(path)
+        stats = pstats.Stats(self.profiler)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        return ["%s:%s(%s) %.3f seconds" % (function[0], function[1], function[2], timings[2])
+                for function, timings in functions[:10]]
+
+    def report(self, info=None):
+        """
+        Build the metrics report
+        :param info: map of other values to report, e.g. the build configuration
+        :return: report map
+        """
+        total_wall = time.perf_counter() - self.start_wall
+        total_cpu = time.process_time() - self.start_cpu
+        peak_rss, peak_rss_children = get_peak_rss()
+        stages = OrderedDict()
+        for name, (wall_seconds, cpu_seconds, calls, stage_peak_rss) in self.stages.items():
+            stage = OrderedDict([("wall_seconds", round(wall_seconds, 4)), ("cpu_seconds", round(cpu_seconds, 4)),
+                                 ("calls", calls), ("share_of_wall", round(wall_seconds / total_wall, 4))])
+            unit = STAGE_UNITS.get(name)
+            if unit in self.counters and wall_seconds > 0:
+                stage[unit + "_per_second"] = round(self.counters[unit] / wall_seconds, 1)
+            if stage_peak_rss is not None:
+                stage["peak_rss_bytes"] = stage_peak_rss
+            stages.update({name: stage})
+
+        report = OrderedDict()
+        report["info"] = info or {}
+        report["total_wall_seconds"] = round(total_wall, 4)
+        report["total_cpu_seconds"] = round(total_cpu, 4)
+        report["peak_rss_bytes"] = peak_rss
+        report["peak_rss_children_bytes"] = peak_rss_children
+        report["counters"] = self.counters
+        report["throughput"] = OrderedDict((name + "_per_second", round(value / total_wall, 1))
+                                           for name, value in self.counters.items())
+        report["stages"] = stages
+        report["memory"] = OrderedDict([("structures", self.structures), ("snapshots", self.snapshots)])
+        return report
+
+    def save(self, path, info=None):
+        """
+        Write the metrics report as JSON
+        :param path:
+        :param info: see report
+        :return: report map
+        """
+        report = self.report(info)
+        metrics_op = open(path, "w")
+        json.dump(report, metrics_op, indent=2)
+        metrics_op.close()
+        return report
@@ -0,0 +1,258 @@
+"""
+Author: Anshul Pardhi
+Compressed index files that W1 and W2 ranking can run on. Besides the compressed key string and the postings entries
+(df, doc_id gaps and tfs), the index file holds the offset of every block of postings entries, so that a query term
+only reads the entries of its own block. The entries of long posting lists start with a skip table, see
+postings_codecs.PostingsCodec, so they can be passed over or read a chunk at a time. The document stats are stored
+separately:
+    prefix.compressed.bin   header, key string, block offsets, then the postings entries
+    prefix.compressed.docs  copy of the doc stats file of the binary index built with it, see binary_index.py. A merge
+                            of the binary index rewrites prefix.docs, the compressed index keeps the doc stats of its
+                            own postings
+"""
+
+import math
+import mmap
+import shutil
+import struct
+from array import array
+from collections import OrderedDict
+from postings import PostingList
+from postings_codecs import get_codec
+from index_compression import decode_key_str
+from weighting import get_w1_weight, get_w2_weight
+from binary_index import DocStats, read_generation
+
+# index_flag, block size, codec name, key string length in bytes, number of blocks
+COMPRESSED_HEADER = struct.Struct("<BB16sII")
+BLOCK_OFFSET = struct.Struct("<Q")  # Offset of a block from the first postings entry
+
+
+def get_block_offsets(index_compressed, block_size):
+    """
+    Get the offsets of the blocks of a list of compressed postings entries
+    :param index_compressed:
+    :param block_size:
+    :return: list of offsets from the first entry
+    """
+    block_offsets = []
+    offset = 0
+    for i in range(len(index_compressed)):
+        if i % block_size == 0:
+            block_offsets.append(offset)
+        offset += len(index_compressed[i])
+    return block_offsets
+
+
+def write_compressed_header(output, key_str, block_offsets, block_size, index_flag, codec):
+    """
+    Write the part of a compressed index file before the postings entries, which follow it
+    :param output: file opened for binary writing
+    :param key_str:
+    :param block_offsets: see get_block_offsets
+    :param block_size:
+    :param index_flag: 1: blocked compression; 2: front coding
+    :param codec: name of the postings codec
+    :return:
+    """
+    key_bytes = key_str.encode()
+    output.write(COMPRESSED_HEADER.pack(index_flag, block_size, codec.encode(), len(key_bytes), len(block_offsets)))
+    output.write(key_bytes)
+    for block_offset in block_offsets:
+        output.write(BLOCK_OFFSET.pack(block_offset))
+
+
+class DocumentNorms:
+    """
+    Accumulates the lengths of the W1 and W2 document vectors one posting list at a time, in dictionary order, adding
+    up the squared weights in the same order as weighting.normalize_weights
+    """
+
+    def __init__(self, doc_stats, collection_size=None):
+        """
+        :param doc_stats: list of (max_tf, doclen), the entry for doc_id at position doc_id - 1
+        :param collection_size: number of live documents if some entries of doc_stats are deleted documents, whose
+        doclen is 0
+        """
+        self.collection_size = collection_size if collection_size is not None else len(doc_stats)
+        self.avg_doclen = sum(doclen for max_tf, doclen in doc_stats) // self.collection_size
+        # Arrays of doubles, 8 bytes per document instead of a pointer to a float object
+        self.sq_sums_1 = array('d', bytes(8 * (len(doc_stats) + 1)))
+        self.sq_sums_2 = array('d', bytes(8 * (len(doc_stats) + 1)))
+
+    def add(self, posting_list):
+        """
+        Add the weights of the next posting list
+        :param posting_list:
+        :return:
+        """
+        df = len(posting_list)
+        for doc_id, tf, max_tf, doclen in posting_list:
+            w1_weight = get_w1_weight(tf, max_tf, self.collection_size, df)
+            w2_weight = get_w2_weight(tf, doclen, self.avg_doclen, self.collection_size, df)
+            self.sq_sums_1[doc_id] += w1_weight * w1_weight
+            self.sq_sums_2[doc_id] += w2_weight * w2_weight
+
+    def get_norms(self, doc_id):
+        """
+        :param doc_id:
+        :return: w1_norm, w2_norm
+        """
+        return math.sqrt(self.sq_sums_1[doc_id]), math.sqrt(self.sq_sums_2[doc_id])
+
+
+def write_compressed_doc_stats(prefix):
+    """
+    Write the doc stats file of a compressed index, once the binary index of the same documents is written
+    :param prefix: path prefix of the index files
+    :return:
+    """
+    shutil.copyfile(prefix + ".docs", prefix + ".compressed.docs")
+
+
+class CompressedIndex:
+    """
+    Read only view of a compressed index. Both files are memory mapped; opening the index decodes the key string
+    only, and the posting list of a term is decoded from the start of its block
+    """
+
+    def __init__(self, prefix):
+        # Read before the files, so that files rewritten in between are seen as changed
+        self.disk_generation = read_generation(prefix)
+        self.index_file = open(prefix + ".compressed.bin", "rb")
+        self.index_map = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index_flag, self.block_size, codec, key_len, num_blocks = COMPRESSED_HEADER.unpack_from(self.index_map, 0)
+        self.codec = get_codec(codec.rstrip(b"\0").decode())
+        pos = COMPRESSED_HEADER.size
+        self.terms_list = decode_key_str(self.index_map[pos:pos + key_len].decode(), self.index_flag)
+        self.term_ids = dict((term, term_id) for term_id, term in enumerate(self.terms_list))
+        pos += key_len
+        self.block_offsets = struct.unpack_from("<%dQ" % num_blocks, self.index_map, pos)
+        self.postings_offset = pos + BLOCK_OFFSET.size * num_blocks
+        self.postings_bytes = len(self.index_map) - self.postings_offset
+
+        self.docs = DocStats(prefix + ".compressed.docs")
+        self.collection_size = self.docs.collection_size
+        self.total_doclen = self.docs.total_doclen
+        self.generation = 0  # The index is never updated in memory, see DynamicIndex.generation
+
+    def __contains__(self, term):
+        return term in self.term_ids
+
+    def __len__(self):
+        return len(self.terms_list)
+
+    def __iter__(self):
+        return iter(self.terms_list)
+
+    def terms(self):
+        """
+        Get the dictionary terms in sorted order
+        :return: iterator over terms
+        """
+        return iter(self.terms_list)
+
+    def decode_block(self, block_no, count=None):
+        """
+        Decode the postings entries of a block
+        :param block_no:
+        :param count: number of entries to decode from the start of the block, all of them by default
+        :return: list of (doc_ids, tfs), as lists
+        """
+        if count is None:
+            count = min(self.block_size, len(self.terms_list) - block_no * self.block_size)
+        entries = []
+        offset = self.postings_offset + self.block_offsets[block_no]
+        for i in range(count):
+            doc_ids, tfs, key_ptr, offset = self.codec.decode_entry(self.index_map, offset, i == 0)
+            entries.append((self.codec.to_list(doc_ids), self.codec.to_list(tfs)))
+        return entries
+
+    def find_entry(self, term):
+        """
+        Find the postings entry of a term. The entries before it in its block are passed over with their skip tables,
+        so only the short posting lists among them are decoded
+        :param term:
+        :return: offset of the entry, True if it is the first of its block; None if the term is not in the dictionary
+        """
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return None
+        offset = self.postings_offset + self.block_offsets[term_id // self.block_size]
+        for i in range(term_id % self.block_size):
+            offset = self.codec.decode_skip_table(self.index_map, offset, i == 0)[4]
+        return offset, term_id % self.block_size == 0
+
+    def get_postings(self, term):
+        """
+        Decode the posting list of a term
+        :param term:
+        :return: doc_ids, tfs, None if the term is not in the dictionary
+        """
+        entry = self.find_entry(term)
+        if entry is None:
+            return None
+        doc_ids, tfs, key_ptr, offset = self.codec.decode_entry(self.index_map, entry[0], entry[1])
+        return self.codec.to_list(doc_ids), self.codec.to_list(tfs)
+
+    def get_skip_postings(self, term):
+        """
+        Get the posting list of a term with its skip pointers; a chunk of doc_ids is only decoded when it is read
+        :param term:
+        :return: SkipPostings, None if the term is not in the dictionary
+        """
+        entry = self.find_entry(term)
+        if entry is None:
+            return None
+        return self.codec.decode_skip_postings(self.index_map, entry[0], entry[1])[0]
+
+    def iter_postings(self):
+        """
+        Decode all the posting lists, block by block
+        :return: iterator over (term, doc_ids, tfs) in dictionary order
+        """
+        for block_no in range(len(self.block_offsets)):
+            first_term_id = block_no * self.block_size
+            for i, (doc_ids, tfs) in enumerate(self.decode_block(block_no)):
+                yield self.terms_list[first_term_id + i], doc_ids, tfs
+
+    def get_doc_stats(self, doc_id):
+        """
+        Get the stats of a document
+        :param doc_id:
+        :return: max_tf, doclen, w1_norm, w2_norm
+        """
+        return self.docs.get_doc_norms(doc_id)
+
+    def get_title(self, doc_id, default=None):
+        """
+        Get the title of a document
+        :param doc_id:
+        :param default: returned for unknown doc_ids
+        :return: title
+        """
+        return self.docs.get_title(doc_id, default)
+
+    def to_index(self):
+        """
+        Decode the whole index
+        :return: index of the form {word: posting_list(doc_id, tf, max_tf, doclen)}
+        """
+        index = OrderedDict()
+        for term, doc_ids, tfs in self.iter_postings():
+            posting_list = PostingList()
+            for doc_id, tf in zip(doc_ids, tfs):
+                max_tf, doclen, w1_norm, w2_norm = self.get_doc_stats(doc_id)
+                posting_list.append(doc_id, tf, max_tf, doclen)
+            index[term] = posting_list
+        return index
+
+    def close(self):
+        """
+        Unmap and close the index files
+        :return:
+        """
+        self.index_map.close()
+        self.index_file.close()
+        self.docs.close()
+
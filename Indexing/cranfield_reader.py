@@ -0,0 +1,118 @@
+"""
+Author: Anshul Pardhi
+Streaming reader of Cranfield documents. Instead of parsing every file into an ElementTree, the files are scanned in
+chunks for tags, so only the current document is held in memory. A file may hold a single <DOC> element or several
+concatenated ones
+"""
+
+import html
+
+CHUNK_SIZE = 65536  # Characters read from a file at a time
+
+
+def scan_tags(file):
+    """
+    Scan a file for tags and the text between them
+    :param file:
+    :return: iterator over (kind, value), kind is "start" or "end" with the tag name as value, or "text"
+    """
+    file_ip = open(file, "r")
+    try:
+        buffer = ""
+        while True:
+            chunk = file_ip.read(CHUNK_SIZE)
+            buffer += chunk
+            pos = 0
+            while True:
+                start = buffer.find("<", pos)
+                if start < 0:
+                    if pos < len(buffer):
+                        yield "text", buffer[pos:]
+                    pos = len(buffer)
+                    break
+                if start > pos:
+                    yield "text", buffer[pos:start]
+                end = buffer.find(">", start)
+                if end < 0:
+                    # The tag continues in the next chunk
+                    pos = start
+                    break
+                tag = buffer[start + 1:end]
+                pos = end + 1
+                if tag.startswith("?") or tag.startswith("!"):
+                    continue  # XML declaration, doctype or comment
+                if tag.startswith("/"):
+                    yield "end", tag[1:].strip()
+                else:
+                    name = tag.rstrip("/").split()[0] if tag.strip("/ ") else ""
+                    yield "start", name
+                    if tag.endswith("/"):
+                        yield "end", name
+            buffer = buffer[pos:]
+            if not chunk:
+                break
+    finally:
+        file_ip.close()
+
+
+def read_documents(files, first_doc_id=1):
+    """
+    Read the documents of a list of files in order. Every top level element of a file is a document, and its child
+    elements are its fields; as with ElementTree, the text of a field is the text before its first child element
+    :param files:
+    :param first_doc_id: doc_id of the first document, the next documents get consecutive doc_ids
+    :return: iterator over (doc_id, fields), fields is a list of (field, text) in document order
+    """
+    doc_id = first_doc_id - 1
+    for file in files:
+        depth = 0
+        fields = []
+        field = None
+        text_chunks = []
+        for kind, value in scan_tags(file):
+            if kind == "text":
+                if field is not None:
+                    text_chunks.append(value)
+            elif kind == "start":
+                depth += 1
+                if depth == 1:
+                    doc_id += 1
+                    fields = []
+                elif depth == 2:
+                    field = value
+                    text_chunks = []
+                elif field is not None:
+                    # A nested element ends the text of the field
+                    fields.append((field, get_text(text_chunks)))
+                    field = None
+            else:
+                if depth == 2 and field is not None:
+                    fields.append((field, get_text(text_chunks)))
+                    field = None
+                elif depth == 1:
+                    yield doc_id, fields
+                depth -= 1
+
+
+def get_text(text_chunks):
+    """
+    Join the text of a field and decode its character references
+    :param text_chunks:
+    :return: text
+    """
+    text = "".join(text_chunks)
+    if "&" in text:
+        text = html.unescape(text)
+    return text
+
+
+def read_fields(files, first_doc_id=1):
+    """
+    Stream the fields of the documents of a list of files
+    :param files:
+    :param first_doc_id: see read_documents
+    :return: iterator over (doc_id, field, text)
+    """
+    for doc_id, fields in read_documents(files, first_doc_id):
+        for field, text in fields:
+            yield doc_id, field, text
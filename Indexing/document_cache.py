@@ -0,0 +1,258 @@
+"""
+Author: Anshul Pardhi
+On-disk cache of analyzed Cranfield documents. The tokens of every document are saved together with their lemmas and
+stems, keyed by the path of the file with its modification time, size and content hash, so a later run only analyzes
+the files that changed. The cached analysis keeps the stopwords, the programs remove them as before
+"""
+
+import os
+import json
+import hashlib
+from analyzer import tokenize
+from cranfield_reader import read_documents
+
+CACHE_FORMAT = 1  # Change when the tokenizer or the analysis changes, invalidating the saved caches
+
+
+class AnalyzedDocument:
+    """
+    Tokens of a document with the lemma and stem of every token, a variant is None until it is computed
+    """
+
+    def __init__(self, title, field_lengths, tokens, lemmas=None, stems=None):
+        """
+        :param title: text of the last TITLE field with line breaks replaced, or None
+        :param field_lengths: number of tokens of every field, in document order
+        :param tokens: tokens of all the fields, stopwords included
+        :param lemmas: lemma of every token or None
+        :param stems: stem of every token or None
+        """
+        self.title = title
+        self.field_lengths = field_lengths
+        self.tokens = tokens
+        self.lemmas = lemmas
+        self.stems = stems
+
+    @property
+    def num_tokens(self):
+        return len(self.tokens)
+
+    def get_field_terms(self, variant, stopwords=frozenset()):
+        """
+        Get the terms of every field without the stopwords
+        :param variant: "tokens", "lemmas" or "stems"
+        :param stopwords:
+        :return: list of term lists, one per field
+        """
+        terms = getattr(self, variant)
+        field_terms = []
+        start = 0
+        for field_length in self.field_lengths:
+            end = start + field_length
+            field_terms.append([terms[i] for i in range(start, end) if self.tokens[i] not in stopwords])
+            start = end
+        return field_terms
+
+    def get_terms(self, variant, stopwords=frozenset()):
+        """
+        Get the terms of the document without the stopwords
+        :param variant: "tokens", "lemmas" or "stems"
+        :param stopwords:
+        :return: list of terms
+        """
+        tokens = self.tokens
+        terms = getattr(self, variant)
+        if not stopwords:
+            return list(terms)
+        return [terms[i] for i in range(len(tokens)) if tokens[i] not in stopwords]
+
+    def to_json(self):
+        return {"title": self.title, "field_lengths": self.field_lengths, "tokens": self.tokens,
+                "lemmas": self.lemmas, "stems": self.stems}
+
+
+def analyze_fields(fields):
+    """
+    Tokenize the fields of a Cranfield document
+    :param fields: list of (field, text), see read_documents
+    :return: AnalyzedDocument without lemmas and stems
+    """
+    title = None
+    field_lengths = []
+    tokens = []
+    for field, text in fields:
+        if field == "TITLE":
+            title = text.replace("\n", " ")
+        field_tokens = list(tokenize(text))
+        field_lengths.append(len(field_tokens))
+        tokens.extend(field_tokens)
+    return AnalyzedDocument(title, field_lengths, tokens)
+
+
+def get_digest(file):
+    """
+    Hash the content of a file
+    :param file:
+    :return: hex digest
+    """
+    digest = hashlib.sha1()
+    file_ip = open(file, "rb")
+    for chunk in iter(lambda: file_ip.read(65536), b""):
+        digest.update(chunk)
+    file_ip.close()
+    return digest.hexdigest()
+
+
+class DocumentCache:
+    """
+    Analyzed documents of every file, of the form {path: entry}. An entry is reused as long as the modification time
+    and size of its file are unchanged; otherwise the content hash decides, so touching a file does not re-analyze it
+    """
+
+    def __init__(self):
+        self.path = None  # File the cache is loaded from and saved to, None while the cache is not used
+        self.entries = {}
+        self.changed = {}  # Entries added or updated since the cache was loaded
+        self.reused_documents = 0
+        self.analyzed_documents = 0
+
+    def reset_counters(self):
+        """
+        Set the document counters back to 0 and forget the changed entries
+        :return:
+        """
+        self.changed = {}
+        self.reused_documents = 0
+        self.analyzed_documents = 0
+
+    def get_changes(self):
+        """
+        Get a cache holding only the changed entries and the counters, e.g. to send back from a worker process
+        :return: DocumentCache
+        """
+        changes = DocumentCache()
+        changes.changed = self.changed
+        changes.reused_documents = self.reused_documents
+        changes.analyzed_documents = self.analyzed_documents
+        return changes
+
+    def merge(self, other):
+        """
+        Add the changed entries and counters of another cache, e.g. the cache of a worker process
+        :param other:
+        :return:
+        """
+        self.entries.update(other.changed)
+        self.changed.update(other.changed)
+        self.reused_documents += other.reused_documents
+        self.analyzed_documents += other.analyzed_documents
+
+    def get_entry(self, file):
+        """
+        Get the valid entry of a file, if any
+        :param file:
+        :return: entry or None
+        """
+        entry = self.entries.get(file)
+        if entry is None:
+            return None
+        stat = os.stat(file)
+        if entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry
+        if entry["size"] != stat.st_size or entry["digest"] != get_digest(file):
+            return None
+
+        # Same content with a new modification time
+        entry["mtime"] = stat.st_mtime_ns
+        self.changed[file] = entry
+        return entry
+
+    def get_documents(self, file, lemmatizer=None, stemmer=None):
+        """
+        Get the analyzed documents of a file, analyzing it if its entry is missing or out of date
+        :param file:
+        :param lemmatizer: fills the lemmas if given, a variant missing from a reused entry is added to it
+        :param stemmer: fills the stems if given
+        :return: list of AnalyzedDocument
+        """
+        entry = self.get_entry(file)
+        if entry is None:
+            stat = os.stat(file)
+            documents = [analyze_fields(fields) for doc_id, fields in read_documents([file])]
+            entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "digest": get_digest(file),
+                     "documents": documents}
+            self.entries[file] = entry
+            self.changed[file] = entry
+            self.analyzed_documents += len(documents)
+        else:
+            self.reused_documents += len(entry["documents"])
+
+        for document in entry["documents"]:
+            if lemmatizer is not None and document.lemmas is None:
+                document.lemmas = [lemmatizer.lemmatize(token) for token in document.tokens]
+                self.changed[file] = entry
+            if stemmer is not None and document.stems is None:
+                document.stems = stemmer.stem_many(document.tokens)
+                self.changed[file] = entry
+        return entry["documents"]
+
+    def read_documents(self, files, first_doc_id=1, lemmatizer=None, stemmer=None):
+        """
+        Read the analyzed documents of a list of files in order, same doc_ids as read_documents
+        :param files:
+        :param first_doc_id:
+        :param lemmatizer: see get_documents
+        :param stemmer: see get_documents
+        :return: iterator over (doc_id, AnalyzedDocument)
+        """
+        doc_id = first_doc_id - 1
+        for file in files:
+            for document in self.get_documents(file, lemmatizer, stemmer):
+                doc_id += 1
+                yield doc_id, document
+
+    def report(self):
+        """
+        Describe how many documents were reused and analyzed
+        :return: report string
+        """
+        return "Document cache: %s documents reused, %s documents analyzed, %s files saved" % (
+            self.reused_documents, self.analyzed_documents, len(self.entries))
+
+    def load(self, path):
+        """
+        Use the cache file of a path, loading the entries saved by save if it exists
+        :param path:
+        :return:
+        """
+        self.path = path
+        if not os.path.exists(path):
+            return
+        cache_ip = open(path, "r")
+        header = json.loads(cache_ip.readline() or "{}")
+        if header.get("format") == CACHE_FORMAT:
+            for line in cache_ip:
+                # Each line is the entry of one file, with its documents
+                entry = json.loads(line)
+                entry["documents"] = [AnalyzedDocument(**document) for document in entry["documents"]]
+                self.entries[entry.pop("path")] = entry
+        cache_ip.close()
+
+    def save(self, path=None):
+        """
+        Save the entries to the cache file if any entry changed. The file is written next to the current one and then
+        moved over it, so an interrupted run leaves the previous cache
+        :param path: defaults to the path the cache was loaded from
+        :return:
+        """
+        path = path or self.path
+        if not self.changed and os.path.exists(path):
+            return
+        cache_op = open(path + ".tmp", "w")
+        cache_op.write(json.dumps({"format": CACHE_FORMAT}) + "\n")
+        for file, entry in self.entries.items():
+            line = {"path": file, "mtime": entry["mtime"], "size": entry["size"], "digest": entry["digest"],
+                    "documents": [document.to_json() for document in entry["documents"]]}
+            cache_op.write(json.dumps(line) + "\n")
+        cache_op.close()
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,256 @@
+"""
+Author: Anshul Pardhi
+Analysis of the Cranfield documents into lemmatized and stemmed posting lists, either in this process or
+map-reduce style in a pool of worker processes whose partial indexes are merged in doc_id order
+"""
+
+import multiprocessing
+from array import array
+from collections import Counter
+from porter_stemmer_stateless import StatelessPorterStemmer
+from nltk.stem import WordNetLemmatizer
+from postings import PostingList
+from positional_index import add_document_positions
+from term_cache import LRUCache, CachedLemmatizer, CachedStemmer
+from analyzer import Analyzer
+from cranfield_reader import read_documents
+from document_cache import DocumentCache
+from build_metrics import BuildMetrics
+
+# Lemmas and stems of the terms seen by this process, shared by all its documents
+lemma_cache = LRUCache(100000)
+stem_cache = LRUCache(100000)
+
+# Analyzed documents kept between runs, only used once a cache file is loaded
+document_cache = DocumentCache()
+
+
+def get_unsorted_index(index_unsorted, word_list, doc_id_counter, doclen):
+    """
+    Update the unsorted index posting list and get max_tf
+    :param index_unsorted:
+    :param word_list:
+    :param doc_id_counter:
+    :param doclen:
+    :return: index_unsorted, max_tf
+    """
+    count = Counter(word_list)
+    max_tf = count.most_common(1)[0][1]
+    for counts in count.items():
+        # Posting list holds doc_id, tf, max_tf and doclen of every document containing the word
+        posting_list = index_unsorted.get(counts[0])
+        if posting_list is None:
+            posting_list = PostingList()
+            index_unsorted.update({counts[0]: posting_list})
+        posting_list.append(doc_id_counter, counts[1], max_tf, doclen)
+    return index_unsorted, max_tf
+
+
+def get_analyzers(stopwords):
+    """
+    Get the stopword removing analyzer, and a lemmatizer and a stemmer memoized in the lemma and stem caches of this
+    process
+    :param stopwords:
+    :return: analyzer, lemmatizer, stemmer
+    """
+    return Analyzer(stopwords), CachedLemmatizer(WordNetLemmatizer(), lemma_cache), \
+        CachedStemmer(StatelessPorterStemmer(), stem_cache)
+
+
+def analyze_document(fields, analyzer, lemmatizer, stemmer):
+    """
+    Turn the fields of a Cranfield document into lemmas and stems
+    :param fields: list of (field, text), see read_documents
+    :param analyzer: Analyzer removing the stopwords, see get_analyzers
+    :param lemmatizer:
+    :param stemmer:
+    :return: lemma_list, stem_list, doclen, title
+    """
+    tokens = []
+    counters = {"tokens": 0}  # doclen counts the stopwords as well
+    title = None
+
+    # Repeat for all fields of the document
+    for field, text in fields:
+        if field == "TITLE":
+            title = text.replace("\n", " ")
+        tokens.extend(analyzer.terms(text, counters))
+
+    # Perform lemmatization and stemming of the same tokens
+    lemma_list = [lemmatizer.lemmatize(token) for token in tokens]
+    stem_list = stemmer.stem_many(tokens)
+    return lemma_list, stem_list, counters["tokens"], title
+
+
+def read_analyzed_documents(files, first_doc_id, stopwords, metrics):
+    """
+    Analyze the documents of a list of files, taking the documents whose files did not change from the document cache
+    if it is loaded
+    :param files:
+    :param first_doc_id: see read_documents
+    :param stopwords:
+    :param metrics: BuildMetrics, the parse and analysis time of every document is added to it. The caller adds its
+    own lap before asking for the next document
+    :return: iterator over (doc_id, lemma_list, stem_list, doclen, title), see analyze_document
+    """
+    analyzer, lemmatizer, stemmer = get_analyzers(stopwords)
+    metrics.mark()
+    if document_cache.path is None:
+        for doc_id, fields in read_documents(files, first_doc_id):
+            metrics.lap("parse")
+            lemma_list, stem_list, doclen, title = analyze_document(fields, analyzer, lemmatizer, stemmer)
+            metrics.count("documents")
+            metrics.count("tokens", doclen)
+            metrics.lap("analysis")
+            yield doc_id, lemma_list, stem_list, doclen, title
+        return
+
+    # Cached documents are neither parsed nor tokenized, all their time counts as analysis
+    for doc_id, document in document_cache.read_documents(files, first_doc_id, lemmatizer, stemmer):
+        lemma_list = document.get_terms("lemmas", stopwords)
+        stem_list = document.get_terms("stems", stopwords)
+        metrics.count("documents")
+        metrics.count("tokens", document.num_tokens)
+        metrics.lap("analysis")
+        yield doc_id, lemma_list, stem_list, document.num_tokens, document.title
+
+
+def build_partial_index(shard, metrics=None):
+    """
+    Build the lemma and stem indexes of a contiguous shard of the collection
+    :param shard: (first_doc_id, files, stopwords, positional), the documents of the files get consecutive doc_ids
+    starting at first_doc_id; positional is True to build the positional index of the lemmas as well
+    :param metrics: optional BuildMetrics, gets the parse, analysis and inversion times
+    :return: index1_unsorted, index2_unsorted, doc_stats1, doc_stats2, title_map, positional_unsorted (None unless
+    positional)
+    """
+    first_doc_id, files, stopwords, positional = shard
+    if metrics is None:
+        metrics = BuildMetrics()
+    index1_unsorted = {}
+    index2_unsorted = {}
+    positional_unsorted = {} if positional else None  # Of the form {lemma: PositionalPostingList}
+    doc_stats1 = []  # max_tf and doclen of every document for index 1, at position doc_id - first_doc_id
+    doc_stats2 = []  # max_tf and doclen of every document for index 2, at position doc_id - first_doc_id
+    title_map = {}
+
+    for doc_id_counter, lemma_list, stem_list, doclen, title in read_analyzed_documents(files, first_doc_id, stopwords,
+                                                                                        metrics):
+        if title is not None:
+            title_map.update({doc_id_counter: title})
+
+        # Create unsorted index 1
+        index1_unsorted, curr_max_tf = get_unsorted_index(index1_unsorted, lemma_list, doc_id_counter, doclen)
+        doc_stats1.append((curr_max_tf, doclen))
+
+        # Create unsorted index 2
+        index2_unsorted, curr_max_tf = get_unsorted_index(index2_unsorted, stem_list, doc_id_counter, doclen)
+        doc_stats2.append((curr_max_tf, doclen))
+
+        if positional:
+            add_document_positions(positional_unsorted, lemma_list, doc_id_counter)
+        metrics.lap("inversion")
+
+    return index1_unsorted, index2_unsorted, doc_stats1, doc_stats2, title_map, positional_unsorted
+
+
+def build_partial_index_in_worker(shard):
+    """
+    Build the partial index of a shard in a worker process, and send back the entries added to the lemma, stem and
+    document caches of the worker so that they and the counters are merged into the caches of the calling process,
+    along with the build metrics of the shard
+    :param shard: see build_partial_index
+    :return: partial index, lemma cache changes, stem cache changes, document cache changes, metrics
+    """
+    # Forked workers inherit the counters of the calling process, only the lookups of this shard are sent back
+    lemma_cache.reset_counters()
+    stem_cache.reset_counters()
+    document_cache.reset_counters()
+    lemma_keys = set(lemma_cache.entries)
+    stem_keys = set(stem_cache.entries)
+    metrics = BuildMetrics()
+    partial_index = build_partial_index(shard, metrics)
+
+    # Only the entries of this shard are sent back, the calling process or an earlier shard of this worker sent the
+    # others
+    return partial_index, lemma_cache.get_changes(lemma_keys), stem_cache.get_changes(stem_keys), \
+        document_cache.get_changes(), metrics
+
+
+def merge_partial_indexes(partial_indexes):
+    """
+    Merge partial indexes of consecutive shards; appending the posting lists shard by shard keeps them in doc_id order.
+    The number of documents of a shard is only known once its files are read, so every shard numbers its documents
+    from 1 and its doc_ids are moved past the documents of the shards before it
+    :param partial_indexes: results of build_partial_index, in shard order
+    :return: index1_unsorted, index2_unsorted, doc_stats1, doc_stats2, title_map, positional_unsorted
+    """
+    index1_unsorted = {}
+    index2_unsorted = {}
+    doc_stats1 = []
+    doc_stats2 = []
+    title_map = {}
+    positional_unsorted = None
+    for part1, part2, part_stats1, part_stats2, part_titles, part_positional in partial_indexes:
+        offset = len(doc_stats1)
+        parts = [(index1_unsorted, part1), (index2_unsorted, part2)]
+        if part_positional is not None:
+            if positional_unsorted is None:
+                positional_unsorted = {}
+            parts.append((positional_unsorted, part_positional))
+        for index_unsorted, part in parts:
+            for term in part:
+                if offset > 0:
+                    part[term].doc_ids = array('I', [doc_id + offset for doc_id in part[term].doc_ids])
+                posting_list = index_unsorted.get(term)
+                if posting_list is None:
+                    index_unsorted.update({term: part[term]})
+                else:
+                    posting_list.extend(part[term])
+        doc_stats1.extend(part_stats1)
+        doc_stats2.extend(part_stats2)
+        for doc_id in part_titles:
+            title_map.update({doc_id + offset: part_titles[doc_id]})
+    return index1_unsorted, index2_unsorted, doc_stats1, doc_stats2, title_map, positional_unsorted
+
+
+def build_index_parallel(collection, stopwords, num_processes, shards_per_process=4, metrics=None, positional=False):
+    """
+    Analyze the collection in a pool of worker processes and merge their partial indexes.
+    The result is identical to build_partial_index((1, collection, stopwords, positional))
+    :param collection: list of files, doc_ids follow the order of the files and of the documents in a file
+    :param stopwords:
+    :param num_processes:
+    :param shards_per_process: more shards than processes balance the load across the workers
+    :param metrics: optional BuildMetrics, gets the stage times of the workers added up, the wall time of the workers
+    and the merge time
+    :param positional: True to build the positional index of the lemmas as well
+    :return: index1_unsorted, index2_unsorted, doc_stats1, doc_stats2, title_map, positional_unsorted
+    """
+    num_shards = max(1, min(len(collection), num_processes * shards_per_process))
+    shard_size = (len(collection) + num_shards - 1) // num_shards
+    shards = []
+    for start in range(0, len(collection), shard_size):
+        shards.append((1, collection[start:start + shard_size], stopwords, positional))
+
+    if metrics is None:
+        metrics = BuildMetrics()
+
+    # Forked workers inherit the loaded modules and term caches and do not re-run the calling script
+    with metrics.stage("workers"):
+        pool = multiprocessing.get_context("fork").Pool(processes=num_processes)
+        try:
+            results = pool.map(build_partial_index_in_worker, shards)
+        finally:
+            pool.close()
+            pool.join()
+
+    partial_indexes = []
+    for partial_index, worker_lemma_cache, worker_stem_cache, worker_document_cache, worker_metrics in results:
+        partial_indexes.append(partial_index)
+        lemma_cache.merge(worker_lemma_cache)
+        stem_cache.merge(worker_stem_cache)
+        document_cache.merge(worker_document_cache)
+        metrics.merge(worker_metrics)
+    with metrics.stage("merge"):
+        return merge_partial_indexes(partial_indexes)
@@ -0,0 +1,86 @@
+"""
+Author: Anshul Pardhi
+Deep memory accounting of the index structures. sys.getsizeof only counts a container itself, not the terms, posting
+lists and byte strings it refers to, so the sizes here follow the references and count every object once
+"""
+
+import sys
+from array import array
+from collections import OrderedDict
+
+# Objects without references to other objects, their size is their getsizeof
+LEAF_TYPES = (str, bytes, bytearray, array, int, float, bool, type(None))
+
+
+def get_deep_size(obj, seen=None):
+    """
+    Get the size of an object and of all the objects it refers to, through containers, __dict__ and __slots__
+    :param obj:
+    :param seen: set of ids of the objects already counted, shared to count the parts of a structure separately
+    :return: size in bytes
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        curr_obj = stack.pop()
+        if id(curr_obj) in seen:
+            continue
+        seen.add(id(curr_obj))
+        size += sys.getsizeof(curr_obj)
+        if isinstance(curr_obj, LEAF_TYPES):
+            continue
+        if isinstance(curr_obj, dict):
+            stack.extend(curr_obj.keys())
+            stack.extend(curr_obj.values())
+        elif isinstance(curr_obj, (list, tuple, set, frozenset)):
+            stack.extend(curr_obj)
+        else:
+            if hasattr(curr_obj, "__dict__"):
+                stack.append(curr_obj.__dict__)
+            for slot in getattr(type(curr_obj), "__slots__", ()):
+                if hasattr(curr_obj, slot):
+                    stack.append(getattr(curr_obj, slot))
+    return size
+
+
+def get_index_size(index):
+    """
+    Get the deep size of an uncompressed index and of its components
+    :param index: index of the form {word: posting_list(doc_id, tf, max_tf, doclen)}
+    :return: map of the form {component: bytes}, total included
+    """
+    sizes = OrderedDict()
+    sizes["dictionary"] = sys.getsizeof(index)  # Hash table of the dictionary only
+    sizes["terms"] = sum(sys.getsizeof(key) for key in index)
+    posting_lists = [index[key] for key in index]
+    sizes["posting lists"] = sum(sys.getsizeof(posting_list) for posting_list in posting_lists)
+    for column in ("doc_ids", "tfs", "max_tfs", "doclens"):
+        sizes[column] = sum(sys.getsizeof(getattr(posting_list, column)) for posting_list in posting_lists)
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+
+def get_compressed_index_size(index_compressed, key_str):
+    """
+    Get the deep size of a compressed index and of its components
+    :param index_compressed: list of the compressed postings entries
+    :param key_str: compressed dictionary string
+    :return: map of the form {component: bytes}, total included
+    """
+    sizes = OrderedDict()
+    sizes["entry list"] = sys.getsizeof(index_compressed)
+    sizes["postings"] = sum(sys.getsizeof(entry) for entry in index_compressed)
+    sizes["key string"] = sys.getsizeof(key_str)
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+
+def format_sizes(sizes):
+    """
+    Format the components of a size breakdown for printing
+    :param sizes: see get_index_size
+    :return: string of the form component1: bytes1, component2: bytes2 and so on
+    """
+    return ", ".join("%s: %s" % (component, sizes[component]) for component in sizes if component != "total")
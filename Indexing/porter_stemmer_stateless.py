@@ -0,0 +1,256 @@
+"""
+Author: Anshul Pardhi
+Re-entrant, table-driven version of the Porter stemmer in porter_stemmer_tartarus.py, producing the same stems.
+The word being stemmed is held in local variables instead of the stemmer instance, so one stemmer can be shared
+across threads, and the suffixes of steps 2 to 4 are looked up in tables keyed by the letter the original switches on
+"""
+
+import re
+
+VOWELS = frozenset("aeiou")
+VOWEL_CONSONANT = re.compile(r"[aeiou][^aeiou]")  # Only valid for words without y, whose consonants need context
+
+# Suffix tables of the form {letter: ((suffix, replacement), ...)}, tried in order until a suffix matches
+STEP2_SUFFIXES = {  # Keyed by the penultimate letter
+    'a': (("ational", "ate"), ("tional", "tion")),
+    'c': (("enci", "ence"), ("anci", "ance")),
+    'e': (("izer", "ize"),),
+    'l': (("bli", "ble"), ("alli", "al"), ("entli", "ent"), ("eli", "e"), ("ousli", "ous")),
+    'o': (("ization", "ize"), ("ation", "ate"), ("ator", "ate")),
+    's': (("alism", "al"), ("iveness", "ive"), ("fulness", "ful"), ("ousness", "ous")),
+    't': (("aliti", "al"), ("iviti", "ive"), ("biliti", "ble")),
+    'g': (("logi", "log"),),
+}
+STEP3_SUFFIXES = {  # Keyed by the last letter
+    'e': (("icate", "ic"), ("ative", ""), ("alize", "al")),
+    'i': (("iciti", "ic"),),
+    'l': (("ical", "ic"), ("ful", "")),
+    's': (("ness", ""),),
+}
+# Suffixes of the form (suffix, letters one of which must precede it or None), keyed by the penultimate letter
+STEP4_SUFFIXES = {
+    'a': (("al", None),),
+    'c': (("ance", None), ("ence", None)),
+    'e': (("er", None),),
+    'i': (("ic", None),),
+    'l': (("able", None), ("ible", None)),
+    'n': (("ant", None), ("ement", None), ("ment", None), ("ent", None)),
+    'o': (("ion", "st"), ("ou", None)),
+    's': (("ism", None),),
+    't': (("ate", None), ("iti", None)),
+    'u': (("ous", None),),
+    'v': (("ive", None),),
+    'z': (("ize", None),),
+}
+
+
+def is_consonant(b, i, k0):
+    """
+    :param b: word buffer
+    :param i:
+    :param k0: start of the word in the buffer
+    :return: True if b[i] is a consonant
+    """
+    ch = b[i]
+    if ch in VOWELS:
+        return False
+    if ch != 'y' or i == k0:
+        return True
+    return not is_consonant(b, i - 1, k0)
+
+
+def measure(b, k0, j):
+    """
+    Count the vowel-consonant sequences in b[k0..j], i.e. m in <c>(vc)^m<v>
+    :param b:
+    :param k0:
+    :param j:
+    :return: m
+    """
+    if b.find('y', k0, j + 1) < 0:
+        return len(VOWEL_CONSONANT.findall(b, k0, j + 1))
+    n = 0
+    prev_consonant = True
+    for i in range(k0, j + 1):
+        ch = b[i]
+        if ch in VOWELS:
+            consonant = False
+        elif ch == 'y' and i != k0:
+            consonant = not prev_consonant
+        else:
+            consonant = True
+        if consonant and not prev_consonant:
+            n += 1
+        prev_consonant = consonant
+    return n
+
+
+def has_vowel(b, k0, j):
+    """
+    :param b:
+    :param k0:
+    :param j:
+    :return: True if b[k0..j] contains a vowel
+    """
+    for vowel in "aeiou":
+        if b.find(vowel, k0, j + 1) >= 0:
+            return True
+    # Without other vowels, a y is a vowel if it follows a consonant, i.e. if it is not the first letter
+    return b.find('y', k0 + 1, j + 1) >= 0
+
+
+def is_double_consonant(b, j, k0):
+    """
+    :param b:
+    :param j:
+    :param k0:
+    :return: True if b[j - 1..j] is a double consonant
+    """
+    return j >= k0 + 1 and b[j] == b[j - 1] and is_consonant(b, j, k0)
+
+
+def is_cvc(b, i, k0):
+    """
+    :param b:
+    :param i:
+    :param k0:
+    :return: True if b[i - 2..i] is consonant-vowel-consonant and the second consonant is not w, x or y
+    """
+    if i < k0 + 2 or not is_consonant(b, i, k0) or is_consonant(b, i - 1, k0) or not is_consonant(b, i - 2, k0):
+        return False
+    return b[i] not in "wxy"
+
+
+def set_suffix(b, j, s):
+    """
+    Replace b[j + 1..] with s the way the original setto does, keeping the characters past the replaced ones
+    :param b:
+    :param j:
+    :param s:
+    :return: b, k
+    """
+    return b[:j + 1] + s + b[j + len(s) + 1:], j + len(s)
+
+
+def replace_suffix(b, k, k0, suffixes):
+    """
+    Replace the first matching suffix of a step 2 or 3 table, if the rest of the word has m > 0
+    :param b:
+    :param k:
+    :param k0:
+    :param suffixes: ((suffix, replacement), ...)
+    :return: b, k
+    """
+    for suffix, replacement in suffixes:
+        if b.endswith(suffix, k0, k + 1):
+            j = k - len(suffix)
+            if measure(b, k0, j) > 0:
+                return set_suffix(b, j, replacement)
+            return b, k
+    return b, k
+
+
+class StatelessPorterStemmer:
+    """
+    Porter stemmer without per call state, same interface as PorterStemmer in porter_stemmer_tartarus.py
+    """
+
+    def stem(self, p, i, j):
+        """
+        Stem p[i..j]. As in the original, words of 1 or 2 letters are returned whole (--DEPARTURE--)
+        :param p:
+        :param i:
+        :param j:
+        :return: stem
+        """
+        b = p
+        k = j
+        k0 = i
+        if k <= k0 + 1:
+            return b
+
+        # Step 1ab: plurals and -ed or -ing
+        if b[k] == 's':
+            if b.endswith("sses", k0, k + 1):
+                k -= 2
+            elif b.endswith("ies", k0, k + 1):
+                b, k = set_suffix(b, k - 3, "i")
+            elif b[k - 1] != 's':
+                k -= 1
+        stem_end = None
+        if b[k] == 'd':
+            if b.endswith("eed", k0, k + 1):
+                if measure(b, k0, k - 3) > 0:
+                    k -= 1
+            elif b.endswith("ed", k0, k + 1):
+                stem_end = k - 2
+        elif b[k] == 'g' and b.endswith("ing", k0, k + 1):
+            stem_end = k - 3
+        if stem_end is not None and has_vowel(b, k0, stem_end):
+            k = stem_end
+            if b.endswith("at", k0, k + 1):
+                b, k = set_suffix(b, k - 2, "ate")
+            elif b.endswith("bl", k0, k + 1):
+                b, k = set_suffix(b, k - 2, "ble")
+            elif b.endswith("iz", k0, k + 1):
+                b, k = set_suffix(b, k - 2, "ize")
+            elif is_double_consonant(b, k, k0):
+                if b[k - 1] not in "lsz":
+                    k -= 1
+            elif measure(b, k0, k) == 1 and is_cvc(b, k, k0):
+                b, k = set_suffix(b, k, "e")
+
+        # Step 1c: terminal y to i when there is another vowel in the stem
+        if b[k] == 'y' and has_vowel(b, k0, k - 1):
+            b = b[:k] + 'i' + b[k + 1:]
+
+        # Step 2 and 3: double suffixes to single ones, then -ic-, -full, -ness etc.
+        suffixes = STEP2_SUFFIXES.get(b[k - 1])
+        if suffixes is not None:
+            b, k = replace_suffix(b, k, k0, suffixes)
+        suffixes = STEP3_SUFFIXES.get(b[k])
+        if suffixes is not None:
+            b, k = replace_suffix(b, k, k0, suffixes)
+
+        # Step 4: -ant, -ence etc. in context <c>vcvc<v>
+        for suffix, preceding in STEP4_SUFFIXES.get(b[k - 1], ()):
+            if b.endswith(suffix, k0, k + 1):
+                j = k - len(suffix)
+                if preceding is None or b[j] in preceding:
+                    if measure(b, k0, j) > 1:
+                        k = j
+                    break
+
+        # Step 5: final -e and -ll if m() > 1, m() is measured up to the end of the word as it was before the step
+        j = k
+        if b[k] == 'e':
+            a = measure(b, k0, j)
+            if a > 1 or (a == 1 and not is_cvc(b, k - 1, k0)):
+                k -= 1
+        if b[k] == 'l' and is_double_consonant(b, k, k0) and measure(b, k0, j) > 1:
+            k -= 1
+        return b[k0:k + 1]
+
+    def stem_word(self, word):
+        """
+        Stem a whole word
+        :param word:
+        :return: stem
+        """
+        return self.stem(word, 0, len(word) - 1)
+
+    def stem_many(self, tokens):
+        """
+        Stem a batch of tokens, stemming every distinct token once
+        :param tokens:
+        :return: list of stems, in the order of the tokens
+        """
+        stems = {}
+        stem_list = []
+        for token in tokens:
+            stemmed_token = stems.get(token)
+            if stemmed_token is None:
+                stemmed_token = self.stem(token, 0, len(token) - 1)
+                stems[token] = stemmed_token
+            stem_list.append(stemmed_token)
+        return stem_list
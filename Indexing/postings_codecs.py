@@ -0,0 +1,662 @@
+"""
+Author: Anshul Pardhi
+Registry of the codecs that compress the doc_id gaps and tfs of the posting lists. Besides the gamma and delta bit
+codes of bit_codec.py, the byte aligned variable-byte, Simple-8b and PForDelta codecs are decoded with NumPy, a whole
+posting list or block at a time instead of one bit at a time
+"""
+
+import time
+from collections import OrderedDict
+from bit_codec import BitWriter, BitReader, encode_gamma, decode_gamma, encode_delta, decode_delta, get_gaps, \
+    get_doc_ids
+from skip_postings import SKIP_MIN_DF, SkipPostings, get_chunk_bounds
+
+try:
+    import numpy as np  # Only needed by the byte aligned codecs
+except ImportError:
+    np = None
+
+CODECS = OrderedDict()  # Registered codecs of the form {name: codec}
+DEFAULT_CODECS = {1: "gamma", 2: "delta"}  # Codec of each index version, by index_flag
+# Below these numbers of values, setting up the NumPy calls costs more than decoding the values one by one
+VBYTE_SCALAR_LIMIT = 32
+SIMPLE8B_SCALAR_LIMIT = 256
+PFORDELTA_SCALAR_LIMIT = 256
+
+
+def register_codec(codec):
+    """
+    Add a codec to the registry, replacing a codec of the same name
+    :param codec:
+    :return: codec
+    """
+    CODECS.update({codec.name: codec})
+    return codec
+
+
+def get_codec(name):
+    """
+    Get a registered codec
+    :param name:
+    :return: codec
+    """
+    if name not in CODECS:
+        raise ValueError("Unknown postings codec %s, the codecs are %s" % (name, ", ".join(CODECS)))
+    return CODECS[name]
+
+
+def encode_vbyte_value(value, output):
+    """
+    Variable-byte code a non-negative integer: 7 bits per byte, most significant group first, and the high bit set on
+    the last byte
+    :param value:
+    :param output: bytearray to append to
+    :return:
+    """
+    groups = [value & 0x7f]
+    value >>= 7
+    while value:
+        groups.append(value & 0x7f)
+        value >>= 7
+    groups[0] |= 0x80
+    output.extend(reversed(groups))
+
+
+def decode_vbyte_value(data, offset):
+    """
+    Decode one variable-byte coded integer
+    :param data:
+    :param offset:
+    :return: value, offset after the value
+    """
+    value = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value = (value << 7) | (byte & 0x7f)
+        if byte & 0x80:
+            return value, offset
+
+
+def require_numpy(name):
+    if np is None:
+        raise ImportError("The %s codec needs NumPy: pip3 install numpy --user" % name)
+
+
+class PostingsCodec:
+    """
+    Base of the codecs, lays out the compressed index entries. A posting list without skip pointers is coded as
+    df, the key string pointer of the first term of a block, the doc_id gaps and the tfs. A posting list with skip
+    pointers (see skip_postings.py) is coded as df, the key string pointer and the skip table, i.e. the gaps between the
+    first doc_ids of the chunks and the coded length of every chunk, followed by the chunks, each of them holding the
+    doc_id gaps after its first doc_id and its tfs
+    """
+
+    name = None
+
+    def encode(self, values):
+        """
+        Encode positive integers, padded to a byte boundary
+        :param values:
+        :return: bytes
+        """
+        raise NotImplementedError
+
+    def decode(self, data, offset, count):
+        """
+        Decode integers written by encode
+        :param data:
+        :param offset: position of the first byte
+        :param count: number of integers
+        :return: values, offset after the values
+        """
+        raise NotImplementedError
+
+    def encode_with_header(self, header, values):
+        """
+        Encode the df and key string pointer of an entry followed by values
+        :param header: [df] or [df, key_ptr]
+        :param values:
+        :return: bytes
+        """
+        raise NotImplementedError
+
+    def decode_with_header(self, data, offset, has_key_ptr, get_count):
+        """
+        Decode the df and key string pointer of an entry and the values following them
+        :param data:
+        :param offset:
+        :param has_key_ptr: True for the first term of a block
+        :param get_count: function giving the number of values from the df
+        :return: df, key_ptr, values, offset after the values
+        """
+        raise NotImplementedError
+
+    def get_doc_ids(self, first_doc_id, gaps):
+        """
+        Running sum of the gaps
+        :param first_doc_id: doc_id the gaps start from
+        :param gaps:
+        :return: doc_ids
+        """
+        raise NotImplementedError
+
+    def concatenate(self, parts):
+        raise NotImplementedError
+
+    def to_list(self, values):
+        raise NotImplementedError
+
+    def encode_entry(self, doc_ids, tfs, key_ptr=None):
+        """
+        Encode a compressed index entry
+        :param doc_ids:
+        :param tfs:
+        :param key_ptr:
+        :return: bytes
+        """
+        header = [len(doc_ids)] if key_ptr is None else [len(doc_ids), key_ptr]
+        bounds = get_chunk_bounds(len(doc_ids))
+        if len(bounds) == 1:
+            return self.encode_with_header(header, get_gaps(doc_ids) + list(tfs))
+        chunks = [self.encode(get_gaps(doc_ids[start:end])[1:] + list(tfs[start:end])) for start, end in bounds]
+        skip_table = get_gaps([doc_ids[start] for start, end in bounds]) + [len(chunk) for chunk in chunks]
+        return self.encode_with_header(header, skip_table) + b"".join(chunks)
+
+    def decode_skip_table(self, data, offset, has_key_ptr=False):
+        """
+        Decode an entry up to its chunks, a posting list without skip pointers is decoded entirely
+        :param data:
+        :param offset:
+        :param has_key_ptr:
+        :return: key_ptr, chunk_firsts, chunk_sizes, chunk_offsets, offset after the entry, (doc_ids, tfs) of a
+        posting list without skip pointers or None
+        """
+        df, key_ptr, values, offset = self.decode_with_header(
+            data, offset, has_key_ptr, lambda df: 2 * df if df < SKIP_MIN_DF else 2 * len(get_chunk_bounds(df)))
+        if df < SKIP_MIN_DF:
+            return key_ptr, None, None, None, offset, (self.get_doc_ids(0, values[:df]), values[df:])
+
+        num_chunks = len(values) // 2
+        chunk_firsts = self.get_doc_ids(0, values[:num_chunks])
+        chunk_sizes = [end - start for start, end in get_chunk_bounds(df)]
+        chunk_offsets = []
+        for chunk_len in values[num_chunks:]:
+            chunk_offsets.append(offset)
+            offset += int(chunk_len)
+        return key_ptr, chunk_firsts, chunk_sizes, chunk_offsets, offset, None
+
+    def decode_chunk(self, data, offset, first_doc_id, size):
+        """
+        Decode a chunk of a posting list with skip pointers
+        :param data:
+        :param offset:
+        :param first_doc_id: first doc_id of the chunk, from the skip table
+        :param size: number of postings of the chunk
+        :return: doc_ids, tfs
+        """
+        values, offset = self.decode(data, offset, 2 * size - 1)
+        return self.get_doc_ids(first_doc_id, self.concatenate([[0], values[:size - 1]])), values[size - 1:]
+
+    def decode_entry(self, data, offset, has_key_ptr=False):
+        """
+        Decode a compressed index entry written by encode_entry
+        :param data:
+        :param offset:
+        :param has_key_ptr: True for the first term of a block
+        :return: doc_ids, tfs, key_ptr, offset after the entry
+        """
+        key_ptr, chunk_firsts, chunk_sizes, chunk_offsets, offset, postings = self.decode_skip_table(data, offset,
+                                                                                                    has_key_ptr)
+        if postings is not None:
+            return postings[0], postings[1], key_ptr, offset
+        doc_ids, tfs = self.decode_chunks(data, chunk_offsets, chunk_firsts, chunk_sizes)
+        return doc_ids, tfs, key_ptr, offset
+
+    def decode_chunks(self, data, chunk_offsets, chunk_firsts, chunk_sizes):
+        """
+        Decode all the chunks of a posting list with skip pointers
+        :param data:
+        :param chunk_offsets: see decode_skip_table
+        :param chunk_firsts:
+        :param chunk_sizes:
+        :return: doc_ids, tfs
+        """
+        chunks = [self.decode_chunk(data, chunk_offsets[i], chunk_firsts[i], chunk_sizes[i])
+                  for i in range(len(chunk_sizes))]
+        doc_ids = self.concatenate([chunk_doc_ids for chunk_doc_ids, chunk_tfs in chunks])
+        tfs = self.concatenate([chunk_tfs for chunk_doc_ids, chunk_tfs in chunks])
+        return doc_ids, tfs
+
+    def decode_skip_postings(self, data, offset, has_key_ptr=False):
+        """
+        Decode the skip table of an entry, the chunks are decoded when they are first read
+        :param data:
+        :param offset:
+        :param has_key_ptr:
+        :return: SkipPostings, key_ptr, offset after the entry
+        """
+        key_ptr, chunk_firsts, chunk_sizes, chunk_offsets, offset, postings = self.decode_skip_table(data, offset,
+                                                                                                    has_key_ptr)
+        if postings is not None:
+            return SkipPostings.from_doc_ids(self.to_list(postings[0])), key_ptr, offset
+
+        def load_chunk(chunk_no):
+            doc_ids, tfs = self.decode_chunk(data, chunk_offsets[chunk_no], chunk_firsts[chunk_no],
+                                             chunk_sizes[chunk_no])
+            return self.to_list(doc_ids)
+        return SkipPostings(self.to_list(chunk_firsts), chunk_sizes, load_chunk), key_ptr, offset
+
+
+class BitCodec(PostingsCodec):
+    """
+    Gamma or delta bit code, see bit_codec.py
+    """
+
+    def __init__(self, name, index_flag, encode, decode):
+        """
+        :param name:
+        :param index_flag: the bit_codec.py flag of the code, 1: gamma; 2: delta
+        :param encode: encode_gamma or encode_delta
+        :param decode: decode_gamma or decode_delta
+        """
+        self.name = name
+        self.index_flag = index_flag
+        self.encode_value = encode
+        self.decode_value = decode
+
+    def encode(self, values):
+        writer = BitWriter()
+        for value in values:
+            self.encode_value(writer, value)
+        writer.align()
+        return writer.get_bytes()
+
+    def decode(self, data, offset, count):
+        """
+        See PostingsCodec.decode
+        :return: list of values, offset after the values
+        """
+        reader = BitReader(data, offset)
+        values = [self.decode_value(reader) for i in range(count)]
+        reader.align()
+        return values, reader.byte_offset()
+
+    def encode_with_header(self, header, values):
+        # The key string pointer is stored as ptr + 1, since the codes are undefined for 0
+        return self.encode(header[:1] + [key_ptr + 1 for key_ptr in header[1:]] + values)
+
+    def decode_with_header(self, data, offset, has_key_ptr, get_count):
+        reader = BitReader(data, offset)
+        df = self.decode_value(reader)
+        key_ptr = self.decode_value(reader) - 1 if has_key_ptr else None
+        values = [self.decode_value(reader) for i in range(get_count(df))]
+        reader.align()
+        return df, key_ptr, values, reader.byte_offset()
+
+    def get_doc_ids(self, first_doc_id, gaps):
+        doc_ids = get_doc_ids(gaps)
+        return [first_doc_id + doc_id for doc_id in doc_ids] if first_doc_id else doc_ids
+
+    def concatenate(self, parts):
+        return [value for part in parts for value in part]
+
+    def to_list(self, values):
+        return values
+
+
+class ByteCodec(PostingsCodec):
+    """
+    Base of the byte aligned codecs. The df and key string pointer of an entry are variable-byte coded, the other
+    values are in the format of the codec and decoded into NumPy arrays. Every NumPy call has a fixed cost that
+    outweighs its speed on a few values, so a codec decodes fewer than scalar_limit values one by one, and the chunks of
+    a posting list are decoded together
+    """
+
+    scalar_limit = 0
+
+    def decode(self, data, offset, count):
+        return self.decode_many(data, offset, [count])
+
+    def decode_many(self, data, offset, counts):
+        """
+        Decode consecutive runs of integers, each of them encoded by its own call to encode
+        :param data:
+        :param offset:
+        :param counts: number of integers of every run
+        :return: NumPy array of the values of all the runs, offset after the values
+        """
+        require_numpy(self.name)
+        if sum(counts) < self.scalar_limit:
+            values, offset = self.decode_scalar(data, offset, counts)
+            return np.array(values, dtype=np.int64), offset
+        return self.decode_vectorized(data, offset, counts)
+
+    def decode_scalar(self, data, offset, counts):
+        """
+        See decode_many
+        :return: list of values, offset after the values
+        """
+        raise NotImplementedError
+
+    def decode_vectorized(self, data, offset, counts):
+        """
+        See decode_many
+        :return: NumPy array of values, offset after the values
+        """
+        raise NotImplementedError
+
+    def decode_chunks(self, data, chunk_offsets, chunk_firsts, chunk_sizes):
+        """
+        Decode all the chunks of a posting list at once, see PostingsCodec.decode_chunks. The chunks follow each other,
+        every chunk holds the size - 1 doc_id gaps after its first doc_id and then its size tfs
+        """
+        sizes = np.array(chunk_sizes, dtype=np.intp)
+        counts = 2 * sizes - 1
+        values, offset = self.decode_many(data, chunk_offsets[0], counts.tolist())
+        value_starts = np.cumsum(counts) - counts
+        posting_starts = np.cumsum(sizes) - sizes
+        chunk_of = np.repeat(np.arange(len(sizes)), sizes)
+        i = np.arange(len(chunk_of)) - posting_starts[chunk_of]  # Position of every posting in its chunk
+        tfs = values[value_starts[chunk_of] + sizes[chunk_of] - 1 + i]
+        gaps = np.where(i > 0, values[value_starts[chunk_of] + i - 1], 0)
+        doc_ids = np.cumsum(gaps)
+        doc_ids += np.repeat(np.asarray(chunk_firsts, dtype=np.int64) - doc_ids[posting_starts], sizes)
+        return doc_ids, tfs
+
+    def encode_with_header(self, header, values):
+        output = bytearray()
+        for value in header:
+            encode_vbyte_value(value, output)
+        return bytes(output) + self.encode(values)
+
+    def decode_with_header(self, data, offset, has_key_ptr, get_count):
+        df, offset = decode_vbyte_value(data, offset)
+        key_ptr = None
+        if has_key_ptr:
+            key_ptr, offset = decode_vbyte_value(data, offset)
+        values, offset = self.decode(data, offset, get_count(df))
+        return df, key_ptr, values, offset
+
+    def get_doc_ids(self, first_doc_id, gaps):
+        return first_doc_id + np.cumsum(gaps)
+
+    def concatenate(self, parts):
+        return np.concatenate(parts)
+
+    def to_list(self, values):
+        return values.tolist()
+
+
+class VByteCodec(ByteCodec):
+    """
+    Variable-byte code, see encode_vbyte_value
+    """
+
+    name = "vbyte"
+
+    def encode(self, values):
+        output = bytearray()
+        for value in values:
+            encode_vbyte_value(value, output)
+        return bytes(output)
+
+    scalar_limit = VBYTE_SCALAR_LIMIT
+
+    def decode_scalar(self, data, offset, counts):
+        values = []
+        for i in range(sum(counts)):
+            value, offset = decode_vbyte_value(data, offset)
+            values.append(value)
+        return values, offset
+
+    def decode_vectorized(self, data, offset, counts):
+        """
+        Decode the integers at once: the bytes with the high bit set end the values, and every byte is shifted by 7
+        bits per byte between it and the end of its value
+        :param data:
+        :param offset:
+        :param counts:
+        :return: NumPy array of values, offset after the values
+        """
+        count = sum(counts)
+        window = min(len(data) - offset, 10 * count)  # A 64 bit value takes at most 10 bytes
+        arr = np.frombuffer(data, dtype=np.uint8, count=window, offset=offset)
+        ends = np.flatnonzero(arr & 0x80)[:count]
+        if len(ends) < count:
+            raise ValueError("Truncated variable-byte data, %s of %s values found" % (len(ends), count))
+        arr = arr[:ends[-1] + 1]
+        value_ids = np.zeros(len(arr), dtype=np.intp)
+        value_ids[ends[:-1] + 1] = 1
+        value_ids = np.cumsum(value_ids)
+        shifts = 7 * (ends[value_ids] - np.arange(len(arr)))
+        # Values of up to 53 bits are exact in the float64 weights of bincount
+        values = np.bincount(value_ids, weights=(arr & 0x7f).astype(np.int64) << shifts, minlength=count)
+        return values.astype(np.int64), offset + len(arr)
+
+
+# Simple-8b selectors of the form (number of values, bits per value), the selector is the top 4 bits of a 64 bit word
+SIMPLE8B_SELECTORS = ((240, 0), (120, 0), (60, 1), (30, 2), (20, 3), (15, 4), (12, 5), (10, 6), (8, 7), (7, 8),
+                      (6, 10), (5, 12), (4, 15), (3, 20), (2, 30), (1, 60))
+if np is not None:
+    SIMPLE8B_COUNTS = np.array([count for count, bits in SIMPLE8B_SELECTORS], dtype=np.intp)
+    SIMPLE8B_BITS = np.array([bits for count, bits in SIMPLE8B_SELECTORS], dtype=np.uint64)
+
+
+class Simple8bCodec(ByteCodec):
+    """
+    Simple-8b: as many values as fit in the 60 bit payload of a 64 bit word at the same width. Values are stored
+    minus 1, so runs of gaps of 1 take 0 bits
+    """
+
+    name = "simple8b"
+
+    def encode(self, values):
+        values = [value - 1 for value in values]
+        output = bytearray()
+        i = 0
+        while i < len(values):
+            for selector in range(len(SIMPLE8B_SELECTORS)):
+                count, bits = SIMPLE8B_SELECTORS[selector]
+                chunk = values[i:i + count]
+                if len(chunk) == count and max(chunk) < (1 << bits):
+                    word = selector << 60
+                    for j in range(count):
+                        word |= chunk[j] << (bits * j)
+                    output.extend(word.to_bytes(8, "little"))
+                    i += count
+                    break
+            else:
+                raise ValueError("Simple-8b stores values of up to 60 bits, got %s" % (values[i] + 1))
+        return bytes(output)
+
+    scalar_limit = SIMPLE8B_SCALAR_LIMIT
+
+    def decode_scalar(self, data, offset, counts):
+        count = sum(counts)
+        values = []
+        while len(values) < count:
+            word = int.from_bytes(data[offset:offset + 8], "little")
+            offset += 8
+            selector_count, bits = SIMPLE8B_SELECTORS[word >> 60]
+            if bits == 0:
+                values.extend([1] * selector_count)
+            else:
+                mask = (1 << bits) - 1
+                values.extend(((word >> (bits * j)) & mask) + 1 for j in range(selector_count))
+        if len(values) != count:
+            raise ValueError("Simple-8b words do not hold %s values" % count)
+        return values, offset
+
+    def decode_vectorized(self, data, offset, counts):
+        """
+        Decode the integers at once: every value is shifted out of its word by its position times the width of the
+        selector of the word
+        :param data:
+        :param offset:
+        :param counts:
+        :return: NumPy array of values, offset after the values
+        """
+        count = sum(counts)
+        window = min(count, (len(data) - offset) // 8)  # Every word holds at least one value
+        words = np.frombuffer(data, dtype="<u8", count=window, offset=offset)
+        selectors = (words >> np.uint64(60)).astype(np.intp)
+        word_counts = SIMPLE8B_COUNTS[selectors]
+        ends = np.cumsum(word_counts)
+        num_words = int(np.searchsorted(ends, count)) + 1
+        if num_words > len(words) or ends[num_words - 1] != count:
+            raise ValueError("Simple-8b words do not hold %s values" % count)
+        word_counts = word_counts[:num_words]
+        word_of = np.repeat(np.arange(num_words), word_counts)
+        j = np.arange(count) - (ends[:num_words] - word_counts)[word_of]  # Position of every value in its word
+        bits = SIMPLE8B_BITS[selectors[:num_words]][word_of]
+        values = (words[word_of] >> (j.astype(np.uint64) * bits)) & ((np.uint64(1) << bits) - np.uint64(1))
+        return values.astype(np.int64) + 1, offset + 8 * num_words
+
+
+class PForDeltaCodec(ByteCodec):
+    """
+    PForDelta: blocks of 128 values packed at the width that fits 90% of them, the larger values are exceptions whose
+    high bits are stored after the block. Values are stored minus 1, as in Simple8bCodec
+    """
+
+    name = "pfordelta"
+    block_size = 128
+
+    def encode(self, values):
+        values = [value - 1 for value in values]
+        output = bytearray()
+        for start in range(0, len(values), self.block_size):
+            block = values[start:start + self.block_size]
+            bits = sorted(block)[(len(block) * 9 + 9) // 10 - 1].bit_length()  # Width of the 90th percentile
+            exceptions = [i for i in range(len(block)) if block[i] >> bits]
+
+            # Block is of the form bits num_exceptions packed_values exception_positions exception_high_bits
+            packed = 0
+            for i in range(len(block)):
+                packed |= (block[i] & ((1 << bits) - 1)) << (bits * i)
+            output.append(bits)
+            output.append(len(exceptions))
+            output.extend(packed.to_bytes((len(block) * bits + 7) // 8, "little"))
+            output.extend(exceptions)
+            for i in exceptions:
+                encode_vbyte_value(block[i] >> bits, output)
+        return bytes(output)
+
+    scalar_limit = PFORDELTA_SCALAR_LIMIT
+
+    def decode_scalar(self, data, offset, counts):
+        values = []
+        for count in counts:
+            for start in range(0, count, self.block_size):
+                block_len = min(self.block_size, count - start)
+                bits = data[offset]
+                num_exceptions = data[offset + 1]
+                offset += 2
+                packed_len = (block_len * bits + 7) // 8
+                packed = int.from_bytes(data[offset:offset + packed_len], "little")
+                offset += packed_len
+                mask = (1 << bits) - 1
+                block = [(packed >> (bits * i)) & mask for i in range(block_len)]
+                positions = data[offset:offset + num_exceptions]
+                offset += num_exceptions
+                for position in positions:
+                    high_bits, offset = decode_vbyte_value(data, offset)
+                    block[position] |= high_bits << bits
+                values.extend(value + 1 for value in block)
+        return values, offset
+
+    def decode_vectorized(self, data, offset, counts):
+        """
+        Decode the integers of all the blocks at once. The block headers are read first, since they give the length of
+        every block; the bytes of all the blocks are then unpacked to bits with one call, and the values of all the
+        blocks of the same width are gathered from the bits with one product
+        :param data:
+        :param offset:
+        :param counts:
+        :return: NumPy array of values, offset after the values
+        """
+        first_offset = offset
+        block_starts = []  # Position of the first value of every block in the decoded values
+        block_lens = []
+        block_bits = []
+        packed_offsets = []  # Offset of the packed values of every block from first_offset
+        exception_positions = []
+        exception_values = []
+        value_start = 0
+        for count in counts:
+            for start in range(value_start, value_start + count, self.block_size):
+                block_len = min(self.block_size, value_start + count - start)
+                bits = data[offset]
+                num_exceptions = data[offset + 1]
+                offset += 2
+                block_starts.append(start)
+                block_lens.append(block_len)
+                block_bits.append(bits)
+                packed_offsets.append(offset - first_offset)
+                offset += (block_len * bits + 7) // 8
+                for position in data[offset:offset + num_exceptions]:
+                    exception_positions.append(start + position)
+                offset += num_exceptions
+                for i in range(num_exceptions):
+                    high_bits, offset = decode_vbyte_value(data, offset)
+                    exception_values.append(high_bits << bits)
+            value_start += count
+
+        values = np.zeros(value_start, dtype=np.int64)
+        bit_array = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=offset - first_offset, offset=first_offset),
+                                  bitorder="little")
+        block_starts = np.array(block_starts, dtype=np.intp)
+        block_lens = np.array(block_lens, dtype=np.intp)
+        block_bits = np.array(block_bits, dtype=np.intp)
+        packed_offsets = np.array(packed_offsets, dtype=np.intp)
+        for bits in np.unique(block_bits):
+            if bits == 0:
+                continue  # The values are all 0, apart from the exceptions
+            blocks = np.flatnonzero(block_bits == bits)
+            lens = block_lens[blocks]
+            block_of = np.repeat(blocks, lens)
+            i = np.arange(len(block_of)) - np.repeat(np.cumsum(lens) - lens, lens)  # Position in the block
+            bit_matrix = bit_array[(8 * packed_offsets[block_of] + bits * i)[:, None] + np.arange(bits)]
+            values[block_starts[block_of] + i] = bit_matrix.astype(np.int64) @ (1 << np.arange(bits, dtype=np.int64))
+        if exception_positions:
+            values[exception_positions] |= np.array(exception_values, dtype=np.int64)
+        return values + 1, offset
+
+
+register_codec(BitCodec("gamma", 1, encode_gamma, decode_gamma))
+register_codec(BitCodec("delta", 2, encode_delta, decode_delta))
+register_codec(VByteCodec())
+register_codec(Simple8bCodec())
+register_codec(PForDeltaCodec())
+
+
+def compare_codecs(postings, block_size, repeat=3):
+    """
+    Compress the posting lists of an index with every registered codec and time the decoding of the whole index
+    :param postings: (doc_ids, tfs) of every posting list, in dictionary order
+    :param block_size: the first entry of every block has a key string pointer, as in the compressed index files
+    :param repeat: number of decoding runs, the fastest one is kept
+    :return: list of rows of the form (codec, bytes, bytes_per_posting, decode_seconds, postings_per_second, ok)
+    """
+    num_postings = sum(len(doc_ids) for doc_ids, tfs in postings)
+    rows = []
+    for name, codec in CODECS.items():
+        data = b"".join(codec.encode_entry(postings[i][0], postings[i][1], 0 if i % block_size == 0 else None)
+                        for i in range(len(postings)))
+        best_seconds = None
+        for run in range(repeat):
+            start = time.perf_counter()
+            decoded = []
+            offset = 0
+            for i in range(len(postings)):
+                doc_ids, tfs, key_ptr, offset = codec.decode_entry(data, offset, i % block_size == 0)
+                decoded.append((doc_ids, tfs))
+            seconds = time.perf_counter() - start
+            if best_seconds is None or seconds < best_seconds:
+                best_seconds = seconds
+        round_trip_ok = all(list(decoded[i][0]) == list(postings[i][0]) and list(decoded[i][1]) == list(postings[i][1])
+                            for i in range(len(postings)))
+        rows.append((name, len(data), round(float(len(data)) / num_postings, 3), round(best_seconds, 4),
+                     round(num_postings / best_seconds, 1) if best_seconds > 0 else None, round_trip_ok))
+    return rows
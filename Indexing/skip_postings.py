@@ -0,0 +1,128 @@
+"""
+Author: Anshul Pardhi
+Posting lists with skip pointers. The doc_ids are split into chunks of sqrt(df) postings, the first doc_id of every
+chunk is the target of a skip pointer from the start of the chunk before it. The chunks of a compressed posting list
+are coded separately, so a skipped chunk is never decoded
+"""
+
+import math
+
+SKIP_MIN_DF = 16  # Shorter posting lists get no skip pointers, they would cost more than they save
+
+
+def get_skip_spacing(df):
+    """
+    Get the number of postings between two skip pointers, sqrt(df) for the posting lists long enough to have them
+    :param df:
+    :return: skip spacing
+    """
+    if df < SKIP_MIN_DF:
+        return max(df, 1)
+    return int(math.sqrt(df))
+
+
+def get_chunk_bounds(df):
+    """
+    Split a posting list into the chunks between its skip pointers
+    :param df:
+    :return: list of (start, end) positions
+    """
+    spacing = get_skip_spacing(df)
+    return [(start, min(start + spacing, df)) for start in range(0, df, spacing)]
+
+
+class SkipPostings:
+    """
+    Doc_ids of a posting list in chunks, with the first doc_id of every chunk known without loading the chunk
+    """
+
+    def __init__(self, chunk_firsts, chunk_sizes, load_chunk):
+        """
+        :param chunk_firsts: first doc_id of every chunk
+        :param chunk_sizes: number of postings of every chunk
+        :param load_chunk: function returning the doc_ids of a chunk from its number
+        """
+        self.chunk_firsts = chunk_firsts
+        self.chunk_sizes = chunk_sizes
+        self.load_chunk = load_chunk
+        self.chunks = {}  # Loaded chunks of the form {chunk_no: doc_ids}
+        self.chunks_loaded = 0  # Number of chunks load_chunk was called for
+        self.df = sum(chunk_sizes)
+
+    @classmethod
+    def from_doc_ids(cls, doc_ids):
+        """
+        Build the skip pointers of an in memory posting list
+        :param doc_ids: sorted doc_ids
+        :return: SkipPostings
+        """
+        bounds = get_chunk_bounds(len(doc_ids))
+        skip_postings = cls([doc_ids[start] for start, end in bounds], [end - start for start, end in bounds], None)
+        skip_postings.chunks = dict((chunk_no, doc_ids[bounds[chunk_no][0]:bounds[chunk_no][1]])
+                                    for chunk_no in range(len(bounds)))
+        return skip_postings
+
+    def __len__(self):
+        return self.df
+
+    def get_chunk(self, chunk_no):
+        """
+        Get the doc_ids of a chunk, loading it the first time
+        :param chunk_no:
+        :return: doc_ids
+        """
+        chunk = self.chunks.get(chunk_no)
+        if chunk is None:
+            chunk = self.load_chunk(chunk_no)
+            self.chunks.update({chunk_no: chunk})
+            self.chunks_loaded += 1
+        return chunk
+
+    def to_list(self):
+        """
+        :return: list of all the doc_ids
+        """
+        doc_ids = []
+        for chunk_no in range(len(self.chunk_sizes)):
+            doc_ids.extend(self.get_chunk(chunk_no))
+        return doc_ids
+
+
+class SkipCursor:
+    """
+    Position in a SkipPostings. A skip pointer can only be followed from the start of a chunk
+    """
+
+    def __init__(self, postings):
+        self.postings = postings
+        self.chunk_no = 0
+        self.i = 0  # Position in the chunk
+
+    def at_end(self):
+        return self.chunk_no >= len(self.postings.chunk_sizes)
+
+    def doc(self):
+        """
+        :return: doc_id at the cursor, the chunk is not loaded at its first posting
+        """
+        if self.i == 0:
+            return self.postings.chunk_firsts[self.chunk_no]
+        return self.postings.get_chunk(self.chunk_no)[self.i]
+
+    def next(self):
+        self.i += 1
+        if self.i == self.postings.chunk_sizes[self.chunk_no]:
+            self.chunk_no += 1
+            self.i = 0
+
+    def has_skip(self):
+        return self.i == 0 and self.chunk_no + 1 < len(self.postings.chunk_sizes)
+
+    def skip_doc(self):
+        """
+        :return: doc_id the skip pointer at the cursor points to
+        """
+        return self.postings.chunk_firsts[self.chunk_no + 1]
+
+    def skip(self):
+        self.chunk_no += 1
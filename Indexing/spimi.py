@@ -0,0 +1,320 @@
+"""
+Author: Anshul Pardhi
+Single-pass in-memory indexing (SPIMI) for collections whose index does not fit in memory.
+Postings are collected in memory up to a memory budget, flushed to disk as sorted runs and finally
+merged k-way into the uncompressed, compressed and binary index files in one streaming pass
+"""
+
+import os
+import sys
+import mmap
+import heapq
+import shutil
+import struct
+from array import array
+from postings import PostingList
+from ingestion import get_unsorted_index, read_analyzed_documents
+from build_metrics import BuildMetrics
+from index_compression import CompressedIndexBuilder
+from compressed_index import DocumentNorms, write_compressed_header, write_compressed_doc_stats
+from binary_index import BinaryIndexWriter, read_generation, write_generation
+
+# Estimated memory of a posting (4 columns of 4 byte integers) and of a new dictionary term, excluding its characters
+POSTING_BYTES = 16
+TERM_BYTES = sys.getsizeof(PostingList()) + 4 * sys.getsizeof(array('I')) + sys.getsizeof("") + 100
+# Spooled stats of a document: max_tf in index version 1 and 2, doclen, offset and length of its title
+SPOOL_ENTRY = struct.Struct("<IIIQI")
+
+
+class SpimiIndexer:
+    """
+    Collects the postings of one index in memory and flushes them to a sorted run file whenever
+    the estimated memory use reaches the budget
+    """
+
+    def __init__(self, memory_budget, run_prefix):
+        """
+        :param memory_budget: estimated bytes of postings and dictionary held in memory before a run is flushed
+        :param run_prefix: path prefix of the run files
+        """
+        self.memory_budget = memory_budget
+        self.run_prefix = run_prefix
+        self.block = {}
+        self.block_bytes = 0
+        self.run_paths = []
+
+    def add_document(self, word_list, doc_id, doclen):
+        """
+        Add the postings of a document, documents must be added in doc_id order
+        :param word_list:
+        :param doc_id:
+        :param doclen:
+        :return: max_tf
+        """
+        terms_before = len(self.block)
+        self.block, max_tf = get_unsorted_index(self.block, word_list, doc_id, doclen)
+        new_terms = len(self.block) - terms_before
+        self.block_bytes += new_terms * TERM_BYTES + len(set(word_list)) * POSTING_BYTES
+        if self.block_bytes >= self.memory_budget:
+            self.flush()
+        return max_tf
+
+    def flush(self):
+        """
+        Write the in memory postings to a new run file, sorted on term, and empty the block
+        :return:
+        """
+        if not self.block:
+            return
+        run_path = "%s.run%d" % (self.run_prefix, len(self.run_paths))
+        run_op = open(run_path, "w")
+        for term in sorted(self.block):
+            # Each line is of the form word    posting_list(doc_id:tf:max_tf:doclen)
+            run_op.write(term + "\t" + self.block[term].to_string() + "\n")
+        run_op.close()
+        self.run_paths.append(run_path)
+        self.block = {}
+        self.block_bytes = 0
+
+    def merge_runs(self):
+        """
+        Merge all runs k-way, holding a single line of every run in memory
+        :return: iterator over (term, posting_list) in sorted term order
+        """
+        self.flush()
+        run_files = [open(run_path, "r") for run_path in self.run_paths]
+        try:
+            curr_term = None
+            curr_posting_list = None
+            # Runs hold increasing doc_ids, so on equal terms the run number keeps the posting list in doc_id order
+            for term, run_no, postings_str in heapq.merge(*[read_run(run_file, run_no)
+                                                            for run_no, run_file in enumerate(run_files)]):
+                posting_list = PostingList.from_string(postings_str)
+                if term == curr_term:
+                    curr_posting_list.extend(posting_list)
+                else:
+                    if curr_term is not None:
+                        yield curr_term, curr_posting_list
+                    curr_term = term
+                    curr_posting_list = posting_list
+            if curr_term is not None:
+                yield curr_term, curr_posting_list
+        finally:
+            for run_file in run_files:
+                run_file.close()
+
+    def remove_runs(self):
+        """
+        Delete the run files
+        :return:
+        """
+        for run_path in self.run_paths:
+            os.remove(run_path)
+        self.run_paths = []
+
+
+class DocumentSpool:
+    """
+    Writes the doc stats and titles of the documents to temporary files while the collection is analyzed, so that only
+    the postings are held in memory, and reads them back when the index files are written
+    """
+
+    def __init__(self, spool_prefix):
+        """
+        :param spool_prefix: path prefix of the spool files
+        """
+        self.stats_path = spool_prefix + ".docs.tmp"
+        self.titles_path = spool_prefix + ".titles.tmp"
+        self.stats_op = open(self.stats_path, "wb")
+        self.titles_op = open(self.titles_path, "wb")
+        self.collection_size = 0
+        self.titles_size = 0
+        self.stats_file = None
+        self.titles_file = None
+        self.stats_map = None
+        self.titles_map = None
+
+    def add(self, max_tf1, max_tf2, doclen, title):
+        """
+        Spool the next document
+        :param max_tf1: max_tf of the document in index version 1
+        :param max_tf2: max_tf of the document in index version 2
+        :param doclen:
+        :param title: None if the document has no title
+        :return:
+        """
+        title_bytes = title.encode() if title is not None else b""
+        self.stats_op.write(SPOOL_ENTRY.pack(max_tf1, max_tf2, doclen, self.titles_size, len(title_bytes)))
+        self.titles_op.write(title_bytes)
+        self.titles_size += len(title_bytes)
+        self.collection_size += 1
+
+    def finish(self):
+        """
+        Close the spool files and memory map them to be read
+        :return:
+        """
+        self.stats_op.close()
+        self.titles_op.close()
+        # An empty file can not be memory mapped
+        if self.collection_size > 0:
+            self.stats_file = open(self.stats_path, "rb")
+            self.stats_map = mmap.mmap(self.stats_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.titles_size > 0:
+            self.titles_file = open(self.titles_path, "rb")
+            self.titles_map = mmap.mmap(self.titles_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get_doc_stats(self, index_flag):
+        """
+        :param index_flag: 1 or 2, the index version whose max_tf is read
+        :return: SpooledDocStats
+        """
+        return SpooledDocStats(self, index_flag)
+
+    def get(self, doc_id, default=None):
+        """
+        Get the title of a document, like the map of doc_id: title
+        :param doc_id:
+        :param default: returned if the document has no title
+        :return: title
+        """
+        max_tf1, max_tf2, doclen, title_offset, title_len = SPOOL_ENTRY.unpack_from(
+            self.stats_map, SPOOL_ENTRY.size * (doc_id - 1))
+        if title_len == 0:
+            return default
+        return self.titles_map[title_offset:title_offset + title_len].decode()
+
+    def remove(self):
+        """
+        Unmap and delete the spool files
+        :return:
+        """
+        if self.stats_map is not None:
+            self.stats_map.close()
+            self.stats_file.close()
+        if self.titles_map is not None:
+            self.titles_map.close()
+            self.titles_file.close()
+        os.remove(self.stats_path)
+        os.remove(self.titles_path)
+
+
+class SpooledDocStats:
+    """
+    The doc stats of one index version in a DocumentSpool, read like the list of (max_tf, doclen)
+    """
+
+    def __init__(self, spool, index_flag):
+        self.spool = spool
+        self.index_flag = index_flag
+
+    def __len__(self):
+        return self.spool.collection_size
+
+    def __getitem__(self, position):
+        """
+        :param position: doc_id - 1
+        :return: max_tf, doclen
+        """
+        if position < 0 or position >= self.spool.collection_size:
+            raise IndexError(position)
+        max_tf1, max_tf2, doclen, title_offset, title_len = SPOOL_ENTRY.unpack_from(
+            self.spool.stats_map, SPOOL_ENTRY.size * position)
+        return (max_tf1 if self.index_flag == 1 else max_tf2), doclen
+
+
+def read_run(run_file, run_no):
+    """
+    Stream the entries of a run file
+    :param run_file:
+    :param run_no:
+    :return: iterator over (term, run_no, postings string)
+    """
+    for line in run_file:
+        term, postings_str = line.rstrip("\n").split("\t")
+        yield term, run_no, postings_str
+
+
+def write_index_streaming(postings, prefix, block_size, index_flag, doc_stats, titles, codec=None):
+    """
+    Write the uncompressed, compressed (with its doc stats) and binary versions of an index from a sorted stream of
+    posting lists.
+    The files are the same as the ones written from an in memory index built by generate_index
+    :param postings: iterator over (term, posting_list) in sorted term order
+    :param prefix: Index_VersionN
+    :param block_size:
+    :param index_flag: 1: blocked compression and gamma codes; 2: front coding and delta codes
+    :param doc_stats: list of (max_tf, doclen), the entry for doc_id at position doc_id - 1, or a sequence read like it
+    :param titles: map of doc_id: title, or any object with the get method of a map
+    :param codec: name of the postings codec, see CompressedIndexBuilder
+    :return: key_str, max_df_list, min_df_list
+    """
+    uncompressed_op = open(prefix + ".uncompress.txt", "w")
+    compressed_postings_path = prefix + ".compressed.postings.tmp"
+    compressed_postings_op = open(compressed_postings_path, "wb")
+    builder = CompressedIndexBuilder(block_size, index_flag, codec)
+    binary_writer = BinaryIndexWriter(prefix)
+    norms = DocumentNorms(doc_stats)
+
+    for term, posting_list in postings:
+        uncompressed_op.write(term + "\t" + str(len(posting_list)) + "\t" + posting_list.to_string() + "\n")
+        compressed_postings_op.write(builder.add(term, posting_list))
+        binary_writer.add(term, posting_list)
+        norms.add(posting_list)
+    uncompressed_op.close()
+    compressed_postings_op.close()
+    binary_writer.close(doc_stats, titles, norms)
+    write_compressed_doc_stats(prefix)
+
+    # The key string is only complete once every term is compressed, so the postings are copied after it
+    key_str, max_df_list, min_df_list = builder.finish()
+    compressed_op = open(prefix + ".compressed.bin", "wb")
+    write_compressed_header(compressed_op, key_str, builder.block_offsets, block_size, index_flag, builder.codec.name)
+    compressed_postings_ip = open(compressed_postings_path, "rb")
+    shutil.copyfileobj(compressed_postings_ip, compressed_op)
+    compressed_postings_ip.close()
+    compressed_op.close()
+    os.remove(compressed_postings_path)
+    write_generation(prefix, read_generation(prefix) + 1)
+    return key_str, max_df_list, min_df_list
+
+
+def build_indexes_spimi(collection, stopwords, memory_budget, run_directory=".", metrics=None, postings_codecs=None):
+    """
+    Build and write both indexes of the collection SPIMI style; the memory budget is shared by the two indexes
+    :param collection: list of files, doc_ids follow the order of the files and of the documents in a file
+    :param stopwords:
+    :param memory_budget: estimated bytes of postings and dictionary held in memory before runs are flushed
+    :param run_directory: directory of the temporary run and spool files
+    :param metrics: optional BuildMetrics, gets the parse, analysis and inversion times (including the flushed runs)
+    and the time to merge the runs and write the index files
+    :param postings_codecs: optional map of the form {index_flag: codec name}, see CompressedIndexBuilder
+    :return: (key_str1, max_df1, min_df1), (key_str2, max_df2, min_df2); the doc stats and titles are spooled to
+    run_directory and only written to the doc stats files, see binary_index.DocStats to read them
+    """
+    indexer1 = SpimiIndexer(memory_budget // 2, os.path.join(run_directory, "Index_Version1"))
+    indexer2 = SpimiIndexer(memory_budget // 2, os.path.join(run_directory, "Index_Version2"))
+    spool = DocumentSpool(os.path.join(run_directory, "Index_Documents"))
+
+    if metrics is None:
+        metrics = BuildMetrics()
+
+    for doc_id_counter, lemma_list, stem_list, doclen, title in read_analyzed_documents(collection, 1, stopwords,
+                                                                                        metrics):
+        spool.add(indexer1.add_document(lemma_list, doc_id_counter, doclen),
+                  indexer2.add_document(stem_list, doc_id_counter, doclen), doclen, title)
+        metrics.lap("inversion")
+    spool.finish()
+
+    # The runs are merged while the index files are written, merging, compression and writing are timed together
+    results = []
+    if postings_codecs is None:
+        postings_codecs = {}
+    for index_flag, indexer, block_size in ((1, indexer1, 4), (2, indexer2, 8)):
+        with metrics.stage("write"):
+            results.append(write_index_streaming(indexer.merge_runs(), "Index_Version%s" % index_flag, block_size,
+                                                 index_flag, spool.get_doc_stats(index_flag), spool,
+                                                 postings_codecs.get(index_flag)))
+            indexer.remove_runs()
+    spool.remove()
+    return tuple(results)
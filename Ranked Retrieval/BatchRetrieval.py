@@ -0,0 +1,57 @@
+"""
+Author: Anshul Pardhi
+The program ranks a whole file of queries against the index written by IndexBuilding.py in a pool of worker processes
+and writes a TREC run file for every weighting scheme
+"""
+
+import os
+import sys
+import glob
+from nltk.stem import WordNetLemmatizer
+from term_cache import LRUCache, CachedLemmatizer
+from analyzer import Analyzer
+from searcher import Searcher
+from batch_runner import read_queries, run_batch, write_trec_run
+from evaluation import read_docnos
+
+
+# The program starts here
+directory = "/people/cs/s/sanda/cs6322/Cranfield/*"  # Change to point to the respective directory
+#directory = "Cranfield/*"  # Change to point to the respective directory
+binary_index_prefix = "Index_Version1"  # Change to point to the respective binary index location
+use_compressed_index = False  # Change to True to rank off prefix.compressed.bin and prefix.compressed.docs instead
+scoring_strategy = "taat"  # Change to "daat" for document-at-a-time or "wand" for document-at-a-time with pruning
+queries_path = "/people/cs/s/sanda/cs6322/hw3.queries"
+#queries_path = "hw3.queries"  # Change to the queries file, in the Q blocks of hw3.queries or one query per line
+k = 100  # Change to the number of documents ranked for every query
+schemes = [1, 2]  # Weighting schemes to write a run for, 1: W1; 2: W2
+num_processes = 4  # Change to the number of worker processes, 1 to rank in this process
+run_prefix = "run"  # Runs are written to run_prefix + "_W1.txt" and run_prefix + "_W2.txt"
+run_tag = "cs6322"  # Change to the name of the runs, the W1 or W2 of the scheme is appended to it
+
+stopwords_file = open("/people/cs/s/sanda/cs6322/resourcesIR/stopwords", "r")
+#stopwords_file = open("stopwords", "r")  # Change to point to the respective stopwords file location
+stopwords = frozenset(word.strip() for word in stopwords_file)  # Set of stopwords, looked up once per token
+stopwords_file.close()
+
+index_file = binary_index_prefix + (".compressed.bin" if use_compressed_index else ".dict")
+if not os.path.exists(index_file):
+    print("Index file %s not found, run IndexBuilding.py first" % index_file)
+    sys.exit(1)
+
+lemmatizer = CachedLemmatizer(WordNetLemmatizer(), LRUCache(100000))  # Lemmas are memoized for the whole run
+searcher = Searcher(binary_index_prefix, Analyzer(stopwords, [lemmatizer.lemmatize]), use_compressed_index,
+                    scoring_strategy)
+queries = read_queries(queries_path)
+# Doc_ids follow the order of the files, as in IndexBuilding.py, the runs name the documents by their DOCNO
+docnos = read_docnos(glob.glob(directory))
+print("Ranking %s queries against %s documents in %s processes" % (len(queries), searcher.collection_size,
+                                                                   num_processes))
+
+for scheme in schemes:
+    results, wall_time = run_batch(searcher, queries, scheme, k, num_processes)
+    run_path = "%s_W%s.txt" % (run_prefix, scheme)
+    lines = write_trec_run(run_path, results, "%s-W%s" % (run_tag, scheme), docnos)
+    print("W%s: %s lines written to %s in %s seconds, %s queries per second" % (
+        scheme, lines, run_path, round(wall_time, 2), round(len(queries) / max(wall_time, 1e-9), 1)))
+searcher.close()
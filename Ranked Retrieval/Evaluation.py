@@ -0,0 +1,120 @@
+"""
+Author: Anshul Pardhi
+The program evaluates the W1 and W2 rankings of the queries against the Cranfield relevance judgments and reports how
+much each one agrees with the baseline ranking, next to its query latency. The baseline is the ranking of
+get_top5_documents in RankedRetrieval.py: the queries are weighted as a collection of their own and scored
+term-at-a-time. The other rankings weight every query on its own with the df of the documents, like the query server
+and the batch runs, and score it term-at-a-time or with a faster strategy; their agreement with the baseline shows the
+change of query weighting as well, while the faster strategies rank exactly like term-at-a-time
+"""
+
+import os
+import sys
+import glob
+import time
+from nltk.stem import WordNetLemmatizer
+from term_cache import LRUCache, CachedLemmatizer
+from analyzer import Analyzer
+from searcher import Searcher, get_collection_query_weights
+from batch_runner import read_queries
+from evaluation import read_qrels, read_docnos, get_percentile, evaluate_rankings
+
+
+def get_docnos(ranking):
+    """
+    Get the docnos of a ranking. Documents sharing no term with the query only fill up the top k with a score of 0,
+    they are left out
+    :param ranking: list of (doc_id, score)
+    :return: ranked docnos
+    """
+    return [docnos.get(doc_id, str(doc_id)) for doc_id, score in ranking if score > 0]
+
+
+def rank_baseline(searcher, scheme):
+    """
+    Rank every query with the query weights of RankedRetrieval.py, timing each one
+    :param searcher:
+    :param scheme: 1: W1; 2: W2
+    :return: map of the form {qid: ranked docnos}, list of latencies in seconds
+    """
+    rankings = {}
+    latencies = []
+    query_weight_vector = query_weight_vectors[scheme - 1]
+    for query_id, (qid, query) in enumerate(queries, 1):
+        start = time.perf_counter()
+        ranking = searcher.search_weighted(query_weight_vector.get(query_id, {}), scheme, k)
+        latencies.append(time.perf_counter() - start)
+        rankings[qid] = get_docnos(ranking)
+    return rankings, latencies
+
+
+def rank_queries(searcher, scheme):
+    """
+    Rank every query, timing each one
+    :param searcher:
+    :param scheme: 1: W1; 2: W2
+    :return: map of the form {qid: ranked docnos}, list of latencies in seconds
+    """
+    rankings = {}
+    latencies = []
+    for qid, query in queries:
+        start = time.perf_counter()
+        ranking = searcher.search(query, scheme, k)
+        latencies.append(time.perf_counter() - start)
+        rankings[qid] = get_docnos(ranking)
+    return rankings, latencies
+
+
+# The program starts here
+directory = "/people/cs/s/sanda/cs6322/Cranfield/*"  # Change to point to the respective directory
+#directory = "Cranfield/*"  # Change to point to the respective directory
+binary_index_prefix = "Index_Version1"  # Change to point to the respective index location
+queries_path = "/people/cs/s/sanda/cs6322/hw3.queries"
+#queries_path = "hw3.queries"  # Change to the queries file, in the Q blocks of hw3.queries or one query per line
+qrels_path = "/people/cs/s/sanda/cs6322/cranqrel"
+#qrels_path = "cranqrel"  # Change to point to the respective relevance judgments file location
+k = 100  # Number of documents ranked for every query, the depth of MAP
+# Rankings compared with the baseline: name, True to rank off the compressed index, scoring strategy
+runs = [("taat", False, "taat"), ("daat", False, "daat"), ("wand", False, "wand")]
+#runs.append(("compressed wand", True, "wand"))  # Uncomment once IndexBuilding.py wrote the compressed index
+
+stopwords_file = open("/people/cs/s/sanda/cs6322/resourcesIR/stopwords", "r")
+#stopwords_file = open("stopwords", "r")  # Change to point to the respective stopwords file location
+stopwords = frozenset(word.strip() for word in stopwords_file)  # Set of stopwords, looked up once per token
+stopwords_file.close()
+
+if not os.path.exists(binary_index_prefix + ".dict"):
+    print("Index file %s not found, run IndexBuilding.py first" % (binary_index_prefix + ".dict"))
+    sys.exit(1)
+
+# Doc_ids follow the order of the files, as in IndexBuilding.py, the judgments use the DOCNO of the documents
+docnos = read_docnos(glob.glob(directory))
+qrels = read_qrels(qrels_path)
+queries = read_queries(queries_path)
+
+lemmatizer = CachedLemmatizer(WordNetLemmatizer(), LRUCache(100000))  # Lemmas are memoized for the whole run
+analyzer = Analyzer(stopwords, [lemmatizer.lemmatize])
+# The queries of the file are weighted together, as RankedRetrieval.py does
+query_weight_vectors = get_collection_query_weights([analyzer.analyze(query) for qid, query in queries])
+baseline_searcher = Searcher(binary_index_prefix, analyzer)
+searchers = [(name, Searcher(binary_index_prefix, analyzer, use_compressed, strategy))
+             for name, use_compressed, strategy in runs]
+
+for scheme in (1, 2):
+    print("Weighting Scheme %s:" % scheme)
+    baselines, latencies = rank_baseline(baseline_searcher, scheme)
+    rows = [("baseline", evaluate_rankings(baselines, qrels, baselines), latencies)]
+    for name, searcher in searchers:
+        rankings, latencies = rank_queries(searcher, scheme)
+        rows.append((name, evaluate_rankings(rankings, qrels, baselines), latencies))
+
+    for name, metrics, latencies in rows:
+        print("%-16s MAP %.4f  P@5 %.4f  P@10 %.4f  nDCG@10 %.4f  overlap@5 %.4f  RBO %.4f  mean %.3f ms  p95 %.3f ms"
+              % (name, metrics["MAP"], metrics["P@5"], metrics["P@10"], metrics["nDCG@10"], metrics["overlap@5"],
+                 metrics["RBO"], 1000 * sum(latencies) / len(latencies), 1000 * get_percentile(latencies, 95)))
+    print("Queries judged: %s of %s" % (rows[0][1]["judged"], len(queries)))
+    print()
+
+baseline_searcher.close()
+for name, searcher in searchers:
+    searcher.close()
@@ -0,0 +1,157 @@
+"""
+Author: Anshul Pardhi
+The program loads the index written by IndexBuilding.py once and answers ranked queries on a local TCP port, so that
+every query does not pay for building the index again. Requests and responses are JSON objects, one per line
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+from nltk.stem import WordNetLemmatizer
+from term_cache import LRUCache, CachedLemmatizer
+from analyzer import Analyzer
+from searcher import Searcher
+from result_cache import ResultCache
+from evaluation import get_percentile
+
+
+def get_latency_report():
+    """
+    Summarize the latencies of the queries answered so far
+    :return: map of the number of queries and their mean, p50, p95 and largest latency in milliseconds
+    """
+    report = {"queries": len(latencies)}
+    if latencies:
+        report["mean_ms"] = round(1000 * sum(latencies) / len(latencies), 4)
+        report["p50_ms"] = round(1000 * get_percentile(latencies, 50), 4)
+        report["p95_ms"] = round(1000 * get_percentile(latencies, 95), 4)
+        report["max_ms"] = round(1000 * max(latencies), 4)
+    return report
+
+
+def answer(line):
+    """
+    Answer one request line. A line that is not a JSON object is taken as the text of a query
+    :param line: {"query": text, "scheme": 1 or 2, "k": number of documents, "id": echoed back} or
+    {"command": "stats"}
+    :return: response map
+    """
+    try:
+        request = json.loads(line) if line.startswith("{") else {"query": line}
+        if not isinstance(request, dict):
+            raise ValueError("A request must be a JSON object")
+    except ValueError as e:
+        return {"error": str(e)}
+
+    response = {}
+    if "id" in request:
+        response["id"] = request["id"]
+    if request.get("command") == "stats":
+        response["stats"] = get_latency_report()
+        if result_cache is not None:
+            response["stats"]["cache"] = result_cache.get_stats()
+        return response
+    try:
+        query = request.get("query")
+        if not isinstance(query, str):
+            raise ValueError("A request needs a query string")
+        scheme = request.get("scheme", default_scheme)
+        ranking = searcher.search(query, scheme, request.get("k", default_k))
+    except ValueError as e:
+        response["error"] = str(e)
+        return response
+
+    response["scheme"] = scheme
+    response["results"] = [{"rank": rank, "doc_id": doc_id, "score": round(score, 3),
+                            "title": searcher.get_title(doc_id)} for rank, (doc_id, score) in enumerate(ranking, 1)]
+    return response
+
+
+async def handle_connection(reader, writer):
+    """
+    Answer the requests of a connection in order. A client may send several requests without waiting for the
+    responses; they are read from the buffer and answered one after the other
+    :param reader:
+    :param writer:
+    :return:
+    """
+    peer = writer.get_extra_info("peername")
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+
+            start = time.perf_counter()
+            try:
+                response = answer(line.decode())
+            except Exception as e:
+                # A request that cannot be answered, e.g. one that is not UTF-8, only gets an error response
+                response = {"error": "%s: %s" % (type(e).__name__, e)}
+            latency = time.perf_counter() - start
+            response["latency_ms"] = round(1000 * latency, 4)
+            if "results" in response:
+                latencies.append(latency)
+            writer.write((json.dumps(response) + "\n").encode())
+            if log_requests:
+                print("%s:%s %s ms %s" % (peer[0], peer[1], response["latency_ms"], line.decode(errors="replace")))
+            await writer.drain()
+    except ConnectionError:
+        pass  # The client went away, its pending responses are dropped
+    finally:
+        writer.close()
+
+
+# The program starts here
+binary_index_prefix = "Index_Version1"  # Change to point to the respective binary index location
+use_compressed_index = False  # Change to True to rank off prefix.compressed.bin and prefix.compressed.docs instead
+scoring_strategy = "taat"  # Change to "daat" for document-at-a-time or "wand" for document-at-a-time with pruning
+host = "127.0.0.1"  # Change to the address to listen on
+port = 6322  # Change to the port to listen on
+default_scheme = 1  # Weighting scheme of the requests that do not give one, 1: W1; 2: W2
+default_k = 5  # Number of documents returned to the requests that do not give k
+log_requests = True  # Change to False to stop printing every request with its latency
+result_cache_size = 10000  # Number of rankings kept for repeated queries, change to 0 to rank every request again
+result_cache_bytes = None  # Change to a number of bytes to also bound the memory held by the cached rankings
+
+stopwords_file = open("/people/cs/s/sanda/cs6322/resourcesIR/stopwords", "r")
+#stopwords_file = open("stopwords", "r")  # Change to point to the respective stopwords file location
+stopwords = frozenset(word.strip() for word in stopwords_file)  # Set of stopwords, looked up once per token
+stopwords_file.close()
+
+index_file = binary_index_prefix + (".compressed.bin" if use_compressed_index else ".dict")
+if not os.path.exists(index_file):
+    print("Index file %s not found, run IndexBuilding.py first" % index_file)
+    sys.exit(1)
+
+load_start_time = time.time()
+lemmatizer = CachedLemmatizer(WordNetLemmatizer(), LRUCache(100000))  # Lemmas are memoized for the whole run
+result_cache = ResultCache(result_cache_size, result_cache_bytes) if result_cache_size > 0 else None
+searcher = Searcher(binary_index_prefix, Analyzer(stopwords, [lemmatizer.lemmatize]), use_compressed_index,
+                    scoring_strategy, result_cache)
+print("Loaded %s documents from %s in %s seconds" % (searcher.collection_size, index_file,
+                                                     round(time.time() - load_start_time, 2)))
+latencies = []  # Latency of every query answered, in seconds
+
+loop = asyncio.new_event_loop()
+asyncio.set_event_loop(loop)
+server = loop.run_until_complete(asyncio.start_server(handle_connection, host, port))
+print("Listening on %s:%s" % (host, port))
+try:
+    loop.run_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.close()
+    searcher.close()
+    print("Latencies:", json.dumps(get_latency_report()))
+    print(lemmatizer.cache.report("Lemma"))
+    if result_cache is not None:
+        print(result_cache.report("Result"))
@@ -4,27 +4,24 @@ The program performs a ranked retrieval model on a given set of queries,
 tested on the Cranfield document collection
 """
 
+import os
 import glob
-import re
-import math
-import xml.etree.ElementTree as et
+from bisect import bisect_left
 from collections import Counter
 from nltk.stem import WordNetLemmatizer
 from collections import OrderedDict
-
-
-def tokenize(values):
-    """
-    Generate tokens by pre-processing raw data
-    :param values:
-    :return: list of tokens
-    """
-    sgml_values = values.strip()  # Remove preceding and trailing spaces
-    sgml_values = sgml_values.replace("\n", " ")  # Remove the end of line escape character
-    sgml_values = re.sub(r'[^a-zA-Z0-9.\s]', ' ', sgml_values)  # Replace all non-alphanumeric characters with space
-    sgml_values = re.sub(r'[^a-zA-Z0-9\s]', '', sgml_values)  # Remove all dots, e.g. U.S.A. becomes USA
-    sgml_values = sgml_values.lower()  # Convert all letters to lowercase
-    return sgml_values.split()  # Split individual words on spaces and return
+from dynamic_index import DynamicIndex
+from compressed_index import CompressedIndex
+from positional_index import PositionalIndex
+from postings import PostingList
+from term_cache import LRUCache, CachedLemmatizer
+from analyzer import Analyzer
+from boolean_retrieval import BooleanQueryParser, BooleanEngine
+from skip_postings import SkipPostings
+from cranfield_reader import read_documents
+from document_cache import DocumentCache
+from scoring import generate_weight_index, score_term_at_a_time, score_document_at_a_time, score_wand, StoredWeights
+from weighting import generate_weight_vector_map
 
 
 def get_unsorted_index(index_unsorted, word_list, doc_id_counter, doclen):
@@ -39,142 +36,94 @@ def get_unsorted_index(index_unsorted, word_list, doc_id_counter, doclen):
     count = Counter(word_list)
     max_tf = count.most_common(1)[0][1]
     for counts in count.items():
-        # Add -> to separate different documents inside the posting list
-        # Posting list is of the form doc_id1:tf1:max_tf1:doclen1->doc_id2:tf2:max_tf2:doclen2 and so on
-        if counts[0] in index_unsorted:
-            index_unsorted.update({counts[0]: str(index_unsorted.get(counts[0])) + "->" + str(
-                doc_id_counter) + ":" + str(counts[1]) + ":" + str(max_tf) + ":" + str(doclen)})
-        else:
-            index_unsorted.update(
-                {counts[0]: str(doc_id_counter) + ":" + str(counts[1]) + ":" + str(max_tf) + ":" + str(doclen)})
+        # Posting list holds doc_id, tf, max_tf and doclen of every document containing the word
+        posting_list = index_unsorted.get(counts[0])
+        if posting_list is None:
+            posting_list = PostingList()
+            index_unsorted.update({counts[0]: posting_list})
+        posting_list.append(doc_id_counter, counts[1], max_tf, doclen)
     return index_unsorted
 
 
-def generate_index(index_unsorted):
+def analyze_document(fields, counters=None):
     """
-    Generate sorted index, adding a document frequency as well
-    :param index_unsorted:
-    :return: index
+    Turn the fields of a Cranfield document into its lemmas
+    :param fields: list of (field, text), see read_documents
+    :param counters: optional map, the number of tokens (stopwords included) is added to its "tokens" entry
+    :return: lemma_list, doclen, title
     """
-    index = OrderedDict(sorted(index_unsorted.items()))
+    lemma_list = []
+    doclen = 0
+    title = None
 
-    # Generate uncompressed index
-    for key in index:
-        val = index[key]
-        cnt = val.count('->') + 1  # df
-        # Index is of the form {word:    df    posting_list(doc_id:tf:max_tf:doclen)
-        index.update({key: str(cnt) + "\t" + val})
+    # Repeat for all fields of the document, the analyzer removes the stopwords and lemmatizes the tokens
+    for field, text in fields:
+        lemma_list.extend(analyzer.terms(text, counters))
+        doclen += len(lemma_list)
 
-    return index
+        # Title of every document will later become headline for the top-5 relevant queries
+        if field == "TITLE":
+            title = text.replace("\n", " ")
+    return lemma_list, doclen, title
 
 
-def get_w1_weight(tf, max_tf, collection_size, df):
+def read_analyzed_documents(files):
     """
-    Computes weights on the basis of max-tf term weighting
-    :param tf:
-    :param max_tf:
-    :param collection_size:
-    :param df:
-    :return: w1_weight
+    Analyze the documents of a list of files, taking the documents whose files did not change from the document cache
+    if it is loaded
+    :param files:
+    :return: iterator over (doc_id, lemma_list, doclen, title), see analyze_document
     """
-    return (0.4 + 0.6 * math.log10(float(tf) + 0.5) / math.log10(float(max_tf) + 1.0)) * \
-           (math.log10(float(collection_size) / float(df)) / math.log10(float(collection_size)))
+    if document_cache.path is None:
+        for doc_id, fields in read_documents(files):
+            yield (doc_id,) + analyze_document(fields)
+        return
 
+    for doc_id, document in document_cache.read_documents(files, lemmatizer=lemmatizer):
+        lemma_list = []
+        doclen = 0
+        for field_lemmas in document.get_field_terms("lemmas", stopwords):
+            lemma_list.extend(field_lemmas)
+            doclen += len(lemma_list)
+        yield doc_id, lemma_list, doclen, document.title
 
-def get_w2_weight(tf, doclen, avg_doclen, collection_size, df):
+
+def read_added_documents(files):
     """
-    Computes weights on the basis of Okapi term weighting
-    :param tf:
-    :param doclen:
-    :param avg_doclen:
-    :param collection_size:
-    :param df:
-    :return: w2_weight
+    Analyze the documents to add to the binary index. Their doclen counts every token, stopwords included, like the
+    doclen IndexBuilding.py stores for the documents already in the binary index
+    :param files:
+    :return: iterator over (file, lemma_list, doclen, title)
     """
-    return (0.4 + 0.6 * (float(tf) / (float(tf) + 0.5 + 1.5 * (float(doclen) / float(avg_doclen))))) * \
-           (math.log10(float(collection_size) / float(df)) / math.log10(float(collection_size)))
+    for file in files:
+        if document_cache.path is None:
+            for doc_id, fields in read_documents([file]):
+                counters = {"tokens": 0}
+                lemma_list, doclen, title = analyze_document(fields, counters)
+                yield file, lemma_list, counters["tokens"], title
+            continue
+
+        for doc_id, document in document_cache.read_documents([file], lemmatizer=lemmatizer):
+            yield file, document.get_terms("lemmas", stopwords), document.num_tokens, document.title
 
 
-def normalize_weights(curr_map):
+def generate_index(index_unsorted):
     """
-    Normalize the weights generated by the weighting scheme
-    :param curr_map:
-    :return: normalized weight map
+    Generate sorted index
+    :param index_unsorted:
+    :return: index
     """
-    new_map = {}
-    for key in curr_map:
-        values = curr_map[key].split()
-        sq_sum = 0
-
-        # Sum all the squares of weights belonging to a particular document
-        for value in values:
-            colon_split = value.split(":")
-            sq_sum += float(colon_split[1]) * float(colon_split[1])
-
-        sqrt_sq_sum = math.sqrt(sq_sum)
-
-        # Normalize the weight and store in the dictionary
-        for value in values:
-            colon_split = value.split(":")
-            normalized_weight_value = round(float(colon_split[1]) / sqrt_sq_sum, 3)
-            if new_map.get(key) is None:
-                new_map.update(
-                    {key: str(colon_split[0]) + ":" + str(normalized_weight_value)})
-            else:
-                new_map.update(
-                    {key: str(new_map.get(key)) + " " + str(colon_split[0]) + ":" + str(normalized_weight_value)})
-    return new_map
+    # Index is of the form {word: posting_list(doc_id, tf, max_tf, doclen)}, the df is the length of the posting list
+    return OrderedDict(sorted(index_unsorted.items()))
 
 
-def generate_weight_vector_map(index, collection_size, avg_doclen):
+def get_vector_representation(weights):
     """
-    Generates weight vector map from the given index
-    :param index:
-    :param collection_size:
-    :param avg_doclen:
-    :return: weight vector map
+    Format a weight vector for printing
+    :param weights:
+    :return: string of the form lemma1:weight1 lemma2:weight2 and so on
     """
-    curr_map_1 = {}  # Map based on W1 weighting scheme
-    curr_map_2 = {}  # Map based on W2 weighting scheme
-
-    for key in index:
-        val = index[key]
-        tab_sep = val.split("\t")
-        df = tab_sep[0]
-        postings_list = tab_sep[1].split("->")
-
-        for posting in postings_list:
-            posting_sep = posting.split(":")
-            doc_id = posting_sep[0]
-            tf = posting_sep[1]
-            max_tf = posting_sep[2]
-            doclen = posting_sep[3]
-
-            w1_weight = get_w1_weight(tf, max_tf, collection_size, df)
-            w2_weight = get_w2_weight(tf, doclen, avg_doclen, collection_size, df)
-
-            # Maps will be of the form doc_id lemma1:weight1 lemma2:weight2 and so on
-            if curr_map_1.get(doc_id) is None:
-                curr_map_1.update(
-                    {doc_id: str(key) + ":" + str(w1_weight)})
-            else:
-                curr_map_1.update(
-                    {doc_id: str(curr_map_1.get(doc_id)) + " " + str(key) + ":" + str(w1_weight)})
-
-            if curr_map_2.get(doc_id) is None:
-                curr_map_2.update(
-                    {doc_id: str(key) + ":" + str(w2_weight)})
-            else:
-                curr_map_2.update(
-                    {doc_id: str(curr_map_2.get(doc_id)) + " " + str(key) + ":" + str(w2_weight)})
-
-    # Normalize the weights for both the maps
-    curr_map_1 = normalize_weights(curr_map_1)
-    curr_map_2 = normalize_weights(curr_map_2)
-
-    # Sort the map on the basis of doc_id
-    return OrderedDict(sorted(curr_map_1.items(), key=lambda x: int(x[0]))), \
-           OrderedDict(sorted(curr_map_2.items(), key=lambda x: int(x[0])))
+    return " ".join(str(term) + ":" + str(weights[term]) for term in weights)
 
 
 def print_vector_representation(weight_vector_map):
@@ -184,116 +133,247 @@ def print_vector_representation(weight_vector_map):
     :return:
     """
     for key in weight_vector_map:
-        print(key, weight_vector_map[key])
+        print(key, get_vector_representation(weight_vector_map[key]))
 
 
-def get_top5_documents(query_weight_vector, document_weight_vector):
+def get_query_term_vector(doc_id, query_terms, weight_index):
+    """
+    Get the weights of a document for the query terms only, from the posting lists of the weight index
+    :param doc_id:
+    :param query_terms:
+    :param weight_index:
+    :return: map of the form {lemma: weight}, in sorted term order
     """
-    This method calculates the 5 most relevant documents for a given query and prints the results
+    weights = OrderedDict()
+    for term in sorted(query_terms):
+        postings = weight_index.get(term)
+        if postings is None:
+            continue
+        i = bisect_left(postings[0], doc_id)
+        if i < len(postings[0]) and postings[0][i] == doc_id:
+            weights[term] = postings[1][i]
+    return weights
+
+
+def get_top5_documents(query_weight_vector, document_weight_vector, weight_index, rankings=None):
+    """
+    This method calculates the 5 most relevant documents for a given query and prints the results.
+    Only the posting lists of the query terms are scored, see scoring.py
     :param query_weight_vector:
-    :param document_weight_vector:
+    :param document_weight_vector: None to print the weights of the ranked documents for the query terms only
+    :param weight_index: weight index generated from document_weight_vector
+    :param rankings: rankings already computed for all queries in a batch, see sparse_engine.py
     :return:
     """
 
     # Do this for each query
     for key_q in query_weight_vector:
-        query_map = {}  # Query map is of the form lemma: weight_value
-        query_val = query_weight_vector[key_q].split()
-        for word in query_val:
-            word_val = word.split(":")
-            query_map.update({word_val[0]: word_val[1]})
-
-        cos_prod_map = {}  # This map stores cosine products of a given query with all documents in collection
-
-        # Do this for all documents in the collection
-        for key_d in document_weight_vector:
-            document_map = {}  # Document map is of the form lemma: weight_value
-            document_val = document_weight_vector[key_d].split()
-            for word in document_val:
-                document_val = word.split(":")
-                document_map.update({document_val[0]: document_val[1]})
-
-            # Compute cosine product for a particular query and document
-            cos_prod = 0
-            for term in document_map:
-                if term in query_map:
-                    cos_prod += round(float(document_map[term]) * float(query_map[term]), 3)
-
-            # This map is of the form cos_prod: document weight vector representation
-            cos_prod_map.update({cos_prod: str(key_d) + " " + str(document_weight_vector[key_d])})
-
-        # Sort the cos_prod map to get the most relevant queries (top-5)
-        cos_prod_map = OrderedDict(sorted(cos_prod_map.items(), reverse=True))
+        if rankings is not None:
+            ranking = rankings[key_q]
+        elif scoring_strategy == "daat":
+            ranking = score_document_at_a_time(query_weight_vector[key_q], weight_index, max_doc_id, 5, deleted)
+        elif scoring_strategy == "wand":
+            counters = {}
+            ranking = score_wand(query_weight_vector[key_q], weight_index, max_doc_id, 5, counters, deleted)
+            print("Postings scored:", counters["postings_scored"], " Postings skipped:", counters["postings_skipped"])
+        else:
+            ranking = score_term_at_a_time(query_weight_vector[key_q], weight_index, max_doc_id, 5, deleted)
 
         print("For query ", key_q)
         i = 1
-        for key in cos_prod_map:
-            if i > 5:
-                break
-            doc_identifier = cos_prod_map[key].split()[0]
-            print("Rank:", i, " Score:", key, " Document Identifier:", doc_identifier)
-            print("Headline: ", title_map.get(int(doc_identifier)))
-            print("Vector Representation: ")
-            print(cos_prod_map[key])
+        for doc_id, score in ranking:
+            print("Rank:", i, " Score:", score, " Document Identifier:", doc_id)
+            print("Headline: ", get_title(doc_id))
+            if document_weight_vector is not None:
+                print("Vector Representation: ")
+                print(str(doc_id) + " " + get_vector_representation(document_weight_vector.get(doc_id, {})))
+            else:
+                print("Vector Representation (query terms): ")
+                print(str(doc_id) + " " + get_vector_representation(
+                    get_query_term_vector(doc_id, query_weight_vector[key_q], weight_index)))
             print()
             i += 1
         print()
 
 
+def get_skip_postings(term):
+    """
+    Get the posting list of a term with skip pointers, for the Boolean queries. The chunks of a compressed posting list
+    are only decoded when they are read
+    :param term:
+    :return: SkipPostings, None if the term is not in the dictionary
+    """
+    if compressed_index is not None:
+        return compressed_index.get_skip_postings(term)
+    posting_list = index.get(term) if index is not None else binary_index.get_postings(term)
+    if posting_list is None or len(posting_list) == 0:
+        return None
+    return SkipPostings.from_doc_ids(list(posting_list.doc_ids))
+
+
+def print_boolean_results(boolean_queries):
+    """
+    Answer Boolean queries and print the matching documents, with the number of doc_id comparisons made with and
+    without the skip pointers. Phrase and proximity queries use the positional index written by IndexBuilding.py
+    :param boolean_queries:
+    :return:
+    """
+    live_doc_ids = [doc_id for doc_id in range(1, max_doc_id + 1) if doc_id not in deleted]
+    positional_index = None
+    if os.path.exists(binary_index_prefix + ".positions.dict"):
+        positional_index = PositionalIndex(binary_index_prefix)
+    parser = BooleanQueryParser(analyzer)
+    for boolean_query in boolean_queries:
+        query_tree = parser.parse(boolean_query)
+        engine = BooleanEngine(get_skip_postings, live_doc_ids, positional_index=positional_index)
+        doc_ids = engine.search(query_tree)
+        linear_engine = BooleanEngine(get_skip_postings, live_doc_ids, False, positional_index)
+        linear_engine.search(query_tree)
+
+        print("For query ", boolean_query)
+        print("Matching documents:", len(doc_ids), " Document Identifiers:", doc_ids)
+        print("With skip pointers:", engine.counters["comparisons"], "comparisons,", engine.counters["skips"],
+              "skips followed,", engine.counters["chunks_decoded"], "compressed chunks decoded")
+        print("Without skip pointers:", linear_engine.counters["comparisons"], "comparisons,",
+              linear_engine.counters["chunks_decoded"], "compressed chunks decoded")
+        if engine.counters["position_lists"] > 0:
+            print("Position lists decoded:", engine.counters["positions_decoded"], "of",
+                  engine.counters["position_lists"])
+        print()
+    if positional_index is not None:
+        positional_index.close()
+
+
 # The program starts here
 directory = "/people/cs/s/sanda/cs6322/Cranfield/*"  # Change to point to the respective directory
 #directory = "Cranfield/*"  # Change to point to the respective directory
 collection = glob.glob(directory)
 
 # Add stopwords from the given file containing the list of stopwords
-stopwords = []
 stopwords_file = open("/people/cs/s/sanda/cs6322/resourcesIR/stopwords", "r")
 #stopwords_file = open("stopwords", "r")  # Change to point to the respective stopwords file location
-for word in stopwords_file:
-    stopwords.append(word.strip("\n").strip())
+stopwords = frozenset(word.strip() for word in stopwords_file)  # Set of stopwords, looked up once per token
 stopwords_file.close()
 
-index_unsorted = {}
-doc_id_counter = 0
-total_doclen = 0
-title_map = {}
-
-# Repeat for every file in the collection
-for file in collection:
-    root = et.parse(file)
-    doc_id_counter += 1
-    tokens = []
-    doclen = 0
-
-    # Repeat for all child DOM elements
-    for values in root.findall('*'):
-        token_list = tokenize(values.text)
-        for token in token_list:
-            if token not in stopwords:
-                tokens.append(token)  # Append every split word to the list of tokens
-        doclen += len(tokens)
-
-    # Add title of every document to title_map, which will later become headline for the top-5 relevant queries
-    for values in root.findall("TITLE"):
-        title_map.update({doc_id_counter: values.text.replace("\n", " ")})
-
-    total_doclen += doclen
-
-    # Perform lemmatization
-    lemmatizer = WordNetLemmatizer()
-    lemma_list = []
-    for token in tokens:
-        lemmatized_token = lemmatizer.lemmatize(token)
-        lemma_list.append(lemmatized_token)
-
-    index_unsorted = get_unsorted_index(index_unsorted, lemma_list, doc_id_counter, doclen)
-
-collection_size = doc_id_counter
-avg_doclen = total_doclen // collection_size
-
-index = generate_index(index_unsorted)  # Generate document index
-
-document_weight_vector_1, document_weight_vector_2 = generate_weight_vector_map(index, collection_size, avg_doclen)
+# Binary index written by IndexBuilding.py; if it is not found, the index is rebuilt from the Cranfield collection
+binary_index_prefix = "Index_Version1"  # Change to point to the respective binary index location
+# Change to True to rank off the compressed index (prefix.compressed.bin and prefix.compressed.docs) instead
+use_compressed_index = False
+# Change to True to print the whole vector of the ranked documents instead of their weights for the query terms; every
+# document is then weighted up front
+print_full_vectors = False
+lemmatizer = CachedLemmatizer(WordNetLemmatizer(), LRUCache(100000))  # Lemmas are memoized for the whole run
+analyzer = Analyzer(stopwords, [lemmatizer.lemmatize])
+
+# Analyzed documents can be kept between runs, so that only the changed Cranfield files are analyzed again
+document_cache = DocumentCache()
+document_cache_path = None  # Change to a file path to save the analyzed documents and reuse them in the next run
+if document_cache_path is not None:
+    document_cache.load(document_cache_path)
+
+added_documents = []  # Change to a list of Cranfield files to add to the binary index without rebuilding it
+deleted_documents = []  # Change to a list of doc_ids to delete from the binary index
+merge_updates = False  # Change to True to fold the added and deleted documents into the binary index files
+
+compressed_index = None
+if use_compressed_index and os.path.exists(binary_index_prefix + ".compressed.bin"):
+    # Only the key string is decoded at this point, the posting lists of the query terms are decoded block by block
+    compressed_index = CompressedIndex(binary_index_prefix)
+    collection_size = compressed_index.collection_size
+    max_doc_id = collection_size
+    deleted = set()
+    avg_doclen = compressed_index.total_doclen // collection_size
+    get_title = compressed_index.get_title
+    if print_full_vectors:
+        index = compressed_index.to_index()
+    else:
+        # The posting lists of the query terms are decoded and weighted when a query needs them
+        index = None
+        stored_weights = StoredWeights(compressed_index.get_postings, compressed_index.get_doc_stats, collection_size,
+                                       avg_doclen)
+elif os.path.exists(binary_index_prefix + ".dict"):
+    # Memory map the binary index, only the term dictionary is read at this point
+    binary_index = DynamicIndex(binary_index_prefix)
+    # The files added by an earlier run and merged are recorded with the index, they are not added again
+    new_files = []
+    for file in added_documents:
+        file = os.path.abspath(file)
+        if binary_index.has_file(file) or file in new_files:
+            print("Skipping %s, its documents are already in the index" % file)
+        else:
+            new_files.append(file)
+    for file, lemma_list, doclen, title in read_added_documents(new_files):
+        binary_index.add_document(lemma_list, doclen, title, file)
+    for doc_id in deleted_documents:
+        binary_index.delete_document(doc_id)
+    if merge_updates:
+        binary_index.merge()
+
+    # The collection size and df used by the weighting schemes only count the live documents
+    collection_size = binary_index.collection_size
+    max_doc_id = binary_index.max_doc_id
+    deleted = binary_index.deleted
+    avg_doclen = binary_index.total_doclen // collection_size
+    get_title = binary_index.get_title
+    if binary_index.has_pending_updates() or print_full_vectors:
+        # The vector norms of the doc stats file do not account for the updates, every document is weighted again
+        index = binary_index.to_index()
+    else:
+        # The posting lists of the query terms are read and weighted when a query needs them
+        index = None
+        stored_weights = StoredWeights(binary_index.main.read_postings, binary_index.main.get_doc_norms,
+                                       collection_size, avg_doclen)
+else:
+    index_unsorted = {}
+    doc_id_counter = 0
+    total_doclen = 0
+    title_map = {}
+
+    # Repeat for every document in the collection
+    for doc_id_counter, lemma_list, doclen, title in read_analyzed_documents(collection):
+        if title is not None:
+            title_map.update({doc_id_counter: title})
+        total_doclen += doclen
+        index_unsorted = get_unsorted_index(index_unsorted, lemma_list, doc_id_counter, doclen)
+
+    collection_size = doc_id_counter
+    max_doc_id = collection_size
+    deleted = set()
+    avg_doclen = total_doclen // collection_size
+    get_title = title_map.get
+
+    index = generate_index(index_unsorted)  # Generate document index
+
+if document_cache_path is not None:
+    document_cache.save()
+
+scoring_strategy = "taat"  # Change to "daat" for document-at-a-time or "wand" for document-at-a-time with pruning
+use_sparse_engine = False  # Change to True to weight and score all queries in a batch with NumPy/SciPy sparse matrices
+boolean_queries = []  # Change to a list of Boolean queries to answer, e.g. "(shock OR wave) boundary NOT layer"
+
+if use_sparse_engine:
+    from sparse_engine import build_weight_matrices, get_projection, score_queries, WeightMatrixView
+
+    if index is None:
+        # The sparse engine weights every document, the whole index is decoded
+        index = (compressed_index if compressed_index is not None else binary_index).to_index()
+    terms = list(index)
+    document_matrix_1, document_matrix_2 = build_weight_matrices(index, max_doc_id, collection_size, avg_doclen)
+    document_weight_vector_1 = WeightMatrixView(document_matrix_1, terms)
+    document_weight_vector_2 = WeightMatrixView(document_matrix_2, terms)
+    weight_index_1 = weight_index_2 = None
+elif index is None:
+    # Only the ranked documents are printed, with their weights for the query terms
+    document_weight_vector_1 = document_weight_vector_2 = None
+    weight_index_1 = stored_weights.get_weight_index(1)
+    weight_index_2 = stored_weights.get_weight_index(2)
+else:
+    document_weight_vector_1, document_weight_vector_2 = generate_weight_vector_map(index, collection_size,
+                                                                                    avg_doclen)
+
+    # Invert the document vectors so that a query only scores the posting lists of its own terms
+    weight_index_1 = generate_weight_index(document_weight_vector_1)
+    weight_index_2 = generate_weight_index(document_weight_vector_2)
 
 queries = []
 queries_file = open("/people/cs/s/sanda/cs6322/hw3.queries", "r")
@@ -320,13 +400,7 @@ total_query_len = 0
 # Perform tokenization, lemmatization and remove stop words to generate relevant terms for each query
 for query in queries:
     query_id_counter += 1
-    curr_query_list = []
-    query_tokens = tokenize(query)
-
-    for query_token in query_tokens:
-        if query_token not in stopwords:
-            curr_query_list.append(lemmatizer.lemmatize(query_token))
-
+    curr_query_list = analyzer.analyze(query)
     query_len = len(curr_query_list)
     total_query_len += query_len
     query_index = get_unsorted_index(query_index, curr_query_list, query_id_counter, query_len)
@@ -335,8 +409,21 @@ query_collection_size = len(queries)
 avg_query_doclen = total_query_len // query_collection_size
 
 query_index = generate_index(query_index)  # Generate query index similar to document index
-query_weight_vector_1, query_weight_vector_2 = generate_weight_vector_map(query_index, query_collection_size,
-                                                                          avg_query_doclen)
+if use_sparse_engine:
+    query_terms = list(query_index)
+    query_matrix_1, query_matrix_2 = build_weight_matrices(query_index, query_collection_size, query_collection_size,
+                                                           avg_query_doclen)
+    query_weight_vector_1 = WeightMatrixView(query_matrix_1, query_terms)
+    query_weight_vector_2 = WeightMatrixView(query_matrix_2, query_terms)
+
+    # Score every query against every document with one sparse matrix product per weighting scheme
+    projection = get_projection(query_terms, terms)
+    rankings_1 = score_queries(query_matrix_1 @ projection, document_matrix_1, 5, deleted=deleted)
+    rankings_2 = score_queries(query_matrix_2 @ projection, document_matrix_2, 5, deleted=deleted)
+else:
+    query_weight_vector_1, query_weight_vector_2 = generate_weight_vector_map(query_index, query_collection_size,
+                                                                              avg_query_doclen)
+    rankings_1 = rankings_2 = None
 
 print("Query vector representation for Weighting Scheme 1:")
 print_vector_representation(query_weight_vector_1)
@@ -345,7 +432,14 @@ print("Query vector representation for Weighting Scheme 2:")
 print_vector_representation(query_weight_vector_2)
 print()
 print("Top 5 Documents Using Weighting Scheme 1:")
-get_top5_documents(query_weight_vector_1, document_weight_vector_1)
+get_top5_documents(query_weight_vector_1, document_weight_vector_1, weight_index_1, rankings_1)
 print()
 print("Top 5 Documents Using Weighting Scheme 2:")
-get_top5_documents(query_weight_vector_2, document_weight_vector_2)
+get_top5_documents(query_weight_vector_2, document_weight_vector_2, weight_index_2, rankings_2)
+print()
+if boolean_queries:
+    print("Boolean Queries:")
+    print_boolean_results(boolean_queries)
+print(lemmatizer.cache.report("Lemma"))
+if document_cache_path is not None:
+    print(document_cache.report())
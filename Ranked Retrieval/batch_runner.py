@@ -0,0 +1,108 @@
+"""
+Author: Anshul Pardhi
+Ranking of a batch of queries in a pool of worker processes, written as TREC run files. The workers are forked from the
+calling process once its index is loaded, so they share its memory mapped index files and weights instead of loading
+their own
+"""
+
+import re
+import time
+import multiprocessing
+
+# Searcher of the calling process, inherited by the forked workers
+searcher = None
+
+
+def read_queries(path):
+    """
+    Read a queries file, either in blocks of the form Q<number> followed by the lines of the query up to an empty line,
+    as hw3.queries, or one query per line
+    :param path:
+    :return: list of (qid, query text); the qid of a block is its number, the qid of a line is its line number
+    """
+    queries_file = open(path, "r")
+    query_lines = queries_file.readlines()
+    queries_file.close()
+
+    queries = []
+    if not any(re.match(r"^Q\d+\s*$", line) for line in query_lines):
+        for line_no, line in enumerate(query_lines, 1):
+            if line.strip():
+                queries.append((str(line_no), line.strip()))
+        return queries
+
+    i = 0
+    while i < len(query_lines):
+        if re.match(r"^Q\d+\s*$", query_lines[i]):
+            qid = query_lines[i].strip()[1:]
+            i += 1
+            curr_query = []
+            while i < len(query_lines) and query_lines[i].strip():
+                curr_query.append(query_lines[i].strip())
+                i += 1
+            queries.append((qid, " ".join(curr_query)))
+        i += 1
+    return queries
+
+
+def rank_in_worker(task):
+    """
+    Rank one query with the searcher inherited from the calling process
+    :param task: qid, query text, scheme, k
+    :return: qid, list of (doc_id, score)
+    """
+    qid, query, scheme, k = task
+    return qid, searcher.search(query, scheme, k)
+
+
+def run_batch(batch_searcher, queries, scheme, k, num_processes=1, chunks_per_process=4):
+    """
+    Rank a batch of queries
+    :param batch_searcher: Searcher, see searcher.py
+    :param queries: list of (qid, query text)
+    :param scheme: 1: W1; 2: W2
+    :param k: number of documents of every query
+    :param num_processes: number of worker processes, 1 to rank in this process
+    :param chunks_per_process: the queries are sent to the workers in this many chunks per process, to balance the load
+    :return: list of (qid, ranking) in the order of the queries, and the wall time in seconds
+    """
+    global searcher
+    searcher = batch_searcher
+    tasks = [(qid, query, scheme, k) for qid, query in queries]
+    start_time = time.time()
+    if num_processes <= 1 or len(tasks) <= 1:
+        results = [rank_in_worker(task) for task in tasks]
+    else:
+        chunk_size = max(1, len(tasks) // (num_processes * chunks_per_process))
+        pool = multiprocessing.get_context("fork").Pool(processes=num_processes)
+        try:
+            results = pool.map(rank_in_worker, tasks, chunk_size)
+        finally:
+            pool.close()
+            pool.join()
+    return results, time.time() - start_time
+
+
+def write_trec_run(path, results, tag, docnos=None):
+    """
+    Write rankings in the TREC run format, one line per ranked document: qid Q0 docno rank score tag. The documents
+    that share no term with the query only fill up the top k with a score of 0, they are left out
+    :param path:
+    :param results: list of (qid, ranking), see run_batch
+    :param tag: name of the run
+    :param docnos: map of the form {doc_id: docno}, see evaluation.read_docnos; a document without a docno, e.g. one
+    added to the index after it was built, is written with its doc_id
+    :return: number of lines written
+    """
+    if docnos is None:
+        docnos = {}
+    lines = 0
+    run_op = open(path, "w")
+    for qid, ranking in results:
+        for rank, (doc_id, score) in enumerate(ranking, 1):
+            if score <= 0:
+                break
+            run_op.write("%s Q0 %s %s %s %s\n" % (qid, docnos.get(doc_id, str(doc_id)), rank, round(score, 4), tag))
+            lines += 1
+    run_op.close()
+    return lines
@@ -0,0 +1,199 @@
+"""
+Author: Anshul Pardhi
+Bit level gamma and delta codes used to compress the posting lists of the index.
+Codes are packed 8 bits to a byte in a bytearray, most significant bit first
+"""
+
+
+class BitWriter:
+    """
+    Appends bits to a growing bytearray
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.bit_count = 0  # Total number of bits written so far
+
+    def write_bit(self, bit):
+        """
+        Append a single bit
+        :param bit: 0 or 1
+        :return:
+        """
+        if self.bit_count % 8 == 0:
+            self.buffer.append(0)
+        if bit:
+            self.buffer[-1] |= 0x80 >> (self.bit_count % 8)
+        self.bit_count += 1
+
+    def write_bits(self, value, width):
+        """
+        Append the lowest width bits of value, most significant bit first
+        :param value:
+        :param width:
+        :return:
+        """
+        for shift in range(width - 1, -1, -1):
+            self.write_bit((value >> shift) & 1)
+
+    def write_unary(self, value):
+        """
+        Append value 1s followed by a terminating 0
+        :param value:
+        :return:
+        """
+        for i in range(value):
+            self.write_bit(1)
+        self.write_bit(0)
+
+    def align(self):
+        """
+        Pad with 0s up to the next byte boundary
+        :return:
+        """
+        self.bit_count = len(self.buffer) * 8
+
+    def get_bytes(self):
+        """
+        Get the written bits, padded to whole bytes
+        :return: bytes
+        """
+        return bytes(self.buffer)
+
+
+class BitReader:
+    """
+    Reads bits back from a bytes like object written by BitWriter
+    """
+
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.position = offset * 8  # Bit position of the next bit to read
+
+    def read_bit(self):
+        """
+        Read a single bit
+        :return: 0 or 1
+        """
+        byte = self.data[self.position >> 3]
+        bit = (byte >> (7 - (self.position & 7))) & 1
+        self.position += 1
+        return bit
+
+    def read_bits(self, width):
+        """
+        Read width bits as an unsigned integer, most significant bit first
+        :param width:
+        :return: value
+        """
+        value = 0
+        for i in range(width):
+            value = (value << 1) | self.read_bit()
+        return value
+
+    def read_unary(self):
+        """
+        Count the 1s up to the terminating 0
+        :return: value
+        """
+        value = 0
+        while self.read_bit():
+            value += 1
+        return value
+
+    def align(self):
+        """
+        Skip the padding up to the next byte boundary
+        :return:
+        """
+        self.position = (self.position + 7) & ~7
+
+    def byte_offset(self):
+        """
+        Get the offset of the next unread byte, assuming the reader is aligned
+        :return: byte offset
+        """
+        return self.position >> 3
+
+
+def encode_gamma(writer, value):
+    """
+    Gamma code a positive integer: unary length of the offset followed by the offset,
+    i.e. the binary value without its leading 1
+    :param writer:
+    :param value:
+    :return:
+    """
+    if value < 1:
+        raise ValueError("Gamma code is defined for positive integers only, got %s" % value)
+    offset_len = value.bit_length() - 1
+    writer.write_unary(offset_len)
+    writer.write_bits(value, offset_len)
+
+
+def decode_gamma(reader):
+    """
+    Decode one gamma coded integer
+    :param reader:
+    :return: value
+    """
+    offset_len = reader.read_unary()
+    return (1 << offset_len) | reader.read_bits(offset_len)
+
+
+def encode_delta(writer, value):
+    """
+    Delta code a positive integer: gamma coded length of the binary value followed by the offset
+    :param writer:
+    :param value:
+    :return:
+    """
+    if value < 1:
+        raise ValueError("Delta code is defined for positive integers only, got %s" % value)
+    offset_len = value.bit_length() - 1
+    encode_gamma(writer, offset_len + 1)
+    writer.write_bits(value, offset_len)
+
+
+def decode_delta(reader):
+    """
+    Decode one delta coded integer
+    :param reader:
+    :return: value
+    """
+    offset_len = decode_gamma(reader) - 1
+    return (1 << offset_len) | reader.read_bits(offset_len)
+
+
+# Bit codes selectable by the index_flag of generate_index; 1: gamma, 2: delta
+ENCODERS = {1: encode_gamma, 2: encode_delta}
+DECODERS = {1: decode_gamma, 2: decode_delta}
+
+
+def get_gaps(doc_ids):
+    """
+    Convert a sorted list of doc_ids to gaps; the first gap is the first doc_id itself
+    :param doc_ids:
+    :return: list of gaps
+    """
+    gaps = []
+    prev_doc_id = 0
+    for doc_id in doc_ids:
+        gaps.append(doc_id - prev_doc_id)
+        prev_doc_id = doc_id
+    return gaps
+
+
+def get_doc_ids(gaps):
+    """
+    Convert gaps back to doc_ids with a running sum
+    :param gaps:
+    :return: list of doc_ids
+    """
+    doc_ids = []
+    doc_id = 0
+    for gap in gaps:
+        doc_id += gap
+        doc_ids.append(doc_id)
+    return doc_ids
+
@@ -0,0 +1,371 @@
+"""
+Author: Anshul Pardhi
+Boolean retrieval of AND, OR and NOT queries on posting lists with skip pointers, see skip_postings.py.
+Query words are analyzed like the documents; AND binds tighter than OR, NOT tighter than AND, parentheses group, and
+words next to each other are ANDed, e.g. "(shock OR wave) boundary NOT layer". With a positional index, see
+positional_index.py, words in double quotes match as a phrase and a /k between two words matches them within k
+positions of each other, e.g. "boundary layer" AND shock /3 wave
+"""
+
+import re
+from skip_postings import SkipPostings, SkipCursor
+
+QUERY_TOKEN = re.compile(r'\(|\)|"[^"]*"?|[^\s()"]+')
+PROXIMITY_OPERATOR = re.compile(r"^/(\d+)$")
+OPERATORS = frozenset(["AND", "OR", "NOT", "(", ")"])
+
+
+class BooleanQueryParser:
+    """
+    Recursive descent parser turning a Boolean query into a tree of nodes of the form ("term", term), ("and", nodes),
+    ("or", nodes), ("not", node), ("phrase", terms) or ("near", [term, term], k). Words left without terms by the
+    analyzer, i.e. stopwords, are dropped
+    """
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.tokens = []
+        self.position = 0
+
+    def parse(self, query):
+        """
+        Parse a Boolean query
+        :param query:
+        :return: query tree, None if no word of the query has a term
+        """
+        self.tokens = QUERY_TOKEN.findall(query)
+        self.position = 0
+        node = self.parse_or()
+        if self.position < len(self.tokens):
+            raise ValueError("Unexpected %s at position %s of Boolean query %s" % (self.peek(), self.position, query))
+        return node
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.peek() == "OR":
+            self.position += 1
+            nodes.append(self.parse_and())
+        return self.combine("or", nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self.peek() is not None and self.peek() not in ("OR", ")"):
+            if self.peek() == "AND":
+                self.position += 1
+            nodes.append(self.parse_not())
+        return self.combine("and", nodes)
+
+    def parse_not(self):
+        if self.peek() == "NOT":
+            self.position += 1
+            node = self.parse_not()
+            return None if node is None else ("not", node)
+        return self.parse_proximity()
+
+    def parse_proximity(self):
+        node = self.parse_operand()
+        while self.peek() is not None and PROXIMITY_OPERATOR.match(self.peek()):
+            k = int(PROXIMITY_OPERATOR.match(self.peek()).group(1))
+            self.position += 1
+            other = self.parse_operand()
+            if node is None or other is None:
+                node = other if node is None else node
+            elif node[0] != "term" or other[0] != "term":
+                raise ValueError("The operands of /%s must be single words in Boolean query" % k)
+            else:
+                node = ("near", [node[1], other[1]], k)
+        return node
+
+    def parse_operand(self):
+        token = self.peek()
+        if token is None or (token in OPERATORS and token != "(") or PROXIMITY_OPERATOR.match(token):
+            raise ValueError("Missing operand before %s in Boolean query" % ("the end" if token is None else token))
+        self.position += 1
+        if token == "(":
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise ValueError("Missing ) in Boolean query")
+            self.position += 1
+            return node
+        if token.startswith('"'):
+            if len(token) == 1 or not token.endswith('"'):
+                raise ValueError("Missing closing quote in Boolean query")
+            terms = list(self.analyzer.terms(token[1:-1]))
+            if len(terms) < 2:
+                return self.combine("and", [("term", term) for term in terms])
+            return "phrase", terms
+        # A word can analyze to several terms, e.g. "U.S.-made", which must all be in the document
+        return self.combine("and", [("term", term) for term in self.analyzer.terms(token)])
+
+    @staticmethod
+    def combine(operator, nodes):
+        """
+        Join nodes under an operator, dropping the empty ones
+        :param operator: "and" or "or"
+        :param nodes:
+        :return: node, None if all nodes are empty
+        """
+        nodes = [node for node in nodes if node is not None]
+        if not nodes:
+            return None
+        if len(nodes) == 1:
+            return nodes[0]
+        return operator, nodes
+
+
+class BooleanEngine:
+    """
+    Evaluates Boolean query trees with merges of posting lists. Conjunctions are intersected rarest list first, so the
+    intermediate results stay as short as possible, and the cursors follow the skip pointers over the doc_ids that
+    cannot match. Phrases and /k proximity are first intersected the same way, and the positions are only compared
+    in the documents containing all their terms. Every doc_id and position comparison is counted, as well as the skips
+    followed, the compressed chunks decoded and the position lists decoded out of the ones of the terms
+    """
+
+    def __init__(self, get_postings, live_doc_ids, use_skips=True, positional_index=None):
+        """
+        :param get_postings: function returning the SkipPostings of a term, None if it is not in the dictionary
+        :param live_doc_ids: sorted doc_ids of all the documents that are not deleted, for the NOT queries
+        :param use_skips: False to walk the posting lists one doc_id at a time
+        :param positional_index: PositionalIndex, for the phrase and proximity queries
+        """
+        self.get_postings = get_postings
+        self.live_doc_ids = live_doc_ids
+        self.use_skips = use_skips
+        self.positional_index = positional_index
+        self.counters = {"comparisons": 0, "skips": 0, "chunks_decoded": 0, "positions_decoded": 0,
+                         "position_lists": 0}
+        self.term_postings = []
+
+    def search(self, node):
+        """
+        Evaluate a query tree
+        :param node: see BooleanQueryParser
+        :return: list of matching doc_ids
+        """
+        self.term_postings = []
+        doc_ids = [] if node is None else self.evaluate(node).to_list()
+        self.counters["chunks_decoded"] += sum(postings.chunks_loaded for postings in self.term_postings)
+        return doc_ids
+
+    def evaluate(self, node):
+        """
+        Evaluate a query tree node
+        :param node:
+        :return: SkipPostings
+        """
+        operator = node[0]
+        if operator == "term":
+            postings = self.get_postings(node[1])
+            if postings is None:
+                return SkipPostings.from_doc_ids([])
+            self.term_postings.append(postings)
+            return postings
+        if operator in ("phrase", "near"):
+            return self.match_positions(node)
+        if operator == "not":
+            return self.difference(SkipPostings.from_doc_ids(self.live_doc_ids), self.evaluate(node[1]))
+        if operator == "or":
+            result = self.evaluate(node[1][0])
+            for child in node[1][1:]:
+                result = self.union(result, self.evaluate(child))
+            return result
+
+        # AND: the positive operands are intersected rarest first, then the NOT operands are taken away
+        positives = [self.evaluate(child) for child in node[1] if child[0] != "not"]
+        negatives = [self.evaluate(child[1]) for child in node[1] if child[0] == "not"]
+        positives.sort(key=len)
+        result = positives[0] if positives else SkipPostings.from_doc_ids(self.live_doc_ids)
+        for postings in positives[1:]:
+            if len(result) == 0:
+                break
+            result = self.intersect(result, postings)
+        for postings in sorted(negatives, key=len, reverse=True):
+            if len(result) == 0:
+                break
+            result = self.difference(result, postings)
+        return result
+
+    def match_positions(self, node):
+        """
+        Evaluate a phrase or proximity node: intersect the posting lists of its terms, then compare the positions of
+        the terms in the documents left
+        :param node: ("phrase", terms) or ("near", [term, term], k)
+        :return: SkipPostings
+        """
+        if self.positional_index is None:
+            raise ValueError("Phrase and proximity queries need the positional index, see IndexBuilding.py")
+        candidates = self.evaluate(("and", [("term", term) for term in node[1]])).to_list()
+        positional_postings = [self.positional_index.get_postings(term) for term in node[1]]
+        if not candidates or None in positional_postings:
+            return SkipPostings.from_doc_ids([])
+
+        answer = []
+        for doc_id in candidates:
+            # Documents added after the positional index was built have no positions
+            entries = [postings.find(doc_id) for postings in positional_postings]
+            if None in entries:
+                continue
+            position_lists = [postings.get_positions(i) for postings, i in zip(positional_postings, entries)]
+            if node[0] == "phrase":
+                matched = self.match_phrase(position_lists)
+            else:
+                matched = self.match_near(position_lists[0], position_lists[1], node[2])
+            if matched:
+                answer.append(doc_id)
+        self.counters["positions_decoded"] += sum(postings.positions_decoded for postings in positional_postings)
+        self.counters["position_lists"] += sum(len(postings) for postings in positional_postings)
+        return SkipPostings.from_doc_ids(answer)
+
+    def match_phrase(self, position_lists):
+        """
+        Check that the terms of a phrase follow each other in a document
+        :param position_lists: sorted positions of every term of the phrase in the document, in phrase order
+        :return: True if the phrase is in the document
+        """
+        starts = position_lists[0]  # Positions the phrase may start at
+        for offset in range(1, len(position_lists)):
+            positions = position_lists[offset]
+            matched = []
+            i = 0
+            j = 0
+            while i < len(starts) and j < len(positions):
+                self.counters["comparisons"] += 1
+                if starts[i] + offset == positions[j]:
+                    matched.append(starts[i])
+                    i += 1
+                    j += 1
+                elif starts[i] + offset < positions[j]:
+                    i += 1
+                else:
+                    j += 1
+            if not matched:
+                return False
+            starts = matched
+        return True
+
+    def match_near(self, positions_1, positions_2, k):
+        """
+        Check that two terms are within k positions of each other in a document
+        :param positions_1: sorted positions of the first term
+        :param positions_2: sorted positions of the second term
+        :param k:
+        :return: True if a pair of positions is at most k apart
+        """
+        i = 0
+        j = 0
+        while i < len(positions_1) and j < len(positions_2):
+            self.counters["comparisons"] += 1
+            if abs(positions_1[i] - positions_2[j]) <= k:
+                return True
+            if positions_1[i] < positions_2[j]:
+                i += 1
+            else:
+                j += 1
+        return False
+
+    def advance(self, cursor, target):
+        """
+        Move a cursor off a doc_id smaller than target, following the skip pointers that do not pass target
+        :param cursor: SkipCursor
+        :param target:
+        :return:
+        """
+        skipped = False
+        while self.use_skips and cursor.has_skip():
+            self.counters["comparisons"] += 1
+            if cursor.skip_doc() > target:
+                break
+            cursor.skip()
+            self.counters["skips"] += 1
+            skipped = True
+        if not skipped:
+            cursor.next()
+
+    def intersect(self, postings_1, postings_2):
+        """
+        :param postings_1: SkipPostings
+        :param postings_2: SkipPostings
+        :return: SkipPostings of the doc_ids in both
+        """
+        answer = []
+        cursor_1 = SkipCursor(postings_1)
+        cursor_2 = SkipCursor(postings_2)
+        while not cursor_1.at_end() and not cursor_2.at_end():
+            doc_id_1 = cursor_1.doc()
+            doc_id_2 = cursor_2.doc()
+            self.counters["comparisons"] += 1
+            if doc_id_1 == doc_id_2:
+                answer.append(doc_id_1)
+                cursor_1.next()
+                cursor_2.next()
+            elif doc_id_1 < doc_id_2:
+                self.advance(cursor_1, doc_id_2)
+            else:
+                self.advance(cursor_2, doc_id_1)
+        return SkipPostings.from_doc_ids(answer)
+
+    def difference(self, postings_1, postings_2):
+        """
+        :param postings_1: SkipPostings
+        :param postings_2: SkipPostings
+        :return: SkipPostings of the doc_ids in postings_1 but not in postings_2
+        """
+        answer = []
+        cursor_1 = SkipCursor(postings_1)
+        cursor_2 = SkipCursor(postings_2)
+        while not cursor_1.at_end() and not cursor_2.at_end():
+            doc_id_1 = cursor_1.doc()
+            doc_id_2 = cursor_2.doc()
+            self.counters["comparisons"] += 1
+            if doc_id_1 == doc_id_2:
+                cursor_1.next()
+                cursor_2.next()
+            elif doc_id_1 < doc_id_2:
+                answer.append(doc_id_1)
+                cursor_1.next()
+            else:
+                self.advance(cursor_2, doc_id_1)
+        answer.extend(get_remaining(cursor_1))
+        return SkipPostings.from_doc_ids(answer)
+
+    def union(self, postings_1, postings_2):
+        """
+        :param postings_1: SkipPostings
+        :param postings_2: SkipPostings
+        :return: SkipPostings of the doc_ids in either, skip pointers do not help here
+        """
+        answer = []
+        cursor_1 = SkipCursor(postings_1)
+        cursor_2 = SkipCursor(postings_2)
+        while not cursor_1.at_end() and not cursor_2.at_end():
+            doc_id_1 = cursor_1.doc()
+            doc_id_2 = cursor_2.doc()
+            self.counters["comparisons"] += 1
+            if doc_id_1 <= doc_id_2:
+                answer.append(doc_id_1)
+                cursor_1.next()
+                if doc_id_1 == doc_id_2:
+                    cursor_2.next()
+            else:
+                answer.append(doc_id_2)
+                cursor_2.next()
+        answer.extend(get_remaining(cursor_1))
+        answer.extend(get_remaining(cursor_2))
+        return SkipPostings.from_doc_ids(answer)
+
+
+def get_remaining(cursor):
+    """
+    Get the doc_ids from a cursor to the end of its posting list
+    :param cursor: SkipCursor
+    :return: list of doc_ids
+    """
+    doc_ids = []
+    while not cursor.at_end():
+        doc_ids.append(cursor.doc())
+        cursor.next()
+    return doc_ids
@@ -0,0 +1,351 @@
+"""
+Author: Anshul Pardhi
+Binary index that accepts new and deleted documents without being rebuilt.
+New documents go to an auxiliary in memory index and deleted documents are marked with tombstones; both are merged
+with the binary index at query time, and merge folds them into the binary index files.
+A merge is committed in three steps: the new files are written and synced under prefix.merge, the prefix.merge.done
+marker is written and synced, then the files are moved over the current ones and the marker is removed. If the program
+stops before the marker exists, the current files are untouched and the merge files are deleted when the index is next
+opened; once it exists, opening the index moves the remaining merge files into place. A merge increments the generation
+of the files, see binary_index.read_generation
+"""
+
+import os
+from collections import Counter, OrderedDict
+from postings import PostingList
+from binary_index import BinaryIndex, BinaryIndexWriter, read_generation, write_generation
+from compressed_index import DocumentNorms
+
+MERGE_EXTENSIONS = (".dict", ".postings", ".docs", ".deleted", ".added", ".generation")  # Files replaced by a merge
+MERGE_MARKER = ".merge.done"  # Written once every merge file is synced, the merge is committed from then on
+
+
+def sync_file(path):
+    """
+    Flush a written file to the disk
+    :param path:
+    :return:
+    """
+    file_op = open(path, "ab")
+    os.fsync(file_op.fileno())
+    file_op.close()
+
+
+def sync_directory(path):
+    """
+    Flush the entries of a directory to the disk, so that the files created and renamed in it persist. Only POSIX
+    systems can open a directory for this
+    :param path:
+    :return:
+    """
+    if os.name != "posix":
+        return
+    directory_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
+
+
+class DynamicIndex:
+    """
+    Updatable view of a binary index. Doc_ids are never reused: new documents are numbered after the largest doc_id and
+    deleted documents keep their (empty) doc stats entry. The df and collection size count live documents only
+    """
+
+    def __init__(self, prefix, merge_threshold=None):
+        """
+        :param prefix: path prefix of the binary index files
+        :param merge_threshold: number of auxiliary postings at which the updates are merged, None to only merge on
+        explicit calls to merge
+        """
+        self.prefix = prefix
+        self.merge_threshold = merge_threshold
+        self.recover_merge()
+        # Read before the files, so that files rewritten in between are seen as changed
+        self.disk_generation = read_generation(prefix)
+        self.main = BinaryIndex(prefix)
+        self.auxiliary = {}  # Auxiliary index is of the form {word: posting_list(doc_id, tf, max_tf, doclen)}
+        self.auxiliary_postings = 0
+        self.auxiliary_doc_stats = {}  # Map of the form {doc_id: (max_tf, doclen)}
+        self.auxiliary_titles = {}
+        self.auxiliary_files = set()  # Files of the auxiliary documents
+        self.added_files = self.read_added_files()
+        self.deleted = self.read_tombstones()
+        self.merged_deletions = len(self.deleted)  # Deleted documents whose postings the binary index no longer holds
+        self.max_doc_id = self.main.collection_size
+        self.total_doclen = self.main.total_doclen
+        # Counts the documents added and deleted since the files were opened, results computed before a change are stale
+        self.generation = 0
+        for doc_id in self.deleted:
+            if doc_id <= self.main.collection_size:
+                self.total_doclen -= self.main.get_doc_stats(doc_id)[1]
+
+    @property
+    def collection_size(self):
+        """
+        Number of live documents, the collection size of the weighting schemes
+        :return: collection_size
+        """
+        return self.max_doc_id - len(self.deleted)
+
+    def has_pending_updates(self):
+        """
+        Tell whether documents were added or deleted since the binary index files were written. The vector norms of
+        the doc stats file are only valid for the documents of the files
+        :return: True if there are unmerged updates
+        """
+        return len(self.auxiliary_doc_stats) > 0 or len(self.deleted) > self.merged_deletions
+
+    def recover_merge(self):
+        """
+        Finish or undo a merge interrupted by the end of the program: a committed merge is completed, the files of an
+        uncommitted one are deleted
+        :return:
+        """
+        if os.path.exists(self.prefix + MERGE_MARKER):
+            self.commit_merge()
+            return
+        for extension in MERGE_EXTENSIONS:
+            if os.path.exists(self.prefix + ".merge" + extension):
+                os.remove(self.prefix + ".merge" + extension)
+
+    def commit_merge(self):
+        """
+        Move the synced merge files over the binary index files, then remove the marker. The files already moved by an
+        interrupted call are skipped, so this can be repeated until it completes
+        :return:
+        """
+        for extension in MERGE_EXTENSIONS:
+            if os.path.exists(self.prefix + ".merge" + extension):
+                os.replace(self.prefix + ".merge" + extension, self.prefix + extension)
+        sync_directory(self.prefix)
+        if os.path.exists(self.prefix + MERGE_MARKER):  # Another process opening the index may have completed it
+            os.remove(self.prefix + MERGE_MARKER)
+        sync_directory(self.prefix)
+
+    def read_tombstones(self):
+        """
+        Read the doc_ids deleted before the last merge
+        :return: set of doc_ids
+        """
+        deleted = set()
+        if os.path.exists(self.prefix + ".deleted"):
+            tombstones_ip = open(self.prefix + ".deleted", "r")
+            for line in tombstones_ip:
+                if line.strip():
+                    deleted.add(int(line))
+            tombstones_ip.close()
+        return deleted
+
+    def read_added_files(self):
+        """
+        Read the files whose documents were added before the last merge
+        :return: set of file paths
+        """
+        added_files = set()
+        if os.path.exists(self.prefix + ".added"):
+            added_files_ip = open(self.prefix + ".added", "r")
+            for line in added_files_ip:
+                if line.strip():
+                    added_files.add(line.rstrip("\n"))
+            added_files_ip.close()
+        return added_files
+
+    def has_file(self, file):
+        """
+        Tell whether the documents of a file were already added, merged or not
+        :param file: path, as given to add_document
+        :return: True if the file was added
+        """
+        return file in self.added_files or file in self.auxiliary_files
+
+    def add_document(self, word_list, doclen, title=None, file=None):
+        """
+        Add a document to the auxiliary index
+        :param word_list: analyzed terms of the document
+        :param doclen:
+        :param title:
+        :param file: path of the file holding the document, recorded so that it is not added again, see has_file
+        :return: doc_id of the new document
+        """
+        self.max_doc_id += 1
+        doc_id = self.max_doc_id
+        count = Counter(word_list)
+        max_tf = count.most_common(1)[0][1] if count else 0
+        for term, tf in count.items():
+            posting_list = self.auxiliary.get(term)
+            if posting_list is None:
+                posting_list = PostingList()
+                self.auxiliary.update({term: posting_list})
+            posting_list.append(doc_id, tf, max_tf, doclen)
+        self.auxiliary_postings += len(count)
+        self.auxiliary_doc_stats.update({doc_id: (max_tf, doclen)})
+        if title is not None:
+            self.auxiliary_titles.update({doc_id: title})
+        if file is not None:
+            self.auxiliary_files.add(file)
+        self.total_doclen += doclen
+        self.generation += 1
+
+        if self.merge_threshold is not None and self.auxiliary_postings >= self.merge_threshold:
+            self.merge()
+        return doc_id
+
+    def delete_document(self, doc_id):
+        """
+        Mark a document as deleted, its postings are skipped from now on and removed by the next merge
+        :param doc_id:
+        :return: True if the document was live
+        """
+        if doc_id < 1 or doc_id > self.max_doc_id or doc_id in self.deleted:
+            return False
+        self.deleted.add(doc_id)
+        self.total_doclen -= self.get_doc_stats(doc_id)[1]
+        self.generation += 1
+        return True
+
+    def get_doc_stats(self, doc_id):
+        """
+        Get the stats of a document
+        :param doc_id:
+        :return: max_tf, doclen
+        """
+        if doc_id in self.auxiliary_doc_stats:
+            return self.auxiliary_doc_stats[doc_id]
+        return self.main.get_doc_stats(doc_id)
+
+    def get_title(self, doc_id, default=None):
+        """
+        Get the title of a live document
+        :param doc_id:
+        :param default: returned for unknown and deleted doc_ids
+        :return: title
+        """
+        if doc_id in self.deleted:
+            return default
+        if doc_id in self.auxiliary_doc_stats:
+            return self.auxiliary_titles.get(doc_id, default)
+        return self.main.get_title(doc_id, default)
+
+    def get_postings(self, term):
+        """
+        Merge the posting lists of a term from the binary and auxiliary indexes, skipping deleted documents.
+        Auxiliary doc_ids are all larger than the binary index ones, so the result stays in doc_id order
+        :param term:
+        :return: posting list, empty if no live document contains the term
+        """
+        posting_list = PostingList()
+        for part in (self.main.get_postings(term), self.auxiliary.get(term, PostingList())):
+            if not self.deleted:
+                posting_list.extend(part)
+                continue
+            for doc_id, tf, max_tf, doclen in part:
+                if doc_id not in self.deleted:
+                    posting_list.append(doc_id, tf, max_tf, doclen)
+        return posting_list
+
+    def get_df(self, term):
+        """
+        Get the number of live documents containing a term
+        :param term:
+        :return: df
+        """
+        if not self.deleted:
+            return self.main.get_df(term) + len(self.auxiliary.get(term, ()))
+        return len(self.get_postings(term))
+
+    def terms(self):
+        """
+        Get the terms of the binary and auxiliary indexes in sorted order, including terms left without live documents
+        :return: sorted list of terms
+        """
+        return sorted(set(self.main.terms()).union(self.auxiliary))
+
+    def __contains__(self, term):
+        return self.get_df(term) > 0
+
+    def __iter__(self):
+        return iter(term for term in self.terms() if term in self)
+
+    def __getitem__(self, term):
+        posting_list = self.get_postings(term)
+        if len(posting_list) == 0:
+            raise KeyError(term)
+        return posting_list
+
+    def to_index(self):
+        """
+        Build the in memory index of the live documents
+        :return: index of the form {word: posting_list(doc_id, tf, max_tf, doclen)}
+        """
+        index = OrderedDict()
+        for term in self.terms():
+            posting_list = self.get_postings(term)
+            if len(posting_list) > 0:
+                index[term] = posting_list
+        return index
+
+    def merge(self):
+        """
+        Fold the auxiliary index and the tombstones into the binary index files. The files are written next to the
+        current ones and only moved over them once all of them are on the disk, see recover_merge
+        :return:
+        """
+        # Deleted documents keep an empty entry so that doc_ids stay valid positions in the doc stats table
+        doc_stats = []
+        titles = {}
+        for doc_id in range(1, self.max_doc_id + 1):
+            if doc_id in self.deleted:
+                doc_stats.append((0, 0))
+            else:
+                doc_stats.append(self.get_doc_stats(doc_id))
+                titles.update({doc_id: self.get_title(doc_id, "")})
+
+        merge_prefix = self.prefix + ".merge"
+        writer = BinaryIndexWriter(merge_prefix)
+        norms = DocumentNorms(doc_stats, self.collection_size)  # Weighted with the live documents only
+        for term in self.terms():
+            posting_list = self.get_postings(term)
+            if len(posting_list) > 0:
+                writer.add(term, posting_list)
+                norms.add(posting_list)
+        writer.close(doc_stats, titles, norms)
+
+        # Tombstones are kept, the collection size of the binary index is its largest doc_id
+        tombstones_op = open(merge_prefix + ".deleted", "w")
+        for doc_id in sorted(self.deleted):
+            tombstones_op.write(str(doc_id) + "\n")
+        tombstones_op.close()
+        added_files_op = open(merge_prefix + ".added", "w")
+        for file in sorted(self.added_files.union(self.auxiliary_files)):
+            added_files_op.write(file + "\n")
+        added_files_op.close()
+        disk_generation = read_generation(self.prefix) + 1
+        write_generation(merge_prefix, disk_generation)
+
+        for extension in MERGE_EXTENSIONS:
+            sync_file(merge_prefix + extension)
+        marker_op = open(self.prefix + MERGE_MARKER, "w")
+        marker_op.close()
+        sync_file(self.prefix + MERGE_MARKER)
+        sync_directory(self.prefix)
+
+        self.main.close()
+        self.commit_merge()
+        self.main = BinaryIndex(self.prefix)
+        self.disk_generation = disk_generation
+        self.merged_deletions = len(self.deleted)
+        self.auxiliary = {}
+        self.auxiliary_postings = 0
+        self.auxiliary_doc_stats = {}
+        self.auxiliary_titles = {}
+        self.added_files.update(self.auxiliary_files)
+        self.auxiliary_files = set()
+
+    def close(self):
+        """
+        Close the binary index files, unmerged updates are lost
+        :return:
+        """
+        self.main.close()
@@ -0,0 +1,167 @@
+"""
+Author: Anshul Pardhi
+Evaluation of rankings against the Cranfield relevance judgments, and agreement of a ranking with a baseline ranking of
+the same query. The judgments grade a document from 1 (complete answer) to 4 (minimum interest); any other grade, e.g.
+-1, means not relevant
+"""
+
+import math
+from cranfield_reader import read_documents
+
+# Gain of every relevant grade for nDCG, the documents with any of these grades are relevant for MAP and precision
+RELEVANCE_GAINS = {1: 4, 2: 3, 3: 2, 4: 1}
+
+
+def read_qrels(path):
+    """
+    Read a cranqrel file, one judgment per line: qid docno grade
+    :param path:
+    :return: map of the form {qid: {docno: gain}}, only relevant documents are kept
+    """
+    qrels = {}
+    qrels_ip = open(path, "r")
+    for line in qrels_ip:
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        gain = RELEVANCE_GAINS.get(int(fields[2]), 0)
+        if gain > 0:
+            qrels.setdefault(fields[0], {}).update({fields[1]: gain})
+    qrels_ip.close()
+    return qrels
+
+
+def read_docnos(files):
+    """
+    Read the DOCNO of every document, in the doc_id order of IndexBuilding.py for the same list of files
+    :param files:
+    :return: map of the form {doc_id: docno}
+    """
+    docnos = {}
+    for doc_id, fields in read_documents(files):
+        for field, text in fields:
+            if field == "DOCNO":
+                docnos.update({doc_id: text.strip()})
+    return docnos
+
+
+def get_precision(docnos, relevant, k):
+    """
+    Precision at k; a ranking shorter than k counts the missing documents as not relevant
+    :param docnos: ranked docnos
+    :param relevant: map of the relevant docnos of the query
+    :param k:
+    :return: precision
+    """
+    return sum(1 for docno in docnos[:k] if docno in relevant) / float(k)
+
+
+def get_average_precision(docnos, relevant):
+    """
+    Average of the precision at the rank of every relevant document, relevant documents not retrieved count as 0
+    :param docnos: ranked docnos
+    :param relevant: map of the relevant docnos of the query
+    :return: average precision
+    """
+    if not relevant:
+        return 0.0
+    hits = 0
+    precision_sum = 0.0
+    for rank, docno in enumerate(docnos, 1):
+        if docno in relevant:
+            hits += 1
+            precision_sum += hits / float(rank)
+    return precision_sum / len(relevant)
+
+
+def get_ndcg(docnos, relevant, k):
+    """
+    Normalized discounted cumulative gain at k, with the graded gains of RELEVANCE_GAINS
+    :param docnos: ranked docnos
+    :param relevant: map of the form {docno: gain} of the query
+    :param k:
+    :return: nDCG
+    """
+    dcg = sum(relevant.get(docno, 0) / math.log(rank + 1, 2) for rank, docno in enumerate(docnos[:k], 1))
+    ideal_gains = sorted(relevant.values(), reverse=True)[:k]
+    ideal_dcg = sum(gain / math.log(rank + 1, 2) for rank, gain in enumerate(ideal_gains, 1))
+    return dcg / ideal_dcg if ideal_dcg > 0 else 0.0
+
+
+def get_overlap(ranking, baseline, k):
+    """
+    Fraction of the top k documents of the baseline that are also in the top k of the ranking
+    :param ranking: ranked doc_ids
+    :param baseline: ranked doc_ids of the baseline
+    :param k:
+    :return: overlap between 0 and 1
+    """
+    top_k = set(baseline[:k])
+    if not top_k:
+        return 1.0
+    return len(top_k.intersection(ranking[:k])) / float(len(top_k))
+
+
+def get_rbo(ranking, baseline, p=0.9):
+    """
+    Rank-biased overlap of two rankings, truncated at the depth of the shorter one: the overlap at every depth,
+    weighted by p to the power of the depth, so that disagreements near the top weigh more
+    :param ranking: ranked doc_ids
+    :param baseline: ranked doc_ids of the baseline
+    :param p: persistence, between 0 and 1
+    :return: rbo between 0 and 1, 1 for identical rankings
+    """
+    depth = min(len(ranking), len(baseline))
+    if depth == 0:
+        return 1.0
+    seen_ranking = set()
+    seen_baseline = set()
+    weighted_sum = 0.0
+    for d in range(depth):
+        seen_ranking.add(ranking[d])
+        seen_baseline.add(baseline[d])
+        weighted_sum += p ** d * len(seen_ranking.intersection(seen_baseline)) / float(d + 1)
+    return (1 - p) * weighted_sum / (1 - p ** depth)
+
+
+def get_percentile(values, percentile):
+    """
+    Nearest rank percentile of a list of values, e.g. latencies
+    :param values:
+    :param percentile: between 0 and 100
+    :return: value
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(percentile / 100.0 * len(values)))]
+
+
+def evaluate_rankings(rankings, qrels, baselines=None, overlap_k=5):
+    """
+    Average the quality of a run over the judged queries, and its agreement with a baseline run over all queries
+    :param rankings: map of the form {qid: ranked docnos}
+    :param qrels: see read_qrels
+    :param baselines: map of the form {qid: ranked docnos} of the baseline run, None to skip the agreement
+    :param overlap_k: depth of the overlap with the baseline
+    :return: map of the metric name: value
+    """
+    metrics = {"MAP": 0.0, "P@5": 0.0, "P@10": 0.0, "nDCG@10": 0.0}
+    judged = [qid for qid in rankings if qid in qrels]
+    for qid in judged:
+        metrics["MAP"] += get_average_precision(rankings[qid], qrels[qid])
+        metrics["P@5"] += get_precision(rankings[qid], qrels[qid], 5)
+        metrics["P@10"] += get_precision(rankings[qid], qrels[qid], 10)
+        metrics["nDCG@10"] += get_ndcg(rankings[qid], qrels[qid], 10)
+    for name in metrics:
+        metrics[name] = metrics[name] / len(judged) if judged else 0.0
+    metrics["judged"] = len(judged)
+
+    if baselines is not None:
+        overlap_name = "overlap@%s" % overlap_k
+        metrics[overlap_name] = 0.0
+        metrics["RBO"] = 0.0
+        for qid in rankings:
+            metrics[overlap_name] += get_overlap(rankings[qid], baselines[qid], overlap_k)
+            metrics["RBO"] += get_rbo(rankings[qid], baselines[qid])
+        metrics[overlap_name] /= max(1, len(rankings))
+        metrics["RBO"] /= max(1, len(rankings))
+    return metrics
@@ -0,0 +1,186 @@
+"""
+Author: Anshul Pardhi
+Dictionary and postings compression of a sorted index, one term at a time, so that an index can be compressed
+while it is being streamed as well as from memory
+"""
+
+from postings_codecs import DEFAULT_CODECS, get_codec
+
+
+def get_common_prefix(input_arr):
+    """
+    Get common prefix for a particular block for front coding
+    :param input_arr:
+    :return: common prefix
+    """
+    input_arr.sort(reverse=False)
+    str1 = input_arr[0]
+    str2 = input_arr[len(input_arr) - 1]
+    len1 = len(str1)
+    len2 = len(str2)
+    prefix = ""
+    i = 0
+    j = 0
+    while i < len1 and j < len2:
+        if str1[i] != str2[j]:
+            break
+        prefix += str1[i]
+        i += 1
+        j += 1
+    return prefix
+
+
+def get_front_coding_key_str(front_coding_list, key_str):
+    """
+    Generate front coded string for a particular block
+    :param front_coding_list:
+    :param key_str:
+    :return: key_str
+    """
+    common_prefix = get_common_prefix(front_coding_list)
+    # Key string is of the form len(first_word)common_prefix*remaining_first_word+len(remaining_word)<>remaining_word
+    # and so on. The lengths are single characters, chr(length), so that the key string can be decoded
+    remaining_first_word = front_coding_list[0][len(common_prefix):]
+    key_str += chr(len(front_coding_list[0])) + common_prefix + "*" + remaining_first_word
+    for word in front_coding_list[1:]:
+        remaining_word = word[len(common_prefix):]
+        key_str += chr(len(remaining_word)) + "<>" + remaining_word
+    return key_str
+
+
+def decode_key_str(key_str, index_flag):
+    """
+    Decode a compressed key string back to the dictionary terms. The terms never hold a * or a <, see
+    analyzer.tokenize, so these mark the end of the common prefix and the remaining words of a front coded block
+    :param key_str:
+    :param index_flag: 1: blocked compression; 2: front coding
+    :return: list of terms, in dictionary order
+    """
+    terms = []
+    pos = 0
+    while pos < len(key_str):
+        term_len = ord(key_str[pos])
+        pos += 1
+        if index_flag == 1:
+            terms.append(key_str[pos:pos + term_len])
+            pos += term_len
+            continue
+
+        # First word of a front coded block: common prefix, * and the rest of the word
+        prefix_end = key_str.index("*", pos)
+        common_prefix = key_str[pos:prefix_end]
+        pos = prefix_end + 1 + term_len - len(common_prefix)
+        terms.append(common_prefix + key_str[prefix_end + 1:pos])
+        while key_str[pos + 1:pos + 3] == "<>":
+            term_len = ord(key_str[pos])
+            pos += 3
+            terms.append(common_prefix + key_str[pos:pos + term_len])
+            pos += term_len
+    return terms
+
+
+class CompressedIndexBuilder:
+    """
+    Builds the compressed version of an index from its terms, which must be added in sorted order
+    """
+
+    def __init__(self, block_size, index_flag, codec=None):
+        """
+        :param block_size:
+        :param index_flag: 1: blocked compression and gamma codes; 2: front coding and delta codes
+        :param codec: name of the postings codec in postings_codecs.py, by default the code of the index_flag
+        """
+        self.block_size = block_size
+        self.index_flag = index_flag
+        self.codec = get_codec(codec or DEFAULT_CODECS[index_flag])
+        self.key_str = ""
+        self.i = -1
+        self.front_coding_list = []
+        self.max_cnt = 0
+        self.min_cnt = 1
+        self.max_df_list = []
+        self.min_df_list = []
+        self.postings_bytes = 0
+        self.block_offsets = []  # Offset of the first postings entry of every block, from the first entry
+
+    def add(self, key, posting_list):
+        """
+        Compress the next dictionary term and its posting list
+        :param key:
+        :param posting_list:
+        :return: compressed postings entry
+        """
+        self.i += 1
+        cnt = len(posting_list)  # df
+
+        # Keep the terms with the largest df seen so far, and the terms with the lowest df
+        if cnt > self.max_cnt:
+            self.max_cnt = cnt
+            self.max_df_list = []
+        if cnt == self.max_cnt:
+            self.max_df_list.append(key + ":" + str(self.max_cnt))
+        if cnt == self.min_cnt:
+            self.min_df_list.append(key + ":" + str(self.min_cnt))
+
+        # Compress the dictionary term
+        if self.index_flag == 1:
+            # Use blocked compression to generated compressed key string
+            curr_ind = len(self.key_str)
+            self.key_str += chr(len(key)) + str(key)
+        elif self.index_flag == 2:
+            # Use front coding to generate compressed key string, a block is added once it is complete
+            if self.i % self.block_size == 0:
+                if len(self.front_coding_list) > 0:
+                    self.key_str = get_front_coding_key_str(self.front_coding_list, self.key_str)
+                self.front_coding_list[:] = []
+            curr_ind = len(self.key_str)
+            self.front_coding_list.append(key)
+
+        # Compress the postings list
+        doc_ids = list(posting_list.doc_ids)
+        tfs = list(posting_list.tfs)
+
+        # Use the codec, gamma (index_flag 1) or delta (index_flag 2) encoding by default, of the doc_id gaps and tfs
+        # to generate the compressed postings list, packed into bytes
+        if self.i % self.block_size == 0:
+            # Compressed entry is of the form df encoded_string_index_of_key_str encoded_gaps encoded_tfs
+            self.block_offsets.append(self.postings_bytes)
+            entry = self.codec.encode_entry(doc_ids, tfs, curr_ind)
+        else:
+            # Compressed entry is of the form df encoded_gaps encoded_tfs
+            entry = self.codec.encode_entry(doc_ids, tfs)
+        self.postings_bytes += len(entry)
+        return entry
+
+    def finish(self):
+        """
+        Complete the key string once all terms are added
+        :return: key_str, max_df_list, min_df_list
+        """
+        # Add the remaining terms of the last block to the front coded key string
+        if self.index_flag == 2:
+            if len(self.front_coding_list) > 0:
+                self.key_str = get_front_coding_key_str(self.front_coding_list, self.key_str)
+            self.front_coding_list[:] = []
+
+        # A term is not listed with the lowest df if it has the largest df as well, i.e. if every term has a df of 1
+        if self.max_cnt == self.min_cnt:
+            self.min_df_list = []
+        return self.key_str, self.max_df_list, self.min_df_list
+
+
+def compress_index(index, block_size, index_flag, codec=None):
+    """
+    Compress a sorted index held in memory
+    :param index: index of the form {word: posting_list}, in sorted order
+    :param block_size:
+    :param index_flag: see CompressedIndexBuilder
+    :param codec: see CompressedIndexBuilder
+    :return: index_compressed, key_str, max_df_list, min_df_list
+    """
+    index_compressed = []
+    builder = CompressedIndexBuilder(block_size, index_flag, codec)
+    for key in index:
+        index_compressed.append(builder.add(key, index[key]))
+    key_str, max_df_list, min_df_list = builder.finish()
+    return index_compressed, key_str, max_df_list, min_df_list
@@ -0,0 +1,232 @@
+"""
+Author: Anshul Pardhi
+Positional index of the lemmas, for phrase and proximity queries. The position of a term is its position, counting
+from 1, among the terms of the document left after stopword removal. The index is stored in two files sharing a common
+prefix:
+    prefix.positions.dict  term dictionary: term, df and offset of its postings entry in the positions file
+    prefix.positions       postings entries, gamma or delta coded and padded to a byte boundary: df, the doc_id gaps,
+                           the tfs, the length in bits of the position list of every document, then the position gaps
+                           of every document
+The bit lengths let a reader decode the position list of one document without decoding the ones before it
+"""
+
+import mmap
+import struct
+from array import array
+from collections import OrderedDict
+from bisect import bisect_left
+from bit_codec import BitWriter, BitReader, ENCODERS, DECODERS, get_gaps, get_doc_ids
+
+POSITIONS_DICT_HEADER = struct.Struct("<BI")  # Code of the entries (1: gamma; 2: delta), number of terms
+POSITIONS_DICT_ENTRY = struct.Struct("<HIQ")  # Term length in bytes, df, entry offset (the term bytes follow)
+
+
+class PositionalPostingList:
+    """
+    Posting list with the positions of the term in every document, in doc_id order
+    """
+
+    __slots__ = ("doc_ids", "positions")
+
+    def __init__(self):
+        self.doc_ids = array('I')
+        self.positions = []  # Sorted positions of every document, as arrays
+
+    def append(self, doc_id, positions):
+        """
+        Add the positions of the term in the next document
+        :param doc_id:
+        :param positions: sorted positions
+        :return:
+        """
+        self.doc_ids.append(doc_id)
+        self.positions.append(positions)
+
+    def extend(self, other):
+        """
+        Add all postings of another positional posting list at the end of the list
+        :param other:
+        :return:
+        """
+        self.doc_ids.extend(other.doc_ids)
+        self.positions.extend(other.positions)
+
+    def __len__(self):
+        return len(self.doc_ids)  # df
+
+
+def add_document_positions(positional_index, term_list, doc_id):
+    """
+    Add the positions of the terms of a document to an unsorted positional index
+    :param positional_index: index of the form {term: PositionalPostingList}
+    :param term_list: terms of the document in text order
+    :param doc_id: larger than the doc_ids already in the index
+    :return:
+    """
+    document_positions = {}
+    for position, term in enumerate(term_list, 1):
+        positions = document_positions.get(term)
+        if positions is None:
+            positions = array('I')
+            document_positions.update({term: positions})
+        positions.append(position)
+    for term, positions in document_positions.items():
+        posting_list = positional_index.get(term)
+        if posting_list is None:
+            posting_list = PositionalPostingList()
+            positional_index.update({term: posting_list})
+        posting_list.append(doc_id, positions)
+
+
+def encode_positional_entry(posting_list, index_flag):
+    """
+    Encode a postings entry of the positions file
+    :param posting_list: PositionalPostingList
+    :param index_flag: 1: gamma; 2: delta
+    :return: bytes, number of bits of the position gaps alone
+    """
+    encode = ENCODERS[index_flag]
+    position_gaps = [get_gaps(positions) for positions in posting_list.positions]
+    position_bits = []
+    for gaps in position_gaps:
+        writer = BitWriter()
+        for gap in gaps:
+            encode(writer, gap)
+        position_bits.append(writer.bit_count)
+
+    writer = BitWriter()
+    encode(writer, len(posting_list))
+    for value in get_gaps(posting_list.doc_ids) + [len(positions) for positions in posting_list.positions] + \
+            position_bits:
+        encode(writer, value)
+    for gaps in position_gaps:
+        for gap in gaps:
+            encode(writer, gap)
+    writer.align()
+    return writer.get_bytes(), sum(position_bits)
+
+
+def write_positional_index(prefix, positional_index, index_flag):
+    """
+    Write a positional index to its dictionary and positions files
+    :param prefix: path prefix of the two files
+    :param positional_index: sorted index of the form {term: PositionalPostingList}
+    :param index_flag: 1: gamma; 2: delta
+    :return: size of the positions file in bytes, number of bits of the position gaps in it
+    """
+    dict_op = open(prefix + ".positions.dict", "wb")
+    positions_op = open(prefix + ".positions", "wb")
+    dict_op.write(POSITIONS_DICT_HEADER.pack(index_flag, len(positional_index)))
+    offset = 0
+    gap_bits = 0
+    for term in positional_index:
+        term_bytes = term.encode()
+        entry, entry_gap_bits = encode_positional_entry(positional_index[term], index_flag)
+        gap_bits += entry_gap_bits
+        dict_op.write(POSITIONS_DICT_ENTRY.pack(len(term_bytes), len(positional_index[term]), offset) + term_bytes)
+        positions_op.write(entry)
+        offset += len(entry)
+    dict_op.close()
+    positions_op.close()
+    return offset, gap_bits
+
+
+class PositionalPostings:
+    """
+    Postings entry of the positions file. The doc_ids and tfs are decoded up front, the position list of a document is
+    only decoded when it is asked for
+    """
+
+    def __init__(self, data, offset, index_flag):
+        """
+        :param data: memory mapped positions file
+        :param offset: offset of the entry
+        :param index_flag: 1: gamma; 2: delta
+        """
+        self.data = data
+        self.decode = DECODERS[index_flag]
+        reader = BitReader(data, offset)
+        df = self.decode(reader)
+        values = [self.decode(reader) for i in range(3 * df)]
+        self.doc_ids = get_doc_ids(values[:df])
+        self.tfs = values[df:2 * df]
+        self.position_starts = []  # Bit position of the position list of every document
+        position = reader.position
+        for bits in values[2 * df:]:
+            self.position_starts.append(position)
+            position += bits
+        self.positions_decoded = 0  # Number of position lists decoded so far
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def find(self, doc_id):
+        """
+        Find a document in the entry
+        :param doc_id:
+        :return: its position in the doc_ids, None if the term is not in the document
+        """
+        i = bisect_left(self.doc_ids, doc_id)
+        return i if i < len(self.doc_ids) and self.doc_ids[i] == doc_id else None
+
+    def get_positions(self, i):
+        """
+        Decode the position list of the i-th document of the entry
+        :param i:
+        :return: sorted positions
+        """
+        reader = BitReader(self.data)
+        reader.position = self.position_starts[i]
+        self.positions_decoded += 1
+        return get_doc_ids([self.decode(reader) for j in range(self.tfs[i])])
+
+
+class PositionalIndex:
+    """
+    Read only view of a positional index written by write_positional_index. The positions file is memory mapped, so
+    opening the index only reads the term dictionary
+    """
+
+    def __init__(self, prefix):
+        self.dictionary = OrderedDict()  # Dictionary is of the form {term: (df, offset)}
+        dict_ip = open(prefix + ".positions.dict", "rb")
+        data = dict_ip.read()
+        dict_ip.close()
+        self.index_flag, num_terms = POSITIONS_DICT_HEADER.unpack_from(data, 0)
+        pos = POSITIONS_DICT_HEADER.size
+        for i in range(num_terms):
+            term_len, df, offset = POSITIONS_DICT_ENTRY.unpack_from(data, pos)
+            pos += POSITIONS_DICT_ENTRY.size
+            self.dictionary[data[pos:pos + term_len].decode()] = (df, offset)
+            pos += term_len
+
+        self.positions_file = open(prefix + ".positions", "rb")
+        self.positions_map = mmap.mmap(self.positions_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, term):
+        return term in self.dictionary
+
+    def __len__(self):
+        return len(self.dictionary)
+
+    def __iter__(self):
+        return iter(self.dictionary)
+
+    def get_postings(self, term):
+        """
+        Read the postings entry of a term
+        :param term:
+        :return: PositionalPostings, None if the term is not in the dictionary
+        """
+        entry = self.dictionary.get(term)
+        if entry is None:
+            return None
+        return PositionalPostings(self.positions_map, entry[1], self.index_flag)
+
+    def close(self):
+        """
+        Unmap and close the positions file
+        :return:
+        """
+        self.positions_map.close()
+        self.positions_file.close()
@@ -0,0 +1,80 @@
+"""
+Author: Anshul Pardhi
+Compact posting list used while building and scoring the indexes
+"""
+
+from array import array
+
+
+class PostingList:
+    """
+    Posting list stored as parallel typed columns instead of a doc_id:tf:max_tf:doclen->... string.
+    Appending a posting is amortized O(1) and every column holds 4 byte unsigned integers
+    """
+
+    __slots__ = ("doc_ids", "tfs", "max_tfs", "doclens")
+
+    def __init__(self):
+        self.doc_ids = array('I')
+        self.tfs = array('I')
+        self.max_tfs = array('I')
+        self.doclens = array('I')
+
+    def append(self, doc_id, tf, max_tf, doclen):
+        """
+        Add a posting at the end of the list
+        :param doc_id:
+        :param tf:
+        :param max_tf:
+        :param doclen:
+        :return:
+        """
+        self.doc_ids.append(doc_id)
+        self.tfs.append(tf)
+        self.max_tfs.append(max_tf)
+        self.doclens.append(doclen)
+
+    def extend(self, other):
+        """
+        Add all postings of another posting list at the end of the list
+        :param other:
+        :return:
+        """
+        self.doc_ids.extend(other.doc_ids)
+        self.tfs.extend(other.tfs)
+        self.max_tfs.extend(other.max_tfs)
+        self.doclens.extend(other.doclens)
+
+    def __len__(self):
+        return len(self.doc_ids)  # df
+
+    def __iter__(self):
+        """
+        Iterate over the postings
+        :return: iterator over (doc_id, tf, max_tf, doclen)
+        """
+        return zip(self.doc_ids, self.tfs, self.max_tfs, self.doclens)
+
+    def __eq__(self, other):
+        return isinstance(other, PostingList) and self.doc_ids == other.doc_ids and self.tfs == other.tfs and \
+            self.max_tfs == other.max_tfs and self.doclens == other.doclens
+
+    def to_string(self):
+        """
+        Serialize the posting list for the index files
+        :return: string of the form doc_id1:tf1:max_tf1:doclen1->doc_id2:tf2:max_tf2:doclen2 and so on
+        """
+        return "->".join("%d:%d:%d:%d" % posting for posting in self)
+
+    @classmethod
+    def from_string(cls, postings_str):
+        """
+        Parse a posting list serialized by to_string
+        :param postings_str:
+        :return: posting list
+        """
+        posting_list = cls()
+        for posting in postings_str.split("->"):
+            doc_id, tf, max_tf, doclen = posting.split(":")
+            posting_list.append(int(doc_id), int(tf), int(max_tf), int(doclen))
+        return posting_list
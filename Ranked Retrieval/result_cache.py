@@ -0,0 +1,112 @@
+"""
+Author: Anshul Pardhi
+Cache of query rankings. A query is keyed by its analyzed terms in sorted order, so queries that differ only in word
+order, case, stopwords or inflections share an entry, together with the weighting scheme and k. The cached rankings
+are dropped as soon as the generation of the index changes
+"""
+
+import sys
+from term_cache import LRUCache
+
+
+def get_result_key(terms, scheme, k):
+    """
+    Normalize an analyzed query to its cache key
+    :param terms: analyzed query terms, repeated terms are kept since they change the query weights
+    :param scheme: 1: W1; 2: W2
+    :param k: number of documents
+    :return: key
+    """
+    return tuple(sorted(terms)), scheme, k
+
+
+def get_result_size(key, ranking):
+    """
+    Estimate the memory held by a cache entry
+    :param key:
+    :param ranking: list of (doc_id, score)
+    :return: size in bytes
+    """
+    size = sys.getsizeof(key) + sys.getsizeof(key[0]) + sum(sys.getsizeof(term) for term in key[0])
+    size += sys.getsizeof(ranking)
+    for result in ranking:
+        size += sys.getsizeof(result) + sum(sys.getsizeof(value) for value in result)
+    return size
+
+
+class ResultCache(LRUCache):
+    """
+    LRU cache of key: ranking, bounded by its number of entries and optionally by the memory they hold
+    """
+
+    def __init__(self, max_size=10000, max_bytes=None):
+        """
+        :param max_size: largest number of entries
+        :param max_bytes: largest estimated size of the entries in bytes, None for no bound
+        """
+        LRUCache.__init__(self, max_size)
+        self.max_bytes = max_bytes
+        self.sizes = {}
+        self.bytes = 0
+        self.generation = None  # Generation of the index the rankings were computed on
+        self.evictions = 0
+        self.invalidations = 0
+
+    def put(self, key, value):
+        """
+        Add an entry, evicting the least recently used entries while the cache is over either bound
+        :param key:
+        :param value:
+        :return:
+        """
+        if key in self.sizes:
+            self.bytes -= self.sizes[key]
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.sizes[key] = get_result_size(key, value)
+        self.bytes += self.sizes[key]
+        while self.entries and (len(self.entries) > self.max_size or
+                                (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            evicted_key = self.entries.popitem(last=False)[0]
+            self.bytes -= self.sizes.pop(evicted_key)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.sizes.clear()
+        self.bytes = 0
+
+    def check_generation(self, generation):
+        """
+        Drop every entry if the index changed since they were computed
+        :param generation: current generation of the index
+        :return:
+        """
+        if generation != self.generation:
+            if self.entries:
+                self.invalidations += 1
+            self.clear()
+            self.generation = generation
+
+    def reset_counters(self):
+        LRUCache.reset_counters(self)
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_stats(self):
+        """
+        Get the size and counters of the cache
+        :return: map of the counters
+        """
+        return {"entries": len(self.entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.get_hit_rate(), 4), "evictions": self.evictions,
+                "invalidations": self.invalidations}
+
+    def report(self, name):
+        """
+        Describe the cache size, counters and hit rate
+        :param name:
+        :return: report string
+        """
+        return "%s, %s bytes, %s evictions, %s invalidations" % (LRUCache.report(self, name), self.bytes,
+                                                                 self.evictions, self.invalidations)
@@ -0,0 +1,294 @@
+"""
+Author: Anshul Pardhi
+Top-k cosine scoring over the posting lists of the query terms only.
+Documents are ranked on decreasing score, ties are broken on increasing doc_id
+"""
+
+import heapq
+from bisect import bisect_left
+from term_cache import LRUCache
+from weighting import get_w1_weight, get_w2_weight
+
+
+def generate_weight_index(weight_vector_map):
+    """
+    Invert a document weight vector map into posting lists of weights, keeping the largest weight of every term as
+    its score upper bound for dynamic pruning. The weights depend on the collection size and df of the live documents,
+    so the bounds are computed here, when the documents are weighted, rather than stored with the index
+    :param weight_vector_map: map of the form {doc_id: {lemma: weight}}
+    :return: weight index of the form {lemma: [doc_ids, weights, max_weight]}, doc_ids in increasing order
+    """
+    weight_index = {}
+    for doc_id in sorted(weight_vector_map):
+        for term, weight in weight_vector_map[doc_id].items():
+            postings = weight_index.get(term)
+            if postings is None:
+                postings = [[], [], 0]
+                weight_index.update({term: postings})
+            postings[0].append(doc_id)
+            postings[1].append(weight)
+            if weight > postings[2]:
+                postings[2] = weight
+    return weight_index
+
+
+class StoredWeights:
+    """
+    Weight index of both weighting schemes built one term at a time, from the tfs of its postings and the doc stats and
+    vector norms stored with the index, so that no document is weighted before a query needs it. The weights are the
+    same as the ones of generate_weight_index. A term is read and weighted once, its postings are kept in an LRU cache
+    """
+
+    def __init__(self, read_postings, get_doc_norms, collection_size, avg_doclen, cache_size=100000):
+        """
+        :param read_postings: function of a term giving its doc_ids and tfs, None if the term is not in the index
+        :param get_doc_norms: function of a doc_id giving its max_tf, doclen, W1 norm and W2 norm
+        :param collection_size: collection size the norms were computed with
+        :param avg_doclen: average doclen the norms were computed with
+        :param cache_size: largest number of weighted terms kept
+        """
+        self.read_postings = read_postings
+        self.get_doc_norms = get_doc_norms
+        self.collection_size = collection_size
+        self.avg_doclen = avg_doclen
+        self.cache = LRUCache(cache_size)
+
+    def weigh(self, term):
+        """
+        Read and weight the posting list of a term with both schemes
+        :param term:
+        :return: postings of W1 and of W2, each of the form [doc_ids, weights, max_weight]; empty if the term is not in
+        the index. max_weight is the WAND upper bound of the term, cached with its postings
+        """
+        postings = self.read_postings(term)
+        if postings is None:
+            return ()
+        doc_ids, tfs = postings
+        df = len(doc_ids)
+        weights_1 = []
+        weights_2 = []
+        for doc_id, tf in zip(doc_ids, tfs):
+            max_tf, doclen, w1_norm, w2_norm = self.get_doc_norms(doc_id)
+            weights_1.append(round(get_w1_weight(tf, max_tf, self.collection_size, df) / w1_norm, 3))
+            weights_2.append(round(get_w2_weight(tf, doclen, self.avg_doclen, self.collection_size, df) / w2_norm, 3))
+        return [doc_ids, weights_1, max(weights_1)], [doc_ids, weights_2, max(weights_2)]
+
+    def get_weight_index(self, scheme):
+        """
+        :param scheme: 1: W1; 2: W2
+        :return: StoredWeightIndex of the scheme
+        """
+        return StoredWeightIndex(self, scheme)
+
+
+class StoredWeightIndex:
+    """
+    Weight index of one weighting scheme, looked up like the map of generate_weight_index, see StoredWeights
+    """
+
+    def __init__(self, weights, scheme):
+        self.weights = weights
+        self.scheme = scheme
+
+    def get(self, term, default=None):
+        """
+        :param term:
+        :param default: returned if the term is not in the index
+        :return: [doc_ids, weights, max_weight]
+        """
+        postings = self.weights.cache.get(term, self.weights.weigh)
+        return postings[self.scheme - 1] if postings else default
+
+
+def push_bounded(heap, k, score, doc_id):
+    """
+    Keep the k best (score, doc_id) pairs in a min heap; on equal scores the smaller doc_id is better
+    :param heap:
+    :param k:
+    :param score:
+    :param doc_id:
+    :return:
+    """
+    entry = (score, -doc_id)
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+def get_ranking(heap, k, collection_size, has_score, deleted=()):
+    """
+    Turn the heap into a ranking. Documents sharing no term with the query all score 0, so if fewer than k documents
+    have a positive score, the ranking is filled up with 0 scored documents in increasing doc_id order
+    :param heap:
+    :param k:
+    :param collection_size:
+    :param has_score: function telling whether a doc_id is already ranked with a positive score
+    :param deleted: doc_ids of deleted documents, never used to fill up the ranking
+    :return: list of (doc_id, score)
+    """
+    ranking = [(-neg_doc_id, score) for score, neg_doc_id in sorted(heap, reverse=True)]
+    doc_id = 1
+    while len(ranking) < k and doc_id <= collection_size:
+        if not has_score(doc_id) and doc_id not in deleted:
+            ranking.append((doc_id, 0))
+        doc_id += 1
+    return ranking
+
+
+def score_term_at_a_time(query_map, weight_index, collection_size, k=5, deleted=()):
+    """
+    Rank documents by accumulating the score contributions one query term posting list at a time
+    :param query_map: map of the form {lemma: weight}
+    :param weight_index: weight index generated by generate_weight_index
+    :param collection_size: largest doc_id in the collection
+    :param k:
+    :param deleted: doc_ids of deleted documents, see get_ranking
+    :return: list of (doc_id, score), best first
+    """
+    accumulators = [0] * (collection_size + 1)  # Dense score accumulators, indexed by doc_id
+    seen = bytearray(collection_size + 1)
+    touched = []
+    # Terms are visited in sorted order so the scores add up exactly as in the document vectors
+    for term in sorted(query_map):
+        postings = weight_index.get(term)
+        if postings is None:
+            continue
+        query_weight = query_map[term]
+        for doc_id, weight in zip(postings[0], postings[1]):
+            if not seen[doc_id]:
+                seen[doc_id] = 1
+                touched.append(doc_id)
+            accumulators[doc_id] += round(weight * query_weight, 3)
+
+    heap = []
+    for doc_id in touched:
+        if accumulators[doc_id] > 0:
+            push_bounded(heap, k, accumulators[doc_id], doc_id)
+    return get_ranking(heap, k, collection_size, lambda doc_id: accumulators[doc_id] > 0, deleted)
+
+
+def get_contributions(postings, term_rank, query_weight):
+    """
+    Generate the score contributions of a query term posting list in doc_id order
+    :param postings: (doc_ids, weights) of the term
+    :param term_rank: position of the term in the sorted query terms
+    :param query_weight:
+    :return: iterator over (doc_id, term_rank, contribution)
+    """
+    for doc_id, weight in zip(postings[0], postings[1]):
+        yield doc_id, term_rank, round(weight * query_weight, 3)
+
+
+def score_document_at_a_time(query_map, weight_index, collection_size, k=5, deleted=()):
+    """
+    Rank documents by merging the query term posting lists on doc_id and scoring one document at a time
+    :param query_map: map of the form {lemma: weight}
+    :param weight_index: weight index generated by generate_weight_index
+    :param collection_size: largest doc_id in the collection
+    :param k:
+    :param deleted: doc_ids of deleted documents, see get_ranking
+    :return: list of (doc_id, score), best first
+    """
+    cursors = []
+    for term_rank, term in enumerate(sorted(query_map)):
+        postings = weight_index.get(term)
+        if postings is not None:
+            query_weight = query_map[term]
+            cursors.append(get_contributions(postings, term_rank, query_weight))
+
+    heap = []
+    scored = set()
+    curr_doc_id = None
+    score = 0
+    # Postings come out ordered on doc_id, then on term, so the scores add up in sorted term order
+    for doc_id, term_rank, contribution in heapq.merge(*cursors):
+        if doc_id != curr_doc_id:
+            if curr_doc_id is not None and score > 0:
+                push_bounded(heap, k, score, curr_doc_id)
+                scored.add(curr_doc_id)
+            curr_doc_id = doc_id
+            score = 0
+        score += contribution
+    if curr_doc_id is not None and score > 0:
+        push_bounded(heap, k, score, curr_doc_id)
+        scored.add(curr_doc_id)
+    return get_ranking(heap, k, collection_size, lambda doc_id: doc_id in scored, deleted)
+
+
+def score_wand(query_map, weight_index, collection_size, k=5, counters=None, deleted=()):
+    """
+    Rank documents document-at-a-time with WAND dynamic pruning. A document is only scored if the score upper bounds
+    of the terms it may contain add up to the score of the current k-th best document; every other posting is skipped.
+    The ranking is identical to the one of score_term_at_a_time. The upper bounds come with the weighted posting
+    lists, see generate_weight_index and StoredWeights: since every posting list WAND reads is weighted first, a bound
+    stored at index time would not spare any work. On collections as small as Cranfield the cursor bookkeeping costs
+    more than the skipped postings save, and WAND is slower than score_term_at_a_time
+    :param query_map: map of the form {lemma: weight}
+    :param weight_index: weight index generated by generate_weight_index
+    :param collection_size: largest doc_id in the collection
+    :param k:
+    :param counters: optional map, postings_scored and postings_skipped are added to it
+    :param deleted: doc_ids of deleted documents, see get_ranking
+    :return: list of (doc_id, score), best first
+    """
+    # Every cursor is of the form [current doc_id, position, term_rank, doc_ids, weights, query_weight, upper_bound]
+    cursors = []
+    postings_total = 0
+    for term_rank, term in enumerate(sorted(query_map)):
+        postings = weight_index.get(term)
+        if postings is None:
+            continue
+        query_weight = query_map[term]
+        # Rounding is monotone, so the rounded product of the largest weight bounds every contribution of the term
+        upper_bound = round(postings[2] * query_weight, 3)
+        cursors.append([postings[0][0], 0, term_rank, postings[0], postings[1], query_weight, upper_bound])
+        postings_total += len(postings[0])
+
+    heap = []
+    scored = set()
+    postings_scored = 0
+    while cursors:
+        cursors.sort()
+        threshold = heap[0][0] if len(heap) == k else 0
+        # Find the pivot: the first cursor at which the upper bounds add up to the threshold. The margin keeps the
+        # pruning safe against the summation order of the bounds differing from the one of the scores
+        upper_bound_sum = 0
+        pivot = None
+        for i in range(len(cursors)):
+            upper_bound_sum += cursors[i][6]
+            if upper_bound_sum > 0 and upper_bound_sum >= threshold - 1e-9:
+                pivot = i
+                break
+        if pivot is None:
+            break
+        pivot_doc_id = cursors[pivot][0]
+
+        if cursors[0][0] == pivot_doc_id:
+            # Score the pivot document, adding up the contributions in sorted term order
+            matching = sorted((cursor for cursor in cursors if cursor[0] == pivot_doc_id), key=lambda c: c[2])
+            score = 0
+            for cursor in matching:
+                score += round(cursor[4][cursor[1]] * cursor[5], 3)
+                cursor[1] += 1
+            postings_scored += len(matching)
+            if score > 0:
+                push_bounded(heap, k, score, pivot_doc_id)
+                scored.add(pivot_doc_id)
+        else:
+            # No document before the pivot can enter the top k, skip the cursors before it to the pivot document
+            for cursor in cursors[:pivot]:
+                cursor[1] = bisect_left(cursor[3], pivot_doc_id, cursor[1])
+
+        # Drop the exhausted cursors and move the others to their current doc_id
+        remaining = []
+        for cursor in cursors:
+            if cursor[1] < len(cursor[3]):
+                cursor[0] = cursor[3][cursor[1]]
+                remaining.append(cursor)
+        cursors = remaining
+
+    if counters is not None:
+        counters["postings_scored"] = counters.get("postings_scored", 0) + postings_scored
+        counters["postings_skipped"] = counters.get("postings_skipped", 0) + postings_total - postings_scored
+    return get_ranking(heap, k, collection_size, lambda doc_id: doc_id in scored, deleted)
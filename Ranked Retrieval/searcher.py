@@ -0,0 +1,225 @@
+"""
+Author: Anshul Pardhi
+Ranked retrieval of one query at a time against an index loaded once: the binary index written by IndexBuilding.py,
+with its added and deleted documents, or the compressed one. A query has no query collection to be weighted against,
+so its terms are weighted with the df, collection size and average doclen of the documents
+"""
+
+import math
+from collections import Counter, OrderedDict
+from postings import PostingList
+from dynamic_index import DynamicIndex
+from compressed_index import CompressedIndex
+from binary_index import read_generation
+from scoring import generate_weight_index, score_term_at_a_time, score_document_at_a_time, score_wand, StoredWeights
+from weighting import get_w1_weight, get_w2_weight, generate_weight_vector_map
+from result_cache import get_result_key
+
+
+def get_query_weights(terms, dfs, collection_size, avg_doclen, scheme):
+    """
+    Weight and normalize the terms of a single query. Terms that are in no document are left out
+    :param terms: analyzed query terms
+    :param dfs: map of term: df in the document collection
+    :param collection_size: number of documents
+    :param avg_doclen: average doclen of the documents
+    :param scheme: 1: W1; 2: W2
+    :return: map of the form {lemma: weight}, in sorted term order
+    """
+    counts = Counter(terms)
+    weights = OrderedDict()
+    for term in sorted(counts):
+        df = dfs.get(term)
+        if not df:
+            continue
+        if scheme == 1:
+            weights[term] = get_w1_weight(counts[term], max(counts.values()), collection_size, df)
+        else:
+            weights[term] = get_w2_weight(counts[term], len(terms), avg_doclen, collection_size, df)
+
+    sqrt_sq_sum = math.sqrt(sum(weight * weight for weight in weights.values()))
+    if sqrt_sq_sum == 0:
+        return OrderedDict()  # Only terms that are in every document, which do not rank anything
+    return OrderedDict((term, round(weights[term] / sqrt_sq_sum, 3)) for term in weights)
+
+
+def get_collection_query_weights(query_terms):
+    """
+    Weight a set of queries as a collection of their own, like RankedRetrieval.py weights the queries of hw3.queries:
+    the df, collection size and average length of the weighting schemes are the ones of the queries
+    :param query_terms: list of the analyzed terms of every query
+    :return: query_weight_vector_1, query_weight_vector_2, each of the form {query number: {lemma: weight}}, the
+    queries numbered from 1 in list order; a query without terms has no vector
+    """
+    query_index = {}
+    total_query_len = 0
+    for query_id, terms in enumerate(query_terms, 1):
+        total_query_len += len(terms)
+        count = Counter(terms)
+        for term, tf in count.items():
+            posting_list = query_index.get(term)
+            if posting_list is None:
+                posting_list = PostingList()
+                query_index.update({term: posting_list})
+            posting_list.append(query_id, tf, count.most_common(1)[0][1], len(terms))
+    return generate_weight_vector_map(OrderedDict(sorted(query_index.items())), len(query_terms),
+                                      total_query_len // len(query_terms))
+
+
+class Searcher:
+    """
+    Loads an index and its doc stats once and ranks single queries with either weighting scheme
+    """
+
+    def __init__(self, prefix, analyzer, use_compressed_index=False, scoring_strategy="taat", result_cache=None):
+        """
+        :param prefix: path prefix of the index files written by IndexBuilding.py
+        :param analyzer: Analyzer turning a query into lemmas
+        :param use_compressed_index: True to rank off prefix.compressed.bin and prefix.compressed.docs, otherwise off
+        the binary index. Either way the posting lists are read and weighted as the queries need them
+        :param scoring_strategy: "taat", "daat" or "wand", see scoring.py
+        :param result_cache: ResultCache of the rankings, None to rank every query
+        """
+        self.prefix = prefix
+        self.analyzer = analyzer
+        self.use_compressed_index = use_compressed_index
+        self.scoring_strategy = scoring_strategy
+        self.result_cache = result_cache
+        self.open_index()
+
+    def open_index(self):
+        """
+        Open the index files and weight their documents
+        :return:
+        """
+        if self.use_compressed_index:
+            self.index = CompressedIndex(self.prefix)
+        else:
+            self.index = DynamicIndex(self.prefix)
+        self.load_weights()
+
+    def load_weights(self):
+        """
+        Weight the documents of the index as of its current generation. Once documents were added to or deleted from
+        the binary index, the vector norms of its doc stats file are stale and every document is weighted again
+        :return:
+        """
+        if isinstance(self.index, CompressedIndex):
+            self.max_doc_id = self.index.collection_size
+            self.deleted = set()
+        else:
+            self.max_doc_id = self.index.max_doc_id
+            self.deleted = self.index.deleted
+        self.collection_size = self.index.collection_size
+        self.avg_doclen = self.index.total_doclen // self.collection_size
+        # The files are rewritten by IndexBuilding.py and merges, the documents of an open index by its own updates
+        self.generation = (self.index.disk_generation, self.index.generation)
+
+        if isinstance(self.index, CompressedIndex):
+            stored_weights = StoredWeights(self.index.get_postings, self.index.get_doc_stats, self.collection_size,
+                                           self.avg_doclen)
+            self.weight_indexes = {1: stored_weights.get_weight_index(1), 2: stored_weights.get_weight_index(2)}
+        elif not self.index.has_pending_updates():
+            stored_weights = StoredWeights(self.index.main.read_postings, self.index.main.get_doc_norms,
+                                           self.collection_size, self.avg_doclen)
+            self.weight_indexes = {1: stored_weights.get_weight_index(1), 2: stored_weights.get_weight_index(2)}
+        else:
+            document_weight_vector_1, document_weight_vector_2 = generate_weight_vector_map(
+                self.index.to_index(), self.collection_size, self.avg_doclen)
+            self.weight_indexes = {1: generate_weight_index(document_weight_vector_1),
+                                   2: generate_weight_index(document_weight_vector_2)}
+
+    def search(self, query, scheme=1, k=5):
+        """
+        Rank the documents for a query. If the index files were rewritten since the last query they are opened again,
+        and documents added to or deleted from the index are weighted again first
+        :param query: query text
+        :param scheme: 1: W1; 2: W2
+        :param k: number of documents
+        :return: list of (doc_id, score), best first; a cached ranking is shared, so it must not be modified
+        """
+        self.check_request(scheme, k)
+        key = get_result_key(self.analyzer.analyze(query), scheme, k)
+        if self.result_cache is None:
+            return self.rank(key)
+        self.result_cache.check_generation(self.generation)
+        return self.result_cache.get(key, self.rank)
+
+    def search_weighted(self, query_map, scheme=1, k=5):
+        """
+        Rank the documents for query weights computed by the caller, e.g. by get_collection_query_weights. The rankings
+        are not cached
+        :param query_map: map of the form {lemma: weight}
+        :param scheme: 1: W1; 2: W2, the scheme the query was weighted with
+        :param k: number of documents
+        :return: list of (doc_id, score), best first
+        """
+        self.check_request(scheme, k)
+        return self.score(query_map, self.get_weight_index(query_map, scheme), k)
+
+    def check_request(self, scheme, k):
+        """
+        Check the scheme and k of a request, and reopen the index files or weight the documents again if the index
+        changed since the last one. Updates made to the open index and not merged are lost when the files are reopened
+        :param scheme:
+        :param k:
+        :return:
+        """
+        # bool is a subclass of int, and a list or map scheme is not hashable, so the types are checked first
+        if isinstance(scheme, bool) or not isinstance(scheme, int) or scheme not in self.weight_indexes:
+            raise ValueError("Unknown weighting scheme %s, use 1 (W1) or 2 (W2)" % (scheme,))
+        if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+            raise ValueError("k must be a positive integer, got %s" % (k,))
+        if read_generation(self.prefix) != self.index.disk_generation:
+            self.index.close()
+            self.open_index()
+        elif self.index.generation != self.generation[1]:
+            self.load_weights()
+
+    def rank(self, key):
+        """
+        Rank the documents for an analyzed query
+        :param key: (sorted terms, scheme, k), see get_result_key
+        :return: list of (doc_id, score), best first
+        """
+        terms, scheme, k = key
+
+        # The posting lists of the query terms give their df, and are then scored
+        weight_index = self.get_weight_index(terms, scheme)
+        query_map = get_query_weights(terms, dict((term, len(postings[0])) for term, postings in weight_index.items()),
+                                      self.collection_size, self.avg_doclen, scheme)
+        return self.score(query_map, weight_index, k)
+
+    def get_weight_index(self, terms, scheme):
+        """
+        Get the weighted posting lists of a set of terms
+        :param terms:
+        :param scheme: 1: W1; 2: W2
+        :return: weight index of the form {lemma: [doc_ids, weights, max_weight]}, terms in no document are left out
+        """
+        weight_index = {}
+        for term in set(terms):
+            postings = self.weight_indexes[scheme].get(term)
+            if postings is not None:
+                weight_index.update({term: postings})
+        return weight_index
+
+    def score(self, query_map, weight_index, k):
+        """
+        Score the documents with the scoring strategy of the searcher
+        :param query_map: map of the form {lemma: weight}
+        :param weight_index: see get_weight_index
+        :param k: number of documents
+        :return: list of (doc_id, score), best first
+        """
+        if self.scoring_strategy == "daat":
+            return score_document_at_a_time(query_map, weight_index, self.max_doc_id, k, self.deleted)
+        if self.scoring_strategy == "wand":
+            return score_wand(query_map, weight_index, self.max_doc_id, k, deleted=self.deleted)
+        return score_term_at_a_time(query_map, weight_index, self.max_doc_id, k, self.deleted)
+
+    def get_title(self, doc_id):
+        return self.index.get_title(doc_id)
+
+    def close(self):
+        self.index.close()
@@ -0,0 +1,198 @@
+"""
+Author: Anshul Pardhi
+Vectorized W1/W2 weighting and batch query scoring with NumPy and SciPy sparse matrices.
+Row i of a weight matrix is the L2 normalized weight vector of document (or query) i, row 0 is unused,
+and column j is the j-th term of the sorted dictionary
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from collections import OrderedDict
+
+
+def get_postings_columns(index):
+    """
+    Concatenate the posting lists of the index into flat NumPy columns, without copying the posting arrays
+    :param index: sorted index of the form {word: posting_list(doc_id, tf, max_tf, doclen)}
+    :return: term_ids, doc_ids, tfs, max_tfs, doclens, dfs
+    """
+    dfs = np.array([len(index[key]) for key in index], dtype=np.int64)
+    term_ids = np.repeat(np.arange(len(dfs)), dfs)
+    columns = []
+    for column in ("doc_ids", "tfs", "max_tfs", "doclens"):
+        columns.append(np.concatenate([np.frombuffer(getattr(index[key], column), dtype=np.uint32)
+                                       for key in index]).astype(np.int64))
+    doc_ids, tfs, max_tfs, doclens = columns
+    return term_ids, doc_ids, tfs, max_tfs, doclens, dfs
+
+
+def normalize_rows(matrix):
+    """
+    L2 normalize every row of a CSR matrix in bulk, rounding the weights to 3 decimals like normalize_weights
+    :param matrix:
+    :return: normalized CSR matrix
+    """
+    matrix.sort_indices()
+    row_norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    row_norms[row_norms == 0] = 1.0
+    row_lengths = np.diff(matrix.indptr)
+    data = np.round(matrix.data / np.repeat(row_norms, row_lengths), 3)
+    return sp.csr_matrix((data, matrix.indices, matrix.indptr), shape=matrix.shape)
+
+
+def build_weight_matrices(index, num_rows, collection_size, avg_doclen):
+    """
+    Compute the normalized W1 (max-tf) and W2 (Okapi) weight matrices of an index, column-wise over all postings
+    :param index: sorted index of the form {word: posting_list(doc_id, tf, max_tf, doclen)}
+    :param num_rows: largest doc_id in the index
+    :param collection_size:
+    :param avg_doclen:
+    :return: w1_matrix, w2_matrix
+    """
+    term_ids, doc_ids, tfs, max_tfs, doclens, dfs = get_postings_columns(index)
+    tfs = tfs.astype(np.float64)
+    idf = np.log10(float(collection_size) / dfs) / np.log10(float(collection_size))
+    posting_idf = idf[term_ids]
+
+    w1 = (0.4 + 0.6 * np.log10(tfs + 0.5) / np.log10(max_tfs + 1.0)) * posting_idf
+    w2 = (0.4 + 0.6 * (tfs / (tfs + 0.5 + 1.5 * (doclens / float(avg_doclen))))) * posting_idf
+
+    shape = (num_rows + 1, len(dfs))
+    w1_matrix = sp.csr_matrix((w1, (doc_ids, term_ids)), shape=shape)
+    w2_matrix = sp.csr_matrix((w2, (doc_ids, term_ids)), shape=shape)
+    return normalize_rows(w1_matrix), normalize_rows(w2_matrix)
+
+
+def get_projection(from_terms, to_terms):
+    """
+    Build the 0/1 matrix mapping the columns of one dictionary onto the columns of another
+    :param from_terms: sorted terms of the source dictionary
+    :param to_terms: sorted terms of the target dictionary
+    :return: CSR matrix of shape (len(from_terms), len(to_terms))
+    """
+    to_term_ids = {term: i for i, term in enumerate(to_terms)}
+    rows = []
+    cols = []
+    for i, term in enumerate(from_terms):
+        if term in to_term_ids:
+            rows.append(i)
+            cols.append(to_term_ids[term])
+    return sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(from_terms), len(to_terms)))
+
+
+def get_exact_score(query_weights, document_matrix, doc_id):
+    """
+    Score a document like score_term_at_a_time: every product of weights is rounded to 3 decimals and the products are
+    added in dictionary order
+    :param query_weights: map of the form {column: weight}
+    :param document_matrix: normalized document weights
+    :param doc_id:
+    :return: score
+    """
+    score = 0
+    start = document_matrix.indptr[doc_id]
+    end = document_matrix.indptr[doc_id + 1]
+    for col, weight in zip(document_matrix.indices[start:end].tolist(), document_matrix.data[start:end].tolist()):
+        query_weight = query_weights.get(col)
+        if query_weight is not None:
+            score += round(weight * query_weight, 3)
+    return score
+
+
+def get_top_k(scores, k, margins, get_score, deleted=()):
+    """
+    Top-k of every row of a dense score matrix, ranked like get_ranking. The scores of the matrix product are not
+    rounded product by product, so every document within margin of the k-th largest score of its row is rescored with
+    get_score; ties are broken on increasing column (doc_id), and if fewer than k documents have a positive score, the
+    ranking is filled up with 0 scored documents in increasing doc_id order
+    :param scores: dense matrix of shape (queries, documents), column 0 is ignored
+    :param k:
+    :param margins: largest difference between the score of a row and its rescored score, one per row
+    :param get_score: function of (row, doc_id) returning the exact score
+    :param deleted: doc_ids of deleted documents, whose columns are ignored as well
+    :return: list of rankings, one list of (doc_id, score) per row
+    """
+    scores = np.array(scores, dtype=np.float64)
+    scores[:, 0] = -np.inf
+    if deleted:
+        scores[:, sorted(deleted)] = -np.inf
+    num_docs = scores.shape[1]
+    k = min(k, num_docs - 1 - len(deleted))
+    # A document of the exact top k scores at least the k-th largest score minus twice the margin
+    kth_scores = -np.partition(-scores, k - 1, axis=1)[:, k - 1]
+    rows, cols = np.nonzero((scores >= (kth_scores - 2 * margins - 1e-9)[:, None]) & (scores > 0))
+    row_starts = np.searchsorted(rows, np.arange(scores.shape[0] + 1))
+    rankings = []
+    for row in range(scores.shape[0]):
+        candidates = []
+        for doc_id in cols[row_starts[row]:row_starts[row + 1]].tolist():
+            score = get_score(row, doc_id)
+            if score > 0:
+                candidates.append((-score, doc_id))
+        candidates.sort()
+        ranking = [(doc_id, -neg_score) for neg_score, doc_id in candidates[:k]]
+        scored = set(doc_id for neg_score, doc_id in candidates)
+        doc_id = 1
+        while len(ranking) < k and doc_id < num_docs:
+            if doc_id not in scored and doc_id not in deleted:
+                ranking.append((doc_id, 0))
+            doc_id += 1
+        rankings.append(ranking)
+    return rankings
+
+
+def score_queries(query_matrix, document_matrix, k=5, batch_size=1024, deleted=()):
+    """
+    Score all queries against all documents with one sparse matrix product per batch of queries, then rescore the
+    candidates of the top k exactly, so that the rankings and scores are the ones of score_term_at_a_time
+    :param query_matrix: normalized query weights, projected on the document dictionary
+    :param document_matrix: normalized document weights
+    :param k:
+    :param batch_size: number of queries whose dense scores are held in memory at a time
+    :param deleted: doc_ids of deleted documents, never ranked
+    :return: map of the form {query_id: list of (doc_id, score)}
+    """
+    document_matrix_t = document_matrix.T.tocsr()
+    rankings = OrderedDict()
+    for start in range(1, query_matrix.shape[0], batch_size):
+        end = min(start + batch_size, query_matrix.shape[0])
+        batch = query_matrix[start:end].tocsr()
+        query_weights = [dict(zip(batch.indices[batch.indptr[row]:batch.indptr[row + 1]].tolist(),
+                                  batch.data[batch.indptr[row]:batch.indptr[row + 1]].tolist()))
+                         for row in range(batch.shape[0])]
+        # Rounding a product moves it by at most 0.0005
+        margins = 0.0005 * np.diff(batch.indptr)
+        scores = (batch @ document_matrix_t).toarray()
+        batch_rankings = get_top_k(scores, k, margins,
+                                   lambda row, doc_id: get_exact_score(query_weights[row], document_matrix, doc_id),
+                                   deleted)
+        for offset, ranking in enumerate(batch_rankings):
+            rankings[start + offset] = ranking
+    return rankings
+
+
+class WeightMatrixView:
+    """
+    Read only weight vector map over the rows of a weight matrix, for printing vector representations
+    """
+
+    def __init__(self, matrix, terms):
+        self.matrix = matrix
+        self.terms = terms
+
+    def __iter__(self):
+        row_lengths = np.diff(self.matrix.indptr)
+        return iter(int(row) for row in np.nonzero(row_lengths)[0])
+
+    def __getitem__(self, row):
+        weights = OrderedDict()
+        start = self.matrix.indptr[row]
+        end = self.matrix.indptr[row + 1]
+        for col, weight in zip(self.matrix.indices[start:end], self.matrix.data[start:end]):
+            weights[self.terms[col]] = float(weight)
+        return weights
+
+    def get(self, row, default=None):
+        if row < 1 or row >= self.matrix.shape[0]:
+            return default
+        return self[row]
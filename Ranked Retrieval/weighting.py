@@ -0,0 +1,94 @@
+"""
+Author: Anshul Pardhi
+Max-tf (W1) and Okapi (W2) term weighting of an index into normalized weight vectors, of the documents as well as of
+the queries
+"""
+
+import math
+from collections import OrderedDict
+
+
+def get_w1_weight(tf, max_tf, collection_size, df):
+    """
+    Computes weights on the basis of max-tf term weighting
+    :param tf:
+    :param max_tf:
+    :param collection_size:
+    :param df:
+    :return: w1_weight
+    """
+    return (0.4 + 0.6 * math.log10(float(tf) + 0.5) / math.log10(float(max_tf) + 1.0)) * \
+           (math.log10(float(collection_size) / float(df)) / math.log10(float(collection_size)))
+
+
+def get_w2_weight(tf, doclen, avg_doclen, collection_size, df):
+    """
+    Computes weights on the basis of Okapi term weighting
+    :param tf:
+    :param doclen:
+    :param avg_doclen:
+    :param collection_size:
+    :param df:
+    :return: w2_weight
+    """
+    return (0.4 + 0.6 * (float(tf) / (float(tf) + 0.5 + 1.5 * (float(doclen) / float(avg_doclen))))) * \
+           (math.log10(float(collection_size) / float(df)) / math.log10(float(collection_size)))
+
+
+def normalize_weights(curr_map):
+    """
+    Normalize the weights generated by the weighting scheme
+    :param curr_map:
+    :return: normalized weight map
+    """
+    new_map = {}
+    for key in curr_map:
+        weights = curr_map[key]
+
+        # Sum all the squares of weights belonging to a particular document
+        sq_sum = 0
+        for term in weights:
+            sq_sum += weights[term] * weights[term]
+
+        sqrt_sq_sum = math.sqrt(sq_sum)
+
+        # Normalize the weight and store in the dictionary
+        normalized_weights = OrderedDict()
+        for term in weights:
+            normalized_weights[term] = round(weights[term] / sqrt_sq_sum, 3)
+        new_map.update({key: normalized_weights})
+    return new_map
+
+
+def generate_weight_vector_map(index, collection_size, avg_doclen):
+    """
+    Generates weight vector map from the given index
+    :param index:
+    :param collection_size:
+    :param avg_doclen:
+    :return: weight vector map
+    """
+    curr_map_1 = {}  # Map based on W1 weighting scheme
+    curr_map_2 = {}  # Map based on W2 weighting scheme
+
+    for key in index:
+        posting_list = index[key]
+        df = len(posting_list)
+
+        for doc_id, tf, max_tf, doclen in posting_list:
+            w1_weight = get_w1_weight(tf, max_tf, collection_size, df)
+            w2_weight = get_w2_weight(tf, doclen, avg_doclen, collection_size, df)
+
+            # Maps will be of the form {doc_id: {lemma1: weight1, lemma2: weight2 and so on}}
+            if curr_map_1.get(doc_id) is None:
+                curr_map_1.update({doc_id: OrderedDict()})
+                curr_map_2.update({doc_id: OrderedDict()})
+            curr_map_1[doc_id][key] = w1_weight
+            curr_map_2[doc_id][key] = w2_weight
+
+    # Normalize the weights for both the maps
+    curr_map_1 = normalize_weights(curr_map_1)
+    curr_map_2 = normalize_weights(curr_map_2)
+
+    # Sort the map on the basis of doc_id
+    return OrderedDict(sorted(curr_map_1.items())), OrderedDict(sorted(curr_map_2.items()))
@@ -4,34 +4,45 @@ The program performs tokenization and stemming of Cranfield documents collection
 """
 import time
 import glob
-import re
-import xml.etree.ElementTree as et
 from collections import Counter
 # from nltk.stem.porter import PorterStemmer
 from porter_stemmer_tartarus import PorterStemmer
+from porter_stemmer_stateless import StatelessPorterStemmer
+from term_cache import LRUCache, CachedStemmer
+from analyzer import tokenize
+from cranfield_reader import read_fields
+from document_cache import DocumentCache
 
 start_time = time.time()  # The start time of program execution
 directory = "/people/cs/s/sanda/cs6322/Cranfield/*"  # Change to point to the respective directory
 # directory = "Cranfield/*"  # Change to point to the respective directory
 collection = glob.glob(directory)  # Get all the files from the directory in a list
 
-tokens = []  # Initialize the list of tokens, it will contain the final tokens
+# Using the table-driven Porter stemmer, every distinct token is stemmed once
+stemmer = CachedStemmer(StatelessPorterStemmer(), LRUCache(100000))
+
+# Tokens and stems can be kept between runs, so that only the changed Cranfield files are tokenized and stemmed again
+document_cache = DocumentCache()
+document_cache_path = None  # Change to a file path to save the analyzed documents and reuse them in the next run
 
-# Repeat for every file in the collection
-for file in collection:
-    root = et.parse(file)  # Get the root DOM element from the file
+tokens = []  # Initialize the list of tokens, it will contain the final tokens
+num_documents = 0  # A file can hold several documents
 
-    # Repeat for all child DOM elements
-    for values in root.findall('*'):
-        sgml_values = values.text  # Get the value
-        sgml_values = sgml_values.strip()  # Remove preceding and trailing spaces
-        sgml_values = sgml_values.replace("\n", " ")  # Remove the end of line escape character
-        sgml_values = re.sub(r'[^a-zA-Z0-9.\s]', ' ', sgml_values)  # Replace all non-alphanumeric characters with space
-        sgml_values = re.sub(r'[^a-zA-Z0-9\s]', '', sgml_values)  # Remove all dots, e.g. U.S.A. becomes USA
-        sgml_values = sgml_values.lower()  # Convert all letters to lowercase
-        token_list = sgml_values.split()  # Split individual words on spaces
-        for token in token_list:
-            tokens.append(token)  # Append every split word to the list of tokens
+if document_cache_path is None:
+    # Repeat for every field of every document in the collection, appending every token of the field to the list of
+    # tokens
+    for doc_id, field, text in read_fields(collection):
+        num_documents = doc_id
+        tokens.extend(tokenize(text))
+else:
+    # The stems of the changed documents are computed along with their tokens
+    document_cache.load(document_cache_path)
+    cached_stem_list = []
+    for doc_id, document in document_cache.read_documents(collection, stemmer=stemmer):
+        num_documents = doc_id
+        tokens.extend(document.tokens)
+        cached_stem_list.extend(document.stems)
+    document_cache.save()
 
 # Print the time it took to gather the tokens from the collection
 print("Tokenization time:", round(time.time() - start_time, 2), "seconds")
@@ -48,21 +59,36 @@ print("1. The number of tokens in the Cranfield text collection:", len(tokens))
 print("2. The number of unique words in the Cranfield text collection:", len(set(tokens)))
 print("3. The number of words that occur only once in the Cranfield text collection:", len(token_1))
 print("4. The 30 most frequent words in the Cranfield text collection:", token_count.most_common(30))
-print("5. The average number of word tokens per document:", len(tokens) // len(collection))
+print("5. The average number of word tokens per document:", len(tokens) // num_documents)
 
 # Stemming begins!
 stem_start_time = time.time()  # The start time of stemming execution
-stemmer = PorterStemmer()  # Using PorterStemmer from NLTK for stemming
-
-stem_list = []  # Initialize the list of stems, it will contain the final stems
-
-# Repeat for every token in the list of tokens
-for token in tokens:
-    stemmed_token = stemmer.stem(token, 0, len(token) - 1)  # Use PorterStemmer to stem the token
-    stem_list.append(stemmed_token)  # Append the stem to the list of stems
+if document_cache_path is None:
+    stem_list = stemmer.stem_many(tokens)  # Stem every token in the list of tokens
+else:
+    stem_list = cached_stem_list
 
 # Print the time it took for stemming
 print("Stemming time:", round(time.time() - stem_start_time, 2), "seconds")
+print(stemmer.cache.report("Stem"))
+if document_cache_path is not None:
+    print(document_cache.report())
+
+# Check the table-driven stemmer against the original Porter stemmer on the collection vocabulary, and time both
+compare_stemmers = False  # Change to True to run the check
+if compare_stemmers:
+    vocabulary = sorted(set(tokens))
+    reference_stemmer = PorterStemmer()
+    table_stemmer = StatelessPorterStemmer()
+    mismatches = [token for token in vocabulary if table_stemmer.stem(token, 0, len(token) - 1) !=
+                  reference_stemmer.stem(token, 0, len(token) - 1)]
+    print("Stemmer check:", len(vocabulary), "distinct tokens,", len(mismatches), "different stems", mismatches[:10])
+    for name, curr_stemmer in (("porter_stemmer_tartarus", reference_stemmer), ("table-driven", table_stemmer)):
+        compare_start_time = time.time()
+        for token in vocabulary:
+            curr_stemmer.stem(token, 0, len(token) - 1)
+        print("Stemming time of the vocabulary with the %s stemmer: %s seconds" %
+              (name, round(time.time() - compare_start_time, 3)))
 
 # Get the frequency of each stem
 stem_count = Counter(stem_list)
@@ -75,7 +101,7 @@ for counts in stem_count.most_common():
 print("1. The number of distinct stems in the Cranfield text collection:", len(set(stem_list)))
 print("2. The number of stems that occur only once in the Cranfield text collection:", len(stem_1))
 print("4. The 30 most frequent stems in the Cranfield text collection:", stem_count.most_common(30))
-print("5. The average number of word-stems per document:", len(stem_list) // len(collection))
+print("5. The average number of word-stems per document:", len(stem_list) // num_documents)
 
 # Print the time it took for the whole program to run
 print("Total time:", round(time.time() - start_time, 2), "seconds")
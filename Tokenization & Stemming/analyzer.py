@@ -0,0 +1,81 @@
+"""
+Author: Anshul Pardhi
+Text analysis shared by the tokenization, indexing and retrieval programs: tokenization, stopword removal and
+pluggable lemmatization or stemming stages, done in a single pass over the text
+"""
+
+import re
+
+# A token is a run of letters, digits and dots. Everything else separates tokens, and the dots are removed afterwards,
+# e.g. U.S.A. becomes usa. This is the same as replacing all other characters with spaces, removing the dots,
+# converting to lowercase and splitting on spaces
+TOKEN_RUN = re.compile(r"[a-zA-Z0-9.]+")
+
+
+def tokenize(text):
+    """
+    Generate the tokens of a text
+    :param text:
+    :return: iterator over lowercase tokens
+    """
+    if text is None:
+        return
+    for match in TOKEN_RUN.finditer(text):
+        token = match.group()
+        if "." in token:
+            token = token.replace(".", "")
+            if token == "":
+                continue
+        yield token.lower()
+
+
+def stem_stage(stemmer):
+    """
+    Turn a Porter stemmer into an analysis stage
+    :param stemmer: PorterStemmer, StatelessPorterStemmer or CachedStemmer
+    :return: function of the form token: stem
+    """
+    return lambda token: stemmer.stem(token, 0, len(token) - 1)
+
+
+class Analyzer:
+    """
+    Tokenizes a text, drops the stopwords and passes the remaining tokens through a list of stages
+    """
+
+    def __init__(self, stopwords=(), stages=()):
+        """
+        :param stopwords: stopwords, looked up in a frozenset
+        :param stages: functions of the form term: term applied in order, e.g. lemmatizer.lemmatize or stem_stage(stemmer)
+        """
+        self.stopwords = frozenset(stopwords)
+        self.stages = tuple(stages)
+
+    def terms(self, text, counters=None):
+        """
+        Generate the analyzed terms of a text
+        :param text:
+        :param counters: optional map, the number of tokens (stopwords included) is added to its "tokens" entry
+        :return: iterator over terms
+        """
+        stopwords = self.stopwords
+        stages = self.stages
+        token_count = 0
+        for token in tokenize(text):
+            token_count += 1
+            if token in stopwords:
+                continue
+            for stage in stages:
+                token = stage(token)
+            yield token
+        if counters is not None:
+            counters["tokens"] = counters.get("tokens", 0) + token_count
+
+    def analyze(self, text, counters=None):
+        """
+        Get the analyzed terms of a text
+        :param text:
+        :param counters: see terms
+        :return: list of terms
+        """
+        return list(self.terms(text, counters))
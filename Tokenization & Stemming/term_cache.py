@@ -0,0 +1,200 @@
+"""
+Author: Anshul Pardhi
+Bounded memoization of stemming and lemmatization. The distinct vocabulary is a small fraction of the token stream,
+so a term is stemmed or lemmatized once and its later occurrences are looked up in an LRU cache
+"""
+
+import os
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Least recently used cache of term: result, with hit and miss counters.
+    A cache can be saved to a file and loaded in a later run, and the caches of worker processes can be merged
+    """
+
+    def __init__(self, max_size=100000):
+        """
+        :param max_size: largest number of entries, the least recently used entry is evicted beyond it
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, function):
+        """
+        Get the cached result for a key, computing and caching it on a miss
+        :param key:
+        :param function: computes the result of a key
+        :return: result
+        """
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+        self.misses += 1
+        value = function(key)
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        Add an entry, evicting the least recently used entry if the cache is full
+        :param key:
+        :param value:
+        :return:
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def reset_counters(self):
+        """
+        Set the hit and miss counters back to 0
+        :return:
+        """
+        self.hits = 0
+        self.misses = 0
+
+    def get_changes(self, known_keys):
+        """
+        Get a cache holding only the entries added since the keys were taken, and the counters, e.g. to send back from
+        a worker process
+        :param known_keys: set of the keys of the cache at the start
+        :return: LRUCache
+        """
+        changes = LRUCache(self.max_size)
+        for key, value in self.entries.items():
+            if key not in known_keys:
+                changes.entries[key] = value
+        changes.hits = self.hits
+        changes.misses = self.misses
+        return changes
+
+    def merge(self, other):
+        """
+        Add the entries and counters of another cache, e.g. the cache of a worker process
+        :param other:
+        :return:
+        """
+        for key, value in other.entries.items():
+            self.put(key, value)
+        self.hits += other.hits
+        self.misses += other.misses
+
+    def get_hit_rate(self):
+        """
+        Get the fraction of lookups answered from the cache
+        :return: hit rate between 0 and 1
+        """
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups > 0 else 0.0
+
+    def report(self, name):
+        """
+        Describe the cache size, counters and hit rate
+        :param name:
+        :return: report string
+        """
+        return "%s cache: %s entries, %s hits, %s misses, hit rate %s%%" % (
+            name, len(self.entries), self.hits, self.misses, round(100 * self.get_hit_rate(), 2))
+
+    def load(self, path):
+        """
+        Load the entries saved by save, if the file exists
+        :param path:
+        :return:
+        """
+        if not os.path.exists(path):
+            return
+        cache_ip = open(path, "r")
+        for line in cache_ip:
+            # Each line is of the form term    result, the least recently used entry first
+            key, value = line.rstrip("\n").split("\t")
+            self.put(key, value)
+        cache_ip.close()
+
+    def save(self, path):
+        """
+        Save the entries to a file
+        :param path:
+        :return:
+        """
+        cache_op = open(path, "w")
+        for key, value in self.entries.items():
+            cache_op.write(key + "\t" + value + "\n")
+        cache_op.close()
+
+
+class CachedStemmer:
+    """
+    Porter stemmer whose stems of whole words are memoized in an LRU cache
+    """
+
+    def __init__(self, stemmer, cache):
+        """
+        :param stemmer: PorterStemmer
+        :param cache: LRUCache, can be shared by several stemmers
+        """
+        self.stemmer = stemmer
+        self.cache = cache
+
+    def stem_word(self, word):
+        return self.stemmer.stem(word, 0, len(word) - 1)
+
+    def stem(self, p, i, j):
+        """
+        Stem p[i:j + 1], same as PorterStemmer.stem
+        :param p:
+        :param i:
+        :param j:
+        :return: stem
+        """
+        if i != 0 or j != len(p) - 1:
+            return self.stemmer.stem(p, i, j)
+        return self.cache.get(p, self.stem_word)
+
+    def stem_many(self, tokens):
+        """
+        Stem a batch of whole words
+        :param tokens:
+        :return: list of stems, in the order of the tokens
+        """
+        get = self.cache.get
+        stem_word = self.stem_word
+        return [get(token, stem_word) for token in tokens]
+
+
+class CachedLemmatizer:
+    """
+    WordNet lemmatizer whose noun lemmas are memoized in an LRU cache
+    """
+
+    def __init__(self, lemmatizer, cache):
+        """
+        :param lemmatizer: WordNetLemmatizer
+        :param cache: LRUCache, can be shared by several lemmatizers
+        """
+        self.lemmatizer = lemmatizer
+        self.cache = cache
+
+    def lemmatize(self, word, pos="n"):
+        """
+        Lemmatize a word, same as WordNetLemmatizer.lemmatize
+        :param word:
+        :param pos:
+        :return: lemma
+        """
+        if pos != "n":
+            return self.lemmatizer.lemmatize(word, pos)
+        return self.cache.get(word, self.lemmatizer.lemmatize)